@@ -38,11 +38,11 @@ syn keyword VarType Booléen Caractère Chaîne Entier Numérique Quelconque
 syn keyword Program Début Fin
 syn keyword Library Librairie Initialise
 syn keyword File Ajout Ecriture Lecture
-syn keyword Func Fonction Retourne FinFonction
+syn keyword Func Fonction Retourne FinFonction Mémoïsée
 syn keyword Proc Procédure Terminer FinProcédure
 syn keyword StockFunc Aléa Car Clefs CodeCar Commande Dormir Droite Ecrire EcrireErr EcrireFichier Effacer
 syn keyword StockFunc Existe Extraire FDF Fermer Gauche Lire LireFichier Longueur NON Ouvrir
-syn keyword StockFunc Panique Redim Taille
+syn keyword StockFunc Panique Redim Somme Taille
 syn keyword StockFunc Valeurs TempsUnix Trouve Type
 syn keyword StockFunc ZoneHoraire ZoneHoraireTxt
 syn keyword Loop TantQue FinTantQue Pour Pas Suivant Continuer Sortir
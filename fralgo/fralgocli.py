@@ -26,69 +26,277 @@
 
 import os
 import sys
-from time import sleep
+from time import sleep, perf_counter
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from fralgo import __version__
-from fralgo.lib.datatypes import map_type
-from fralgo.fralgoparse import parser
-from fralgo.lib.ast import libs, namespaces, FreeFormArray
+from fralgo.lib.cache import load_tree, store_tree
 from fralgo.lib.exceptions import FatalError, print_err
 
-sym = namespaces.get_namespace('main')
+options = {
+  '-O': 'optimise l\'arbre avant l\'exécution (calcul des constantes)',
+  '--moteur': 'moteur d\'exécution : arbre (par défaut), fermetures, vm ou pile',
+  '--désassembler': 'affiche le code de la machine virtuelle sans l\'exécuter',
+  '--compiler': 'traduit le programme en Python quand c\'est possible',
+  '--temps-demarrage': 'affiche la durée de chaque phase du démarrage',
+  '--verifier': 'vérifie les types avant l\'exécution et ne les vérifie plus ensuite',
+  '--memoiser': 'mémorise les résultats des fonctions pures',
+  '--jit': 'compile les boucles après 1000 itérations (moteur arbre)',
+  '--sans-numpy': 'calcule les opérations sur des tableaux entiers sans NumPy',
+  '--stats': 'affiche les statistiques de mémorisation et les boucles compilées à la fin',
+}
+
+# Options taking a value: --option=valeur
+choices = {
+  '--moteur': ('arbre', 'fermetures', 'vm', 'pile'),
+}
+
+def parse_args(argv):
+  '''
+  fralgo [options] <fichier> [arguments]
+  Return the selected options ({option: value}), the ALGO file and its arguments.
+  '''
+  selected = {}
+  for i, arg in enumerate(argv):
+    if not arg.startswith('-'):
+      return selected, arg, argv[i+1:]
+    option, equal, value = arg.partition('=')
+    if option not in options:
+      print_err(f'{arg} : option inconnue')
+      sys.exit(1)
+    if option in choices:
+      if value not in choices[option]:
+        print_err(f'{arg} : valeur invalide ({", ".join(choices[option])})')
+        sys.exit(1)
+    elif equal:
+      print_err(f'{arg} : l\'option {option} n\'accepte pas de valeur')
+      sys.exit(1)
+    else:
+      value = True
+    selected[option] = value
+  return selected, None, []
+
+def banner():
+  print(r' _______ ______        _______ _____   _______ _______',  flush=True)
+  sleep(0.0625)
+  print(r'|    ___|   __ \______|   _   |     |_|     __|       |', flush=True)
+  sleep(0.0625)
+  print(r'|    ___|      <______|       |       |    |  |   -   |', flush=True)
+  sleep(0.0625)
+  print(r'|___|   |___|__|      |___|___|_______|_______|_______|', flush=True)
+  sleep(0.0625)
+  version = f'fr-v100 {__version__}mg'
+  print('|A|L|G|O|R|I|T|H|M|E|S|'.ljust(55-len(version)) + version)
+  print()
+  print('(c) 2024-2026 Stéphane MEYER (Teegre)', flush=True)
+  sleep(0.0625)
+  print()
+  sleep(0.0625)
+  print()
+  print('Donnez-moi un fichier ALGO en paramètre et je ferai de mon')
+  print("mieux pour lire et exécuter les instructions qu'il contient.")
+  print()
+  print('Exemple : fralgo monfichier.algo')
+  print()
+  print('Options :')
+  for option, description in options.items():
+    if option in choices:
+      option = f'{option}={"|".join(choices[option])}'
+    print(f'  {option:<29} {description}')
+  print()
+
+class Timer:
+  '''Startup phases duration (--temps-demarrage)'''
+  def __init__(self):
+    self.phases = []
+    self.last = perf_counter()
+  def lap(self, phase, note=None):
+    now = perf_counter()
+    self.phases.append((phase, now - self.last, note))
+    self.last = now
+  def report(self):
+    total = sum(duration for _, duration, _ in self.phases)
+    sys.stderr.write('*** Temps de démarrage\n')
+    for phase, duration, note in self.phases + [('total', total, None)]:
+      note = f' ({note})' if note else ''
+      sys.stderr.write(f'... {phase:<22} {duration * 1000:9.2f} ms{note}\n')
+    sys.stderr.flush()
+
+def parse(algofile, prog, timer):
+  '''Return the tree of the program'''
+  statements = load_tree(algofile, prog)
+  if statements is None:
+    timer.lap('chargement de l\'arbre', 'absent')
+    from fralgo.fralgolex import lexer
+    timer.lap('analyseur lexical')
+    from fralgo.fralgoparse import parser
+    timer.lap('analyseur syntaxique')
+    statements = parser.parse(prog, lexer=lexer)
+    store_tree(algofile, prog, statements)
+    timer.lap('analyse')
+  else:
+    timer.lap('chargement de l\'arbre', 'cache')
+  return statements
+
+def verify_program(statements, timer):
+  '''Check the types of the program before its execution (--verifier)'''
+  from fralgo.lib.verifier import Verifier
+  errors = Verifier(statements).verify(statements)
+  timer.lap('vérification')
+  for lineno, message in errors:
+    print_err(f'Ligne {lineno} : {message}')
+  if errors:
+    sys.exit(1)
+
+def compile_program(algofile, prog, timer, statements=None):
+  '''
+  Run the Python translation of the program (--compiler).
+  Return True if it ran, otherwise False and the tree if it was parsed.
+  '''
+  from fralgo.lib.cache import load_code, store_code
+  code = load_code(algofile, prog)
+  if code is None:
+    from fralgo.lib.transpiler import translate
+    from fralgo.lib.inference import Untyped
+    if statements is None:
+      statements = parse(algofile, prog, timer)
+    try:
+      code = translate(statements)
+      timer.lap('traduction')
+    except Untyped as e:
+      code = e.message
+      timer.lap('traduction', f'impossible : {e.message}')
+    store_code(algofile, prog, code)
+  else:
+    timer.lap('traduction', 'cache')
+  if isinstance(code, str):
+    print_err(f'--compiler : traduction impossible ({code}), exécution par l\'interpréteur')
+    return False, statements
+  from fralgo.lib.transpiler import run
+  run(*code)
+  return True, None
+
+def run_vm(statements, timer):
+  '''
+  Run the program on the virtual machine (--moteur=vm).
+  Return False if the program cannot be compiled.
+  '''
+  from fralgo.lib import vm
+  from fralgo.lib.inference import Untyped
+  try:
+    main, _ = vm.compile_program(statements)
+  except Untyped as e:
+    timer.lap('compilation', f'impossible : {e.message}')
+    print_err(f'--moteur=vm : compilation impossible ({e.message}), exécution par l\'interpréteur')
+    return False
+  timer.lap('compilation')
+  vm.run(main)
+  return True
+
+def disassemble_program(algofile, statements):
+  from fralgo.lib import vm
+  from fralgo.lib.inference import Untyped
+  try:
+    vm.disassemble(*vm.compile_program(statements))
+  except Untyped as e:
+    print_err(f'{algofile} : compilation impossible ({e.message})')
+    sys.exit(1)
 
 def main():
+  selected, algofile, arguments = parse_args(sys.argv[1:])
+  if algofile is None:
+    banner()
+    sys.exit(1)
   try:
-    algofile = sys.argv[1]
     with open(algofile, 'r', encoding='utf-8') as f:
       prog = f.read()
       prog = prog[:-1]
   except FileNotFoundError:
     print_err(f'{algofile} : fichier non trouvé')
     sys.exit(1)
-  except IndexError:
-    print(r' _______ ______        _______ _____   _______ _______',  flush=True)
-    sleep(0.0625)
-    print(r'|    ___|   __ \______|   _   |     |_|     __|       |', flush=True)
-    sleep(0.0625)
-    print(r'|    ___|      <______|       |       |    |  |   -   |', flush=True)
-    sleep(0.0625)
-    print(r'|___|   |___|__|      |___|___|_______|_______|_______|', flush=True)
-    sleep(0.0625)
-    version = f'fr-v100 {__version__}mg'
-    print('|A|L|G|O|R|I|T|H|M|E|S|'.ljust(55-len(version)) + version)
-    print()
-    print('(c) 2024-2026 Stéphane MEYER (Teegre)', flush=True)
-    sleep(0.0625)
-    print()
-    sleep(0.0625)
-    print()
-    print('Donnez-moi un fichier ALGO en paramètre et je ferai de mon')
-    print("mieux pour lire et exécuter les instructions qu'il contient.")
-    print()
-    print('Exemple : fralgo monfichier.algo')
-    print()
-    sys.exit(1)
+
+  timer = Timer()
+
+  from fralgo.lib.datatypes import map_type
+  from fralgo.lib.ast import libs, namespaces, FreeFormArray
+  timer.lap('importation')
+
+  sym = namespaces.get_namespace('main')
 
   # Commandline arguments
-  args = [map_type(sys.argv[1])]
-  args += [map_type(arg) for arg in sys.argv[2:]]
+  args = [map_type(algofile)]
+  args += [map_type(arg) for arg in arguments]
   sym.declare_const('_ARGS', FreeFormArray(args), superglobal=True)
 
   # Current working directory
   rep = os.path.dirname(os.path.abspath(algofile))
   sym.declare_const('_REP', map_type(rep), superglobal=True)
 
+  if '--memoiser' in selected:
+    # memoisation is done by the interpreter only
+    from fralgo.lib import memo
+    memo.analyse = True
+    selected.pop('--compiler', None)
+    if selected.get('--moteur') == 'vm':
+      selected['--moteur'] = 'arbre'
+
+  if '--jit' in selected:
+    from fralgo.lib import jit
+    jit.enable()
+
+  if '--sans-numpy' in selected:
+    from fralgo.lib import vectors
+    vectors.use_numpy = False
+
   try:
     libs.set_main(algofile)
-    statements = parser.parse(prog)
-    statements.eval()
+    statements = None
+    if '--verifier' in selected:
+      statements = parse(algofile, prog, timer)
+      verify_program(statements, timer)
+    if '--compiler' in selected:
+      done, statements = compile_program(algofile, prog, timer, statements)
+      if done:
+        return
+    # The lexer and the parser are only built if there is no compiled tree.
+    if statements is None:
+      statements = parse(algofile, prog, timer)
+    if '-O' in selected:
+      from fralgo.lib.optimizer import optimize
+      libs.set_optimizer(optimize)
+      statements = optimize(statements)
+      timer.lap('optimisation')
+    if '--désassembler' in selected:
+      disassemble_program(algofile, statements)
+      return
+    if selected.get('--moteur') == 'vm' and run_vm(statements, timer):
+      return
+    if selected.get('--moteur') == 'fermetures':
+      from fralgo.lib.closures import compile_tree
+      run = compile_tree(statements)
+      timer.lap('compilation')
+      run()
+    elif selected.get('--moteur') == 'pile':
+      from fralgo.lib.trampoline import run
+      run(statements)
+    else:
+      statements.eval()
   except FatalError as e:
     print_err(f'Oh oh : {e.message}')
     print('\033[?25h\033[0m', end='')
     print('\033[?1049l')
     sys.exit(666)
+  finally:
+    if '--temps-demarrage' in selected:
+      timer.lap('exécution')
+      timer.report()
+    if '--stats' in selected:
+      from fralgo.lib.memo import report
+      report()
+      if '--jit' in selected:
+        from fralgo.lib.jit import report
+        report()
 
 if __name__ == "__main__":
   main()
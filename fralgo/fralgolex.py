@@ -82,6 +82,7 @@ class Lexer:
     'Lire':          'READ',
     'LireFichier':   'READFILE',
     'Longueur':      'LEN',
+    'Mémoïsée':      'MEMOIZED',
     'NON':           'NOT',
     'Numérique':     'TYPE_FLOAT',
     'OU':            'OR',
@@ -196,7 +197,7 @@ class Lexer:
     return t
 
   def t_ID(self, t):
-    r'[A-Za-zàéèî@\_][A-Za-zàéèî0-9@\_]*'
+    r'[A-Za-zàéèîï@\_][A-Za-zàéèîï0-9@\_]*'
     t.type = self.reserved.get(t.value, 'ID')
     return t
 
@@ -220,3 +221,13 @@ class Lexer:
     raise FralgoException(msg)
 
 lexer = lex(object=Lexer())
+
+def new_lexer():
+  '''
+  Return a lexer in its initial state. The master regex of `lexer` is
+  shared, so nothing is compiled again.
+  '''
+  clone = lexer.clone()
+  clone.input('')
+  clone.lineno = 1
+  return clone
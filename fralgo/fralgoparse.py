@@ -39,11 +39,13 @@ from fralgo.lib.ast import FreeFormArray, OpenFile, CloseFile, ReadFile, WriteFi
 from fralgo.lib.ast import Reference, UnixTimestamp, Import, GetTermSize, GetCursorPos
 from fralgo.lib.ast import StructureGetItem, StructureSetItem
 from fralgo.lib.ast import TableKeyExists, TableGetKeys, TableGetValues, TableEraseKey
-from fralgo.lib.ast import ToFloat, ToInteger, ToString, ToBoolean, Type, Random, Sleep, SizeOf
+from fralgo.lib.ast import ToFloat, ToInteger, ToString, ToBoolean, Type, Random, Sleep, SizeOf, Sum
 from fralgo.lib.ast import Panic, Continue, Exit, Shell, TimeZone
+from fralgo.lib.ast import libs
+from fralgo.lib.cache import get_cache_dir
 from fralgo.lib.datatypes import map_type
 from fralgo.lib.exceptions import FralgoException, FatalError
-from fralgo.fralgolex import Lexer, lex
+from fralgo.fralgolex import Lexer
 from fralgo.ply import yacc
 
 tokens = Lexer.tokens
@@ -112,9 +114,9 @@ def p_import_statement(p):
                    | IMPORT STRING TYPE_DECL ID NEWLINE
   '''
   if len(p) == 6:
-    p[0] = Node(Import(p[2], Lexer, lex, parser, p[4]), p.lineno(1))
+    p[0] = Node(Import(p[2], p[4]), p.lineno(1))
   else:
-    p[0] = Node(Import(p[2], Lexer, lex, parser), p.lineno(1))
+    p[0] = Node(Import(p[2]), p.lineno(1))
 
 def p_table_declaration(p):
   '''
@@ -574,11 +576,11 @@ def p_array_assignment(p):
   if isinstance(p[3], list):
     if isinstance(p[1], list):
       if p[1][1] == (None,): # sequence to array
-        p[0] = Node(ArraySetItem(p[1][0], p[3]), p.lineno(1))
+        p[0] = Node(ArraySetItem(p[1][0], p[3]), p.lineno(2))
       else: # structure in array
         p[0] = Node(StructureSetItem(ArrayGetItem(p[1][0], *p[1][1]), None, p[3]))
   else:
-    p[0] = Node(ArraySetItem(p[1][0], p[3], *p[1][1]), p.lineno(1))
+    p[0] = Node(ArraySetItem(p[1][0], p[3], *p[1][1]), p.lineno(2))
 
 def p_structure_assignment(p):
   '''
@@ -632,14 +634,21 @@ def p_namespace(p):
 
 def p_function_declaration(p):
   '''
-  function_declaration : FUNCTION ID LPAREN parameters RPAREN TYPE_DECL ftype NEWLINE func_body ENDFUNCTION NEWLINE
-                       | FUNCTION ID LPAREN RPAREN TYPE_DECL ftype NEWLINE func_body ENDFUNCTION NEWLINE
+  function_declaration : FUNCTION ID LPAREN parameters RPAREN TYPE_DECL ftype memoized NEWLINE func_body ENDFUNCTION NEWLINE
+                       | FUNCTION ID LPAREN RPAREN TYPE_DECL ftype memoized NEWLINE func_body ENDFUNCTION NEWLINE
   '''
 
-  if len(p) == 12:
-    p[0] = Node(Function(p[2], p[4], p[9], p[7]), p.lineno(1))
+  if len(p) == 13:
+    p[0] = Node(Function(p[2], p[4], p[10], p[7], p[8]), p.lineno(1))
   else:
-    p[0] = Node(Function(p[2], None, p[8], p[6]), p.lineno(1))
+    p[0] = Node(Function(p[2], None, p[9], p[6], p[7]), p.lineno(1))
+
+def p_memoized(p):
+  '''
+  memoized : MEMOIZED
+           |
+  '''
+  p[0] = len(p) == 2
 
 def p_func_body(p):
   '''
@@ -683,6 +692,9 @@ def p_function_call(p):
     params = None
   if isinstance(p[1], list):
     p[0] = Node(FunctionCall(p[1][1], params, p[1][0]), p.lineno(2))
+  elif p[1] == 'Somme' and params is not None and len(params) == 1:
+    # not a reserved word: Somme remains a valid name.
+    p[0] = Node(Sum(params[0], FunctionCall(p[1], params)), p.lineno(2))
   else:
     p[0] = Node(FunctionCall(p[1], params), p.lineno(2))
 
@@ -817,7 +829,7 @@ def p_while_block(p):
   '''
   while_block : WHILE expression NEWLINE statements ENDWHILE NEWLINE
   '''
-  p[0] = Node(While(p[2], p[4]), p.lineno(1))
+  p[0] = Node(While(p[2], p[4], lineno=p.lineno(1)), p.lineno(1))
 
 def p_for_block(p):
   '''
@@ -825,9 +837,9 @@ def p_for_block(p):
             | FOR var ARROW expression TO expression STEP expression NEWLINE statements var NEXT NEWLINE
   '''
   if len(p) == 12:
-    p[0] = Node(For(p[2], p[4], p[6], p[8], p[9]), p.lineno(1))
+    p[0] = Node(For(p[2], p[4], p[6], p[8], p[9], lineno=p.lineno(1)), p.lineno(1))
   else:
-    p[0] = Node(For(p[2], p[4], p[6], p[10], p[11], p[8]), p.lineno(1))
+    p[0] = Node(For(p[2], p[4], p[6], p[10], p[11], p[8], lineno=p.lineno(1)), p.lineno(1))
 
 def p_sequence(p):
   '''
@@ -1088,4 +1100,5 @@ def p_error(p):
     raise FatalError(msg)
   raise FralgoException(msg)
 
-parser = yacc.yacc()
+parser = yacc.yacc(tabdir=get_cache_dir())
+libs.set_parser(parser)
@@ -90,6 +90,10 @@ class Interpreter:
         case '.espaces':
           namespaces.namespaces()
           continue
+        case '.cache':
+          hits, misses, size = libs.cache_info()
+          print(f'*** Librairies en cache : {size} (succès : {hits}, échecs : {misses})')
+          continue
       if instruction.startswith('.symboles'):
         inst = instruction.split()
         try:
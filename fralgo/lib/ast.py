@@ -29,17 +29,15 @@ import os
 import sys
 from sys import stdin, stdout, stderr
 import operator
-from datetime import datetime
-from time import time, strftime, sleep
+import pickle
 from random import random
-from termios import tcgetattr, tcsetattr, CREAD, ECHO, ICANON, TCSADRAIN
-from collections import Counter
+from time import time, strftime, sleep
 
 from fralgo.lib.libman import LibMan
 from fralgo.lib.datatypes import map_type
-from fralgo.lib.datatypes import Array, Boolean, Char, Number, Float, Integer, String, Table
+from fralgo.lib.datatypes import Array, Base, Boolean, Char, Number, Float, Integer, String, Table
 from fralgo.lib.datatypes import Nothing, Structure, StructureData, _get_type
-from fralgo.lib.symbols import Namespaces
+from fralgo.lib.symbols import Namespaces, Symbols
 from fralgo.lib.file import new_file_descriptor, get_file_descriptor, clear_file_descriptor
 from fralgo.lib.exceptions import print_err
 from fralgo.lib.exceptions import FralgoException, BadType, InterruptedByUser, VarUndeclared, PanicException
@@ -50,7 +48,89 @@ namespaces = Namespaces(_get_type)
 libs = LibMan()
 libs.set_namespaces(namespaces)
 
+def resolve(node, sym, name):
+  '''
+  sym.get_variable(name), remembered by node as long as no declaration in
+  its scope, no global declaration and no change of namespace may have
+  changed what the name stands for.
+  '''
+  slot = node.slot
+  frames = sym.frames
+  scope = frames[-1].stamp if frames else 0
+  if slot is not None and slot[0] == Symbols.generation and slot[1] == scope:
+    return slot[2]
+  generation = Symbols.generation
+  var = sym.get_variable(name)
+  if isinstance(var, (Base, tuple)):
+    node.slot = generation, scope, var
+  return var
+
+# type → names of the slots of its instances, None if it has no slots
+_slots = {}
+
+def fields(node):
+  '''
+  The attributes of an object of the tree, {name: value}, whether they are
+  in slots or in a __dict__; None for plain values (numbers, strings...).
+  '''
+  cls = type(node)
+  try:
+    names = _slots[cls]
+  except KeyError:
+    names = _slots[cls] = tuple(name for klass in reversed(cls.__mro__)
+                                for name in klass.__dict__.get('__slots__', ())) \
+      if any('__slots__' in klass.__dict__ for klass in cls.__mro__) else None
+  attributes = getattr(node, '__dict__', None)
+  if attributes is None:
+    if names is None:
+      return None
+    attributes = {}
+  else:
+    attributes = dict(attributes)
+  for name in names or ():
+    try:
+      attributes[name] = getattr(node, name)
+    except AttributeError: # unset slot
+      pass
+  return attributes
+
+def subtree(node):
+  '''The nodes of a subtree, neither values nor closures'''
+  if isinstance(node, (list, tuple)):
+    for item in node:
+      yield from subtree(item)
+  elif type(node).__module__ == __name__:
+    yield node
+    for value in fields(node).values():
+      yield from subtree(value)
+
+def is_volatile(tree):
+  '''Whether a tree holds values computed when it was parsed'''
+  return any(isinstance(node, FreeFormArray) and node.volatile for node in subtree(tree))
+
+def substitute(node, replace):
+  '''
+  Return node, or replace(node) when it is not None, after the same
+  substitution in its subtree.
+  '''
+  if isinstance(node, list):
+    node[:] = [substitute(item, replace) for item in node]
+  elif isinstance(node, tuple):
+    return tuple(substitute(item, replace) for item in node)
+  elif type(node).__module__ == __name__:
+    other = replace(node)
+    if other is not None:
+      return other
+    for name, value in fields(node).items():
+      setattr(node, name, substitute(value, replace))
+    if isinstance(node, TypedBinOp):
+      node.left, node.right = node.operand(node.a), node.operand(node.b)
+  return node
+
 class Node:
+  __slots__ = ('statement', 'children', 'lineno')
+  # Report the depth of ALGO calls in error messages.
+  show_depth = False
   def __init__(self, stmt=None, lineno=0):
     self.statement = stmt
     self.children = []
@@ -88,6 +168,8 @@ class Node:
       print_err(f'Espace `{namespaces.current_namespace}`')
     if message:
       print_err(message)
+    if Node.show_depth and Symbols.depth():
+      print_err(f'Profondeur des appels : {Symbols.depth()}')
     if 'FRALGOREPL' not in os.environ:
       print_err(f'Ligne {self.lineno}')
       print('\033[?25h\033[0m', end='')
@@ -103,6 +185,7 @@ class Node:
     return f'Node({self.lineno}) {self.statement}'
 
 class Declare:
+  __slots__ = ('name', 'var_type')
   def __init__(self, name, var_type):
     self.name = name
     self.var_type = var_type
@@ -116,6 +199,7 @@ class Declare:
     return f'Variable {self.name} en {self.var_type}'
 
 class DeclareConst:
+  __slots__ = ('name', 'value')
   def __init__(self, name, value):
     self.name = name
     self.value = map_type(value)
@@ -130,6 +214,7 @@ class DeclareConst:
     return f'Constante {self.name} {self.value}'
 
 class DeclareArray:
+  __slots__ = ('name', 'var_type', 'max_indexes')
   def __init__(self, name, var_type, *max_indexes):
     self.name = name
     self.var_type = var_type
@@ -145,6 +230,7 @@ class DeclareArray:
     return f'Tableau {self.name}[{idx}] en {self.var_type}'
 
 class DeclareSizedChar:
+  __slots__ = ('name', 'size')
   def __init__(self, name, size):
     self.name = name
     self.size = size
@@ -155,6 +241,7 @@ class DeclareSizedChar:
     return f'Variable {self.name}*{self.size}'
 
 class DeclareTable:
+  __slots__ = ('name', 'key_type', 'value_type')
   def __init__(self, name, key_type, value_type):
     self.name = name
     self.key_type = key_type
@@ -166,11 +253,13 @@ class DeclareTable:
     return f'Table {self.name}'
 
 class DeclareStruct:
+  __slots__ = ('name', 'fields')
   __types = ('Booléen', 'Caractère', 'Chaîne', 'Entier', 'Numérique')
   def __init__(self, name, fields):
     self.name = name
     self.fields = fields
   def eval(self):
+    from collections import Counter
     structfields = [f for f, _ in self.fields]
     duplicates = [f for f, c in Counter(structfields).items() if c > 1]
     if duplicates:
@@ -191,6 +280,7 @@ class DeclareStruct:
     return f'Structure {self.name} {self.fields}'
 
 class ArrayGetItem:
+  __slots__ = ('var', 'indexes', 'namespace')
   def __init__(self, var, *indexes, namespace=None):
     self.var = var
     self.indexes = indexes
@@ -210,12 +300,17 @@ class ArrayGetItem:
     return f'{self.var.name}[{", ".join(indexes)}]'
 
 class ArraySetItem:
+  __slots__ = ('var', 'value', 'indexes', 'namespace', 'checked')
   def __init__(self, var, value, *indexes, namespace=None):
     self.var = var
     self.value = value
     self.indexes = indexes
     self.namespace = namespace
+    self.checked = False # types verified beforehand (--verifier)
   def eval(self):
+    if self.checked:
+      self.var.eval().set_item(self.indexes, self.value.eval())
+      return
     var = namespaces.get_variable(self.var.name, self.namespace)
     if isinstance(var, tuple):
       raise ReadOnlyValue(f'Constante `{self.var.name}` : valeur en lecture seule')
@@ -226,6 +321,7 @@ class ArraySetItem:
     return f'{self.var.name}[{", ".join(indexes)}] ← {self.value}'
 
 class ArrayResize:
+  __slots__ = ('var', 'indexes')
   def __init__(self, var, *indexes):
     self.var = var
     self.indexes = indexes
@@ -240,10 +336,13 @@ class ArrayResize:
     return f'Redim {self.var.name}[{", ".join(indexes)}]'
 
 class FreeFormArray(Array):
+  __slots__ = ('volatile',)
   def __init__(self, value):
     # FIXME: variables should not be evaluated when parsing
     # a function/procedure declaration!
     super().__init__(map_type(value[0]).data_type, len(value) - 1)
+    # values computed from variables depend on the state at parse time.
+    self.volatile = any(isinstance(v, (Variable, BinOp)) for v in value)
     self.value = [v.eval() if isinstance(v, (Variable, BinOp)) else v for v in value]
   def check(self):
     datatype = Array.get_datatype(self.value)
@@ -259,12 +358,17 @@ class FreeFormArray(Array):
     return self.value[index]
   def __len__(self):
     return len(self.value)
+  def __getstate__(self):
+    if self.volatile:
+      raise pickle.PicklingError('Tableau évalué pendant l\'analyse')
+    return None, fields(self)
   # def __repr__(self):
   #   return f'{[v.eval() for v in self.value]}'
   # def __str__(self):
   #   return f'{[v.eval() for v in self.value]}'
 
 class SizeOf:
+  __slots__ = ('var',)
   def __init__(self, var):
     self.var = var
   def eval(self):
@@ -296,6 +400,7 @@ class SizeOf:
     return f'Taille({self.var})'
 
 class TableKeyExists:
+  __slots__ = ('var', 'key')
   def __init__(self, var, key):
     self.var = var
     self.key = key
@@ -308,6 +413,7 @@ class TableKeyExists:
     return f'Existe({self.var.name}, {self.key})'
 
 class TableGetKeys:
+  __slots__ = ('var',)
   def __init__(self, var):
     self.var = var
   def eval(self):
@@ -323,6 +429,7 @@ class TableGetKeys:
     return f'Clefs({self.var})'
 
 class TableGetValues:
+  __slots__ = ('var',)
   def __init__(self, var):
     self.var = var
   def eval(self):
@@ -338,6 +445,7 @@ class TableGetValues:
     return f'Valeurs({self.var})'
 
 class TableEraseKey:
+  __slots__ = ('var', 'key')
   def __init__(self, var, key):
     self.var = var
     self.key = key
@@ -346,6 +454,7 @@ class TableEraseKey:
     var.delete_key(self.key.eval())
 
 class StructureGetItem:
+  __slots__ = ('name', 'field', 'namespace')
   def __init__(self, name, field, namespace=None):
     self.name = name
     self.field = field
@@ -373,6 +482,7 @@ class StructureGetItem:
     return f'{self.name}.{self.field}'
 
 class StructureSetItem:
+  __slots__ = ('var', 'field', 'value', 'namespace')
   def __init__(self, var, field, value, namespace=None):
     self.var = var
     self.field = field
@@ -409,17 +519,29 @@ class StructureSetItem:
 
 class Function:
   '''A function definition'''
-  def __init__(self, name, params, body, return_type=None):
+  __slots__ = ('name', 'params', 'body', 'return_type', 'memoized', 'checked', 'memo', 'namespace', 'names', 'ftype')
+  def __init__(self, name, params, body, return_type=None, memoized=False):
     self.name = name # str
     self.params = params # [(name, datatype)]
     self.body = body # Node
     self.return_type = return_type # str
+    self.memoized = memoized # Mémoïsée
+    self.checked = False # returned values verified beforehand (--verifier)
+    self.memo = None # results (Memo), False if not memoised, see fralgo.lib.memo
     self.namespace = namespaces.current_namespace
     if return_type is None:
       self.ftype = 'Procédure'
     else:
       self.ftype = 'Fonction'
+    # parameters and local variables, see Symbols.replace_local
+    self.names = local_names(params, body)
+    mark_tail_calls(body)
   def eval(self):
+    if self.memoized:
+      from fralgo.lib.memo import memoizable
+      if not memoizable(self):
+        raise BadType(f'`{self.name}` : seule une fonction dont les paramètres et le résultat '
+                      'sont de type simple peut être mémoïsée')
     sym = namespaces.get_namespace(self.namespace)
     sym.declare_function(self)
   def __repr__(self):
@@ -427,18 +549,71 @@ class Function:
       params = [f'{param[0]}{repr_datatype(param[1:], shortform=True)}' for param in self.params]
     else:
       params = ''
+    if self.memoized:
+      return f'Fonction {self.name}({", ".join(params)}) en {self.return_type} Mémoïsée'
     if self.return_type is not None:
       return f'Fonction {self.name}({", ".join(params)}) en {self.return_type}'
     return f'Procédure {self.name}({", ".join(params)})'
 
+def local_names(params, body):
+  '''Names of the parameters and of the variables declared in a function body'''
+  names = set()
+  for param in params or []:
+    names.add(param[0].name if isinstance(param[0], Reference) else param[0])
+  nodes = [body]
+  while nodes:
+    node = nodes.pop()
+    if isinstance(node, Node):
+      nodes.append(node.statement)
+      nodes.extend(node.children)
+    elif isinstance(node, (Declare, DeclareArray, DeclareConst, DeclareSizedChar, DeclareTable)):
+      names.add(node.name)
+  return names
+
+def mark_tail_calls(body):
+  '''
+  Flag the calls whose value is the value of the function: returned
+  calls and calls ending the body. See FunctionCall.call.
+  '''
+  nodes = [body]
+  while nodes:
+    node = nodes.pop()
+    if isinstance(node, Node):
+      nodes.append(node.statement)
+      nodes.extend(node.children)
+    elif isinstance(node, If):
+      nodes.extend((node.dothis, node.dothat))
+    elif isinstance(node, (While, For)):
+      nodes.append(node.dothis)
+    elif isinstance(node, FunctionReturn):
+      expression = node.expression
+      if isinstance(expression, Node) and not expression.children:
+        expression = expression.statement
+      if isinstance(expression, FunctionCall):
+        expression.tail = True
+  ends = [body]
+  while ends:
+    node = ends.pop()
+    if isinstance(node, Node):
+      ends.append(node.children[-1] if node.children else node.statement)
+    elif isinstance(node, If):
+      ends.extend((node.dothis, node.dothat))
+    elif isinstance(node, FunctionCall):
+      node.tail = True
+
 class FunctionCall:
   '''Function call'''
+  __slots__ = ('name', 'params', 'context', 'namespace', 'cnamespace', 'cache', 'plan', 'tail', 'checked')
   def __init__(self, name, params, namespace=None):
     self.name = name
     self.params = params
     self.context = None
     self.namespace = namespace if namespace else namespaces.current_namespace
     self.cnamespace = namespaces.current_namespace
+    self.cache = None # (function generation, function)
+    self.plan = None # (function, reference parameters, accepted argument types)
+    self.tail = False # see mark_tail_calls
+    self.checked = False # argument types verified beforehand (--verifier)
   def _check_param_count(self, params):
     if self.params is None and params is not None:
       x = len(params) # expected
@@ -448,60 +623,92 @@ class FunctionCall:
         a = len(self.params) # actual
         x = len(params) # expected
         raise FuncInvalidParameterCount(f'`{self.name}` nombre de paramètres invalide : {a}, attendu {x} ')
-  def _check_datatypes(self, params):
+  def _arguments(self, params, references, accepted):
+    '''
+    Evaluate each argument once and check its type against the parameter.
+    Return the values to bind: References and FreeFormArray are passed as is.
+    Generator: yields each argument to evaluate and receives its value.
+    See bind() for the same loop evaluating the arguments itself.
+    '''
+    values = []
+    if self.checked:
+      for p in self.params:
+        values.append((yield p))
+      return values
     for i, p in enumerate(self.params):
-      if isinstance(params[i][0], Reference):
-        # enable dereferencing
-        sym = namespaces.get_namespace(self.namespace)
-        sym.set_local_ref_context(dereference=True)
-        sym.set_local_ref_context_has_reference(has_reference=True)
-      p1 = params[i][1][0] if isinstance(params[i][1][0], tuple) else params[i][1:]
-      try:
-        if isinstance(p, (BinOp, Node, ArrayGetItem, StructureGetItem)):
-          p2 = map_type(p.eval())
-          p2 = p2.data_type
-        elif p.data_type == 'Quelconque':
-          p2 = map_type(p).data_type
-        else:
-          p2 = p.data_type
-      except AttributeError:
-        raise BadType(f'`{self.name}` : paramètre {i+1} invalide.')
-      p2 = (p2,) if not isinstance(p2, tuple) else p2
-      if p1 == p2:
-        continue
-      for n, q in enumerate(zip(p1, p2)):
-        match n:
-          case 0:
-            t1, t2 = q
-          case 1:
-            t3, t4 = q
-          case 2:
-            t5, t6 = q
-      ok = True
-      if isinstance(t1, tuple):
-        if t1[0] == t2 == 'Caractère':
-          continue
-        if t1[0] == 'Caractère' and t2 == 'Chaîne':
-          continue
-      if t1 == 'Chaîne' and t2 == 'Caractère':
-        continue
-      if t1 == 'Quelconque':
-        continue
-      if t1 == 'Numérique' and t2 == 'Entier':
-        continue
-      if t1 == t2 == 'Tableau':
-        if t3 == 'Chaîne' and t4[0] == 'Caractère':
-          ok &= True
-        elif t3 == 'Quelconque':
-          ok &= True
-        elif t3 != t4:
-          ok &= False
-        if t5 == -1 and not isinstance(t6, tuple):
-          ok &= True
+      if self._prepare(i, p, references):
+        try:
+          value = yield p
+          p2 = map_type(value).data_type
+        except AttributeError:
+          raise BadType(f'`{self.name}` : paramètre {i+1} invalide.')
+        self._accept(i, p2, params, accepted)
       else:
+        self._accept(i, self._static_type(i, p), params, accepted)
+        value = p if references[i] or issubclass(type(p), Array) else (yield p)
+      values.append(value)
+    return values
+  def _prepare(self, i, p, references):
+    '''
+    Enable dereferencing when parameter i is a reference.
+    Whether argument p has to be evaluated to know its type.
+    '''
+    if references[i]:
+      sym = namespaces.get_namespace(self.namespace)
+      sym.set_local_ref_context(dereference=True)
+      sym.set_local_ref_context_has_reference(has_reference=True)
+    return isinstance(p, (BinOp, Node, ArrayGetItem, StructureGetItem))
+  def _static_type(self, i, p):
+    '''Type of argument p, known without evaluating it'''
+    try:
+      if p.data_type == 'Quelconque':
+        return map_type(p).data_type
+      return p.data_type
+    except AttributeError:
+      raise BadType(f'`{self.name}` : paramètre {i+1} invalide.')
+  def _accept(self, i, p2, params, accepted):
+    '''Check type p2 of argument i, once per type'''
+    p2 = (p2,) if not isinstance(p2, tuple) else p2
+    if (i, p2) not in accepted:
+      self._check_datatype(i, params[i], p2)
+      accepted.add((i, p2))
+  def _check_datatype(self, i, param, p2):
+    p1 = param[1][0] if isinstance(param[1][0], tuple) else param[1:]
+    if p1 == p2:
+      return
+    for n, q in enumerate(zip(p1, p2)):
+      match n:
+        case 0:
+          t1, t2 = q
+        case 1:
+          t3, t4 = q
+        case 2:
+          t5, t6 = q
+    ok = True
+    if isinstance(t1, tuple):
+      if t1[0] == t2 == 'Caractère':
+        return
+      if t1[0] == 'Caractère' and t2 == 'Chaîne':
+        return
+    if t1 == 'Chaîne' and t2 == 'Caractère':
+      return
+    if t1 == 'Quelconque':
+      return
+    if t1 == 'Numérique' and t2 == 'Entier':
+      return
+    if t1 == t2 == 'Tableau':
+      if t3 == 'Chaîne' and t4[0] == 'Caractère':
+        ok &= True
+      elif t3 == 'Quelconque':
+        ok &= True
+      elif t3 != t4:
         ok &= False
-      if not ok:
-        raise BadType(f'`{self.name}` : type {repr_datatype(p1)} attendu [paramètre {i + 1}]')
+      if t5 == -1 and not isinstance(t6, tuple):
+        ok &= True
+    else:
+      ok &= False
+    if not ok:
+      raise BadType(f'`{self.name}` : type {repr_datatype(p1)} attendu [paramètre {i + 1}]')
   def _check_returned_type(self, rt, value):
     mv = map_type(value)
     if isinstance(rt, tuple): # Sized char.
@@ -518,88 +725,212 @@ class FunctionCall:
     if rt != mvdt:
       raise BadType(f'Type `{rt}` attendu [{mv.data_type}]')
   def eval(self):
+    if self.tail:
+      # made by the calling function, see call()
+      return self
+    func = self.function()
+    self.bind(func)
+    try:
+      key, result = self.recall(func)
+      if result is None:
+        result = func.body.eval()
+    except BaseException:
+      self.unbind()
+      raise
+    if isinstance(result, FunctionCall):
+      return self.call(func, key, result)
+    try:
+      value = self.result(func, result)
+      if key is not None:
+        func.memo.put(key, result)
+      return value
+    finally:
+      self.unbind()
+  def call(self, func, key, result, run=None):
+    '''
+    Finish the call of func, whose body made a call in tail position: that
+    call came back as a FunctionCall value. The calls in tail position are
+    made here, without nesting Python calls, and their scope replaces the
+    scope of their caller when nothing can tell the difference.
+    run(body) returns the result of a function body, body.eval() by default.
+    '''
+    calls = [(self, func, True, key)] # (call, function, scope still open, memo key)
+    try:
+      while isinstance(result, FunctionCall):
+        call = result
+        func = call.function()
+        call.bind(func)
+        caller, caller_func, _, caller_key = calls[-1]
+        if call.namespace == caller.namespace:
+          sym = namespaces.get_namespace(call.namespace)
+          if sym.replace_local(func.names):
+            calls.pop()
+            if calls and calls[-1] == (caller, caller_func, False, caller_key):
+              pass # checking the same result twice changes nothing
+            else:
+              calls.append((caller, caller_func, False, caller_key))
+        key, result = call.recall(func)
+        calls.append((call, func, True, key))
+        if result is None:
+          result = func.body.eval() if run is None else run(func.body)
+      while calls:
+        call, func, opened, key = calls.pop()
+        try:
+          value = call.result(func, result)
+          if key is not None:
+            func.memo.put(key, result)
+          result = value
+        finally:
+          call.unbind(opened)
+      return result
+    finally:
+      while calls:
+        call, _, opened, _ = calls.pop()
+        call.unbind(opened)
+  def recall(self, func):
+    '''
+    Key of the call among the remembered results of func, once the
+    parameters are bound, and the result remembered for it: (None, None)
+    when func is not memoised, (key, None) when the result is unknown.
+    '''
+    memo = func.memo
+    if memo is None:
+      from fralgo.lib.memo import memo_of
+      memo = memo_of(func)
+    if not memo:
+      return None, None
+    key = memo.key(namespaces.get_namespace(self.namespace).get_local_table(), func.params)
+    return key, memo.get(key)
+  def function(self):
+    '''
+    The called function, looked up by name again only when a function
+    declaration or the end of a scope may have replaced it.
+    '''
+    cache = self.cache
+    if cache is not None and cache[0] == Symbols.function_generation:
+      if self.name.startswith('@') and namespaces.current_namespace != self.namespace:
+        raise FralgoException('Accès à un symbole privé')
+      return cache[1]
+    generation = Symbols.function_generation
     func = namespaces.get_function(self.name, self.namespace)
+    self.cache = generation, func
+    return func
+  def _plan(self, func):
+    '''Reference parameters of func and argument types already accepted'''
+    plan = self.plan
+    if plan is None or plan[0] is not func:
+      self._check_param_count(func.params)
+      references = tuple(isinstance(param[0], Reference) for param in func.params)
+      plan = self.plan = func, references, set()
+    return plan
+  def bind(self, func):
+    '''
+    Open a new local scope and assign the parameters.
+    The arguments are evaluated here, as in binding(), without a generator.
+    '''
     params = func.params
+    sym = self._open()
+    if params is not None:
+      # check parameter count, once per function
+      _, references, accepted = self._plan(func)
+      values = []
+      if self.checked:
+        for p in self.params:
+          values.append(p.eval())
+      else:
+        for i, p in enumerate(self.params):
+          if self._prepare(i, p, references):
+            try:
+              value = p.eval()
+              p2 = map_type(value).data_type
+            except AttributeError:
+              raise BadType(f'`{self.name}` : paramètre {i+1} invalide.')
+            self._accept(i, p2, params, accepted)
+          else:
+            self._accept(i, self._static_type(i, p), params, accepted)
+            value = p if references[i] or issubclass(type(p), Array) else p.eval()
+          values.append(value)
+      self._assign(params, references, values, sym)
+    namespaces.set_current_namespace(self.namespace)
+  def binding(self, func):
+    '''
+    Open a new local scope and assign the parameters.
+    Generator: yields each argument to evaluate and receives its value.
+    '''
+    params = func.params
+    sym = self._open()
+    if params is not None:
+      # check parameter count, once per function
+      _, references, accepted = self._plan(func)
+      values = yield from self._arguments(params, references, accepted)
+      self._assign(params, references, values, sym)
+    namespaces.set_current_namespace(self.namespace)
+  def _open(self):
+    '''Open a new local scope, giving access to the references of the caller'''
     context = namespaces.get_current_context()
     namespaces.set_local(self.namespace, context_name=self.name)
     sym = namespaces.get_namespace(self.namespace)
     if context: # give access to references
       sym.set_local_ref_context(context.dereference)
-    if params is not None:
-      # check parameter count
-      self._check_param_count(params)
-      # check data types
-      self._check_datatypes(params)
-      # False if param is a Reference, True otherwise.
-      types = [not isinstance(param[0], Reference) for param in params]
-      # Evaluate everything but References and FreeFormArray (Array subclass)
-      values = [
-          param.eval()
-          if types[i] and not issubclass(type(param), Array)
-          else param
-          for i, param in enumerate(self.params)]
-      # set variables
-      for i, param in enumerate(params):
-        if isinstance(self.params[i], (Variable, StructureGetItem, ArrayGetItem)):
-          if self.params[i].namespace is None:
-            self.params[i].namespace = self.cnamespace
-        if isinstance(param[0], Reference):
-          sym.declare_ref(param[0].name, self.params[i])
-          continue
-        if len(param) == 4: # Array
-          n, _, t, s = param
-          if t == 'Quelconque':
-            t = self.params[i].data_type[1]
-          if s == -1:
-            if isinstance(self.params[i], (ArrayGetItem, StructureGetItem, Variable)):
-              array = self.params[i].eval()
-            else:
-              try:
-                array = namespaces.get_variable(self.params[i].name, self.params[i].namespace)
-              except AttributeError:
-                array = self.params[i]
-            if array is None:
-              array = self.params[i].eval()
-            if isinstance(array, tuple): # Constant!
-              array = array[1]
-            sym.declare_array(n, t, *array.indexes)
+    return sym
+  def _assign(self, params, references, values, sym):
+    '''Declare the parameters in the local scope sym and assign their values'''
+    for i, param in enumerate(params):
+      if isinstance(self.params[i], (Variable, StructureGetItem, ArrayGetItem)):
+        if self.params[i].namespace is None:
+          self.params[i].namespace = self.cnamespace
+      if references[i]:
+        sym.declare_ref(param[0].name, self.params[i])
+        continue
+      if len(param) == 4: # Array
+        n, _, t, s = param
+        if t == 'Quelconque':
+          t = self.params[i].data_type[1]
+        if s == -1:
+          if isinstance(self.params[i], (ArrayGetItem, StructureGetItem, Variable)):
+            array = values[i]
           else:
-            if isinstance(s, int):
-              sym.declare_array(n, t, s)
-            else:
-              sym.declare_array(n, t, *s)
-        elif isinstance(param[1], tuple): # Sized char
-          n, dt = param
-          _, s = dt
-          sym.declare_sized_char(n, s)
+            try:
+              array = namespaces.get_variable(self.params[i].name, self.params[i].namespace)
+            except AttributeError:
+              array = self.params[i]
+          if array is None:
+            array = self.params[i].eval()
+          if isinstance(array, tuple): # Constant!
+            array = array[1]
+          sym.declare_array(n, t, *array.indexes)
         else:
-          n, t = param
-          if t == 'Quelconque':
-            t = self.params[i].data_type
-          sym.declare_var(n, t)
-
-        sym.assign_value(n, values[i])
-
-    # function body
-    body = func.body
-
-    namespaces.set_current_namespace(self.namespace)
-
-    try:
-      result = body.eval()
-      if not isinstance(result, ProcTerminate) and result is not None:
-        if func.ftype == 'Procédure':
-          raise FralgoException(f'`{self.name}` : instruction `Retourne` inattendue')
+          if isinstance(s, int):
+            sym.declare_array(n, t, s)
+          else:
+            sym.declare_array(n, t, *s)
+      elif isinstance(param[1], tuple): # Sized char
+        n, dt = param
+        _, s = dt
+        sym.declare_sized_char(n, s)
+      else:
+        n, t = param
+        if t == 'Quelconque':
+          t = self.params[i].data_type
+        sym.declare_var(n, t)
+
+      sym.assign_value(n, values[i])
+  def result(self, func, result):
+    '''Check the value returned by the function body'''
+    if not isinstance(result, ProcTerminate) and result is not None:
+      if func.ftype == 'Procédure':
+        raise FralgoException(f'`{self.name}` : instruction `Retourne` inattendue')
+      if not func.checked:
         self._check_returned_type(func.return_type, result)
-        return result if not isinstance(result, bool) else map_type(result)
-      if func.ftype == 'Fonction':
-        raise FralgoException(f'`{self.name}` : instruction `Retourne` absente')
-    except FralgoException as e:
-      raise e
-    finally:
-      namespaces.del_local(self.namespace)
-      namespaces.set_current_namespace(self.cnamespace)
+      return result if not isinstance(result, bool) else map_type(result)
+    if func.ftype == 'Fonction':
+      raise FralgoException(f'`{self.name}` : instruction `Retourne` absente')
     return None
+  def unbind(self, scope=True):
+    '''Close the local scope, unless a tail call already replaced it'''
+    if scope:
+      namespaces.del_local(self.namespace)
+    namespaces.set_current_namespace(self.cnamespace)
   def __repr__(self):
     try:
       func = namespaces.get_function(self.name, self.namespace)
@@ -613,6 +944,7 @@ class FunctionCall:
       return f'{self.name}({", ".join(params)})'
 
 class FunctionReturn:
+  __slots__ = ('expression', 'namespace')
   def __init__(self, expression):
     self.expression = expression
     self.namespace = namespaces.current_namespace
@@ -625,49 +957,71 @@ class FunctionReturn:
     return f'Retourne {self.expression}'
 
 class ProcTerminate:
+  __slots__ = ()
   def eval(self):
     return self
   def __repr__(self):
     return 'Terminer'
 
 class Continue:
+  __slots__ = ()
   def eval(self):
     return self
   def __repr__(self):
     return 'Continuer'
 
 class Exit:
+  __slots__ = ()
   def eval(self):
     return self
   def __repr__(self):
     return 'Sortir'
 
 class Assign:
+  __slots__ = ('var', 'value', 'slot', 'checked')
   def __init__(self, var, value):
     self.var = var
     self.value = value
+    self.slot = None
+    self.checked = False # types verified beforehand (--verifier)
   def eval(self):
+    value = self.value
+    if not issubclass(type(value), Array):
+      value = value.eval()
+    self.assign(value)
+  def assign(self, value):
+    '''Assign an evaluated value'''
     if isinstance(self.var, list):
       namespace, name = self.var
     else:
       namespace, name = namespaces.current_namespace, self.var
     sym = namespaces.get_namespace(namespace)
-    value = self.value
-    if issubclass(type(value), Array):
-      sym.assign_value(name, value, namespace)
-    else:
-      sym.assign_value(name, value.eval(), namespace)
+    if self.checked:
+      resolve(self, sym, name).value = value
+      return
+    sym.assign_value(name, value, namespace, resolve(self, sym, name))
   def __repr__(self):
     return f'{self.var} ← {self.value}'
 
 class Variable:
+  __slots__ = ('name', 'namespace', 'slot')
   def __init__(self, name, namespace=None):
     self.name = name
     self.namespace = namespace if namespace is not None else namespaces.current_namespace
-  def eval(self):
+    self.slot = None
+  def lookup(self):
+    '''The symbol the variable currently stands for'''
+    slot = self.slot
+    scope = namespaces.get_namespace(self.namespace).scope()
+    if slot is not None and slot[0] == Symbols.generation and slot[1] == scope:
+      return slot[2]
+    generation = Symbols.generation
     var = namespaces.get_variable(self.name, self.namespace)
-    # sym = namespaces.get_namespace(self.namespace)
-    # var = sym.get_variable(self.name)
+    if isinstance(var, (Base, tuple)):
+      self.slot = generation, scope, var
+    return var
+  def eval(self):
+    var = self.lookup()
     if isinstance(var, tuple): # constant!
       var = var[1]
     if isinstance(var, (Boolean, Number, String, Variable)):
@@ -687,7 +1041,7 @@ class Variable:
     return False
   @property
   def data_type(self):
-    var = namespaces.get_variable(self.name, self.namespace)
+    var = self.lookup()
     if isinstance(var, tuple): # constant!
       var = map_type(var[1])
     return var.data_type
@@ -705,11 +1059,28 @@ class Variable:
     raise BadType(f'La variable `{self.name}` n\'est pas de type Table')
 
 class Reference(Variable):
+  __slots__ = ()
   def __repr__(self):
     return f'&{self.name}'
 
+class Counter(Variable):
+  '''
+  Counter of a `Pour` loop read in its body: while the loop runs, its
+  value is the plain int in cell (see For.unbox).
+  '''
+  __slots__ = ('cell',)
+  def __init__(self, variable, cell):
+    super().__init__(variable.name, variable.namespace)
+    self.cell = cell
+  def eval(self):
+    value = self.cell[0]
+    if value is None:
+      return Variable.eval(self)
+    return value
+
 class Print:
   '''Print statement. Display one or several elements'''
+  __slots__ = ('data', 'newline', 'err')
   def __init__(self, data, newline=True, err=False):
     self.data = data
     self.newline = newline
@@ -727,6 +1098,9 @@ class Print:
           continue
       # here we want to use the str method of the evaluated class.
       result.append(str(element.eval()))
+    self.write(result)
+  def write(self, result):
+    '''Print the elements converted to strings'''
     std = stdout if not self.err else stderr
     if self.newline:
       std.write(' '.join(result) + '\n')
@@ -738,6 +1112,7 @@ class Print:
     return f'Ecrire {self.data}'
 
 class PrintErr(Print):
+  __slots__ = ()
   def __init__(self, data, newline=True, err=True):
     super().__init__(data, newline, err)
 def __repr__(self):
@@ -747,6 +1122,7 @@ class Read:
   '''
   Read user input and assign value to a variable...
   '''
+  __slots__ = ('var', 'args')
   def __init__(self, var, *args):
     self.var = var
     self.args = args
@@ -785,26 +1161,95 @@ class Read:
   def __repr__(self):
     return f'Lire {self.var}'
 
+def _arithmetic(op, symbol):
+  def operation(a, b):
+    if isinstance(a, str) and isinstance(b, str):
+      raise BadType(f'E|N {symbol} E|N : Type Entier ou Numérique attendu')
+    try:
+      return op(a, b)
+    except TypeError:
+      raise BadType('Opération sur des types incompatibles')
+  return operation
+
+def _comparison(op):
+  def operation(a, b):
+    try:
+      return op(a, b)
+    except TypeError:
+      raise BadType('Opération sur des types incompatibles')
+  return operation
+
+def _logical(op, symbol):
+  def operation(a, b):
+    if isinstance(a, str) and isinstance(b, str):
+      raise BadType(f'E|N {symbol} E|N : Type Entier ou Numérique attendu')
+    return op(bool(a), bool(b))
+  return operation
+
+def _divide(a, b):
+  if not isinstance(a, (int, float)) and not isinstance(b, (int, float)):
+    raise BadType('E|N / E|N : Type Entier ou Numérique attendu')
+  if isinstance(a, int) and isinstance(b, int):
+    if b == 0:
+      raise ZeroDivide('Division par zéro')
+    return a // b
+  if isinstance(a, float) or isinstance(b, float):
+    if b == 0:
+      raise ZeroDivide('Division par zéro')
+    try:
+      return a / b
+    except TypeError:
+      pass
+  raise BadType('Opération sur des types incompatibles')
+
+def _int_divide(a, b):
+  if b == 0:
+    raise ZeroDivide('Division par zéro')
+  return a // b
+
+def _float_divide(a, b):
+  if b == 0:
+    raise ZeroDivide('Division par zéro')
+  return a / b
+
+def _multiply(a, b):
+  if not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
+    raise BadType('E|N * E|N : Type Entier ou Numérique attendu')
+  return a * b
+
+def _divisible(a, b):
+  return map_type(a % b == 0)
+
+def _concat(a, b):
+  if isinstance(a, str) and isinstance(b, str):
+    return a + b
+  raise BadType('C & C : Type Chaîne attendu')
+
+def _not(a, _):
+  return not bool(a)
+
 class BinOp:
-  __op = {
-      '+'   : operator.add,
-      '-'   : operator.sub,
-      '*'   : operator.mul,
-      '/'   : 'dummy',
-      '%'   : operator.mod,
-      'DP'  : 'dummy',
-      '^'   : operator.pow,
-      '&'   : 'dummy',
-      '='   : operator.eq,
-      '>'   : operator.gt,
-      '<'   : operator.lt,
-      '>='  : operator.ge,
-      '<='  : operator.le,
-      '<>'  : operator.ne,
-      'ET'  : operator.and_,
-      'OU'  : operator.or_,
-      'OUX' : operator.xor,
-      'NON' : operator.not_,
+  __slots__ = ('a', 'b', 'op')
+  # operator → operation on evaluated operands
+  operations = {
+      '+'   : _arithmetic(operator.add, '+'),
+      '-'   : _arithmetic(operator.sub, '-'),
+      '*'   : _multiply,
+      '/'   : _divide,
+      '%'   : _arithmetic(operator.mod, '%'),
+      'DP'  : _divisible,
+      '^'   : _arithmetic(operator.pow, '^'),
+      '&'   : _concat,
+      '='   : _comparison(operator.eq),
+      '>'   : _comparison(operator.gt),
+      '<'   : _comparison(operator.lt),
+      '>='  : _comparison(operator.ge),
+      '<='  : _comparison(operator.le),
+      '<>'  : _comparison(operator.ne),
+      'ET'  : _logical(operator.and_, 'ET'),
+      'OU'  : _logical(operator.or_, 'OU'),
+      'OUX' : _logical(operator.xor, 'OUX'),
+      'NON' : _not,
   }
   def __init__(self, op, a, b):
     self.a = a
@@ -813,38 +1258,13 @@ class BinOp:
   def eval(self):
     a = algo_to_python(self.a)
     b = algo_to_python(self.b)
-    op = self.__op.get(self.op, None)
-    comp = ('=', '<>', '<', '>', '<=', '>=')
-    if self.op == '/':
-      if not isinstance(a, (int, float)) and not isinstance(b, (int, float)):
-        raise BadType('E|N / E|N : Type Entier ou Numérique attendu')
-      if isinstance(a, int) and isinstance(b, int):
-        if b == 0:
-          raise ZeroDivide('Division par zéro')
-        op = operator.floordiv
-      elif isinstance(a, float) or isinstance(b, float):
-        if b == 0:
-          raise ZeroDivide('Division par zéro')
-        op = operator.truediv
-    elif self.op == '*':
-      if not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
-        raise BadType('E|N * E|N : Type Entier ou Numérique attendu')
-    elif self.op == 'DP':
-      return map_type(a % b == 0)
-    elif self.op == '&':
-      if isinstance(a, str) and isinstance(b, str):
-        return a + b
-      raise BadType('C & C : Type Chaîne attendu')
-    elif self.b is None:
-      return op(bool(a))
-    elif isinstance(a, str) and isinstance(b, str) and self.op not in comp:
-      raise BadType(f'E|N {self.op} E|N : Type Entier ou Numérique attendu')
     try:
-      if self.op in ('ET', 'OU', 'OUX'):
-        return op(bool(a), bool(b))
-      return op(a, b)
-    except TypeError:
-      raise BadType('Opération sur des types incompatibles')
+      return self.operations[self.op](a, b)
+    except BadType:
+      if isinstance(a, Array) or isinstance(b, Array):
+        from fralgo.lib.vectors import operate
+        return operate(self.op, a, b)
+      raise
   @property
   def data_type(self):
     value = map_type(self.eval())
@@ -854,7 +1274,29 @@ class BinOp:
       return f'{self.op} {self.a}'
     return f'{self.a} {self.op} {self.b}'
 
+class TypedBinOp(BinOp):
+  '''
+  Binary operation on operands whose types are known before the execution
+  (see fralgo.lib.optimizer.Specializer): the operation does not check
+  them again.
+  '''
+  __slots__ = ('operation', 'left', 'right')
+  # operands evaluating to a Python value at once
+  direct = (BinOp, Boolean, Counter, Float, Integer, String, Variable)
+  def __init__(self, op, a, b, operation):
+    super().__init__(op, a, b)
+    self.operation = operation
+    self.left = self.operand(a)
+    self.right = self.operand(b)
+  def operand(self, node):
+    if type(node) in self.direct or isinstance(node, TypedBinOp):
+      return node.eval
+    return lambda: algo_to_python(node)
+  def eval(self):
+    return self.operation(self.left(), self.right())
+
 class Neg:
+  __slots__ = ('value',)
   def __init__(self, value):
     self.value = value
   def eval(self):
@@ -869,6 +1311,7 @@ class Neg:
     return self.value.data_type
 
 class If:
+  __slots__ = ('condition', 'dothis', 'dothat')
   def __init__(self, condition, dothis, dothat):
     self.condition = condition
     self.dothis = dothis
@@ -889,31 +1332,62 @@ class If:
     return f'Si {self.condition} Alors {self.dothis}'
 
 class While:
-  def __init__(self, condition, dothis):
+  __slots__ = ('condition', 'dothis', 'lineno', 'compiled', 'countdown')
+  # Iterations before a loop is compiled, None: never (see fralgo.lib.jit).
+  # The iterations left are in countdown, unset until the loop first runs.
+  threshold = None
+  def __init__(self, condition, dothis, lineno=0):
     self.condition = condition
     self.dothis = dothis
+    self.lineno = lineno
+    self.compiled = None # (condition, body) closures, see fralgo.lib.jit
   def eval(self):
-    while self.condition.eval():
+    if self.compiled:
+      condition, dothis = self.compiled
+      countdown = None
+    else:
+      condition, dothis = self.condition.eval, self.dothis.eval
       try:
-        result = self.dothis.eval()
-        if isinstance(result, Continue):
-          continue
-        elif isinstance(result, Exit):
+        countdown = self.countdown
+      except AttributeError:
+        countdown = self.threshold
+    counting = countdown is not None
+    try:
+      while condition():
+        if countdown is not None:
+          countdown -= 1
+          if countdown <= 0:
+            from fralgo.lib.jit import compile_loop
+            countdown = None
+            if compile_loop(self):
+              condition, dothis = self.compiled
+        try:
+          result = dothis()
+          if isinstance(result, Continue):
+            continue
+          elif isinstance(result, Exit):
+            return None
+          elif result is not None:
+            return result
+        except KeyboardInterrupt:
+          print()
+          print('\033[?1049l', end='')
+          raise InterruptedByUser('Interrompu par l\'utilisateur')
+        except FralgoInterruption:
           return None
-        elif result is not None:
-          return result
-      except KeyboardInterrupt:
-        print()
-        print('\033[?1049l', end='')
-        raise InterruptedByUser('Interrompu par l\'utilisateur')
-      except FralgoInterruption:
-        return None
-    return None
+      return None
+    finally:
+      if counting:
+        self.countdown = countdown
   def __repr__(self):
     return f'TantQue {self.condition} → {self.dothis}'
 
 class For:
-  def __init__(self, v, b, e, dt, nv, s=Integer(1), namespace=None):
+  __slots__ = ('var', 'start', 'end', 'step', 'dothis', 'var_next', 'namespace', 'lineno', 'slot', 'compiled', 'counter', 'countdown')
+  # Iterations before a loop is compiled, None: never (see fralgo.lib.jit).
+  # The iterations left are in countdown, unset until the loop first runs.
+  threshold = None
+  def __init__(self, v, b, e, dt, nv, s=Integer(1), namespace=None, lineno=0):
     self.var = v.name
     self.start = b
     self.end = e
@@ -921,38 +1395,103 @@ class For:
     self.dothis = dt
     self.var_next = nv.name
     self.namespace = namespace
+    self.lineno = lineno
+    self.slot = None
+    self.compiled = None # (start, end, step, body) closures, see fralgo.lib.jit
+    self.counter = None # [value] read by the body, False if not unboxed, see unbox
   def eval(self):
     sym = namespaces.get_namespace(self.namespace)
     if self.var != self.var_next:
       raise FralgoException(f'Pour `{self.var}` ... `{self.var_next}` Suivant')
-    i = algo_to_python(self.start.eval())
-    end = algo_to_python(self.end.eval())
-    step = algo_to_python(self.step.eval())
-    sym.assign_value(self.var, i)
-    while i <= end if step > 0 else i >= end:
+    if self.compiled:
+      start, end, step, dothis = self.compiled
+      countdown = None
+    else:
+      start, end, step, dothis = self.start.eval, self.end.eval, self.step.eval, self.dothis.eval
       try:
-        result = self.dothis.eval()
-        if isinstance(result, Exit):
+        countdown = self.countdown
+      except AttributeError:
+        countdown = self.threshold
+    counting = countdown is not None
+    i = algo_to_python(start())
+    end = algo_to_python(end())
+    step = algo_to_python(step())
+    var = resolve(self, sym, self.var)
+    sym.assign_value(self.var, i, var=var)
+    if self.counter is None:
+      self.counter = self.unbox(sym.namespace)
+    counter = None
+    if self.counter and type(var) is Integer and type(i) is type(end) is type(step) is int:
+      # the counter is only stored into its variable when the loop ends
+      counter = self.counter
+    try:
+      while i <= end if step > 0 else i >= end:
+        if counter is not None:
+          counter[0] = i
+        if countdown is not None:
+          countdown -= 1
+          if countdown <= 0:
+            from fralgo.lib.jit import compile_loop
+            countdown = None
+            if compile_loop(self):
+              dothis = self.compiled[-1]
+        try:
+          result = dothis()
+          if isinstance(result, Exit):
+            return None
+        except KeyboardInterrupt:
+          print()
+          print('\033[?1049l', end='')
+          raise InterruptedByUser('Interrompu par l\'utilisateur')
+        except FralgoInterruption:
           return None
-      except KeyboardInterrupt:
-        print()
-        print('\033[?1049l', end='')
-        raise InterruptedByUser('Interrompu par l\'utilisateur')
-      except FralgoInterruption:
-        return None
-      if result is not None and not isinstance(result, Continue):
-        return result
-      try:
-        i += step
-      except TypeError:
-        i = i.eval()
-        i += step
-      sym.assign_value(self.var, i)
-    return None
+        if result is not None and not isinstance(result, Continue):
+          return result
+        try:
+          i += step
+        except TypeError:
+          i = i.eval()
+          i += step
+        if counter is None:
+          sym.assign_value(self.var, i, var=resolve(self, sym, self.var))
+      return None
+    finally:
+      if counter is not None:
+        counter[0] = None
+        var.value = i
+      if counting:
+        self.countdown = countdown
+  def unbox(self, namespace):
+    '''
+    Make the body read the counter from a cell rather than from its
+    variable, when nothing else may read or change it while the loop runs:
+    no function call (scoping is dynamic) and no assignment to the counter.
+    Return the cell, or False.
+    '''
+    name = self.var
+    for node in subtree(self.dothis):
+      if isinstance(node, FunctionCall):
+        return False
+      if isinstance(node, (Assign, For, Read, ReadFile)):
+        target = node.var
+      elif isinstance(node, StructureSetItem):
+        target = node.var[0] if isinstance(node.var, tuple) else node.var
+      else:
+        continue
+      if target == name or isinstance(target, list) and target[-1] == name:
+        return False
+    cell = [None]
+    def counter(node):
+      if type(node) is Variable and node.name == name and node.namespace == namespace:
+        return Counter(node, cell)
+      return None
+    self.dothis = substitute(self.dothis, counter)
+    return cell
   def __repr__(self):
     return f'Pour {self.var} ← {self.start} à {self.end} → {self.dothis}'
 
 class Len:
+  __slots__ = ('value',)
   def __init__(self, value):
     self.value = value
   def eval(self):
@@ -966,7 +1505,36 @@ class Len:
   def data_type(self):
     return 'Entier'
 
+class Sum:
+  '''Somme(T), unless a function named Somme is declared'''
+  __slots__ = ('value', 'call', 'generation')
+  def __init__(self, value, call=None):
+    self.value = value
+    self.call = call
+    self.generation = None # function generation when no Somme function was found
+  def function(self):
+    '''The declared function named Somme, None if there is none'''
+    call = self.call
+    if call is not None and self.generation != Symbols.function_generation:
+      try:
+        return call.function()
+      except VarUndeclared:
+        self.generation = Symbols.function_generation
+    return None
+  def eval(self):
+    func = self.function()
+    if func is not None:
+      return self.call.eval()
+    from fralgo.lib.vectors import total
+    return total(self.value if issubclass(type(self.value), Array) else self.value.eval())
+  def __repr__(self):
+    return f'Somme({self.value})'
+  @property
+  def data_type(self):
+    return map_type(self.eval()).data_type
+
 class Mid:
+  __slots__ = ('exp', 'start', 'length')
   def __init__(self, exp, start, length):
     self.exp = exp
     self.start = start
@@ -989,6 +1557,7 @@ class Mid:
     return 'Chaîne'
 
 class Trim:
+  __slots__ = ('exp', 'length', 'right', 'cmd')
   def __init__(self, exp, length, right=False):
     self.exp = exp
     self.length = length
@@ -1014,6 +1583,7 @@ class Trim:
     return 'Chaîne'
 
 class Find:
+  __slots__ = ('str1', 'str2')
   def __init__(self, str1, str2):
     self.str1 = str1
     self.str2 = str2
@@ -1034,6 +1604,7 @@ class Find:
     return 'Entier'
 
 class OpenFile:
+  __slots__ = ('filename', 'fd_number', 'access_mode_str', 'access_mode')
   def __init__(self, filename, fd, access_mode):
     self.filename = filename
     self.fd_number = fd
@@ -1057,6 +1628,7 @@ class OpenFile:
     return f'Ouvrir {self.filename} sur {self.fd_number} en {self.access_mode_str}'
 
 class ReadFile:
+  __slots__ = ('fd_number', 'var')
   def __init__(self, fd, var):
     self.fd_number = fd
     self.var = var
@@ -1074,6 +1646,7 @@ class ReadFile:
     return f'LireFichier {self.fd_number}, {self.var}'
 
 class WriteFile:
+  __slots__ = ('fd_number', 'var')
   def __init__(self, fd, var):
     self.fd_number = fd
     self.var = var
@@ -1091,6 +1664,7 @@ class WriteFile:
     return f'EcrireFichier {self.fd_number}, {self.var}'
 
 class EOF:
+  __slots__ = ('fd_number',)
   def __init__(self, fd):
     self.fd_number = fd
   def eval(self):
@@ -1102,6 +1676,7 @@ class EOF:
     return f'FDF({self.fd_number})'
 
 class CloseFile:
+  __slots__ = ('fd_number',)
   def __init__(self, fd):
     self.fd_number = fd
   def eval(self):
@@ -1114,6 +1689,7 @@ class CloseFile:
     return f'Fermer {self.fd_number}'
 
 class Chr:
+  __slots__ = ('value',)
   def __init__(self, value):
     self.value = value
   def eval(self):
@@ -1128,6 +1704,7 @@ class Chr:
     return 'Chaîne'
 
 class Ord:
+  __slots__ = ('value',)
   def __init__(self, value):
     self.value = value
   def eval(self):
@@ -1144,6 +1721,7 @@ class Ord:
     return 'Entier'
 
 class Type:
+  __slots__ = ('var',)
   def __init__(self, var):
     self.var = var
   def eval(self):
@@ -1160,6 +1738,7 @@ class Type:
     return f'Type({self.var})'
 
 class Panic:
+  __slots__ = ('data',)
   def __init__(self, data):
     self.data = data
   def eval(self):
@@ -1175,6 +1754,7 @@ class Panic:
     return f'Panique {self.data}'
 
 class ToInteger:
+  __slots__ = ('value',)
   def __init__(self, value):
     self.value = value
   def eval(self):
@@ -1191,6 +1771,7 @@ class ToInteger:
     return 'Entier'
 
 class ToFloat:
+  __slots__ = ('value',)
   def __init__(self, value):
     self.value = value
   def eval(self):
@@ -1207,6 +1788,7 @@ class ToFloat:
     return 'Numérique'
 
 class ToString:
+  __slots__ = ('value',)
   def __init__(self, value):
     self.value = value
   def eval(self):
@@ -1223,6 +1805,7 @@ class ToString:
     return 'Chaîne'
 
 class ToBoolean:
+  __slots__ = ('value',)
   def __init__(self, value):
     self.value = value
   def eval(self):
@@ -1239,6 +1822,7 @@ class ToBoolean:
     return 'Booléen'
 
 class Random:
+  __slots__ = ()
   def eval(self):
     return map_type(random())
   def __repr__(self):
@@ -1248,6 +1832,7 @@ class Random:
     return 'Numérique'
 
 class Sleep:
+  __slots__ = ('duration',)
   def __init__(self, duration):
     self.duration = duration
   def eval(self):
@@ -1260,6 +1845,7 @@ class Sleep:
     return f'Dormir({self.duration})'
 
 class UnixTimestamp:
+  __slots__ = ()
   def eval(self):
     return time()
   def __repr__(self):
@@ -1269,12 +1855,14 @@ class UnixTimestamp:
     return 'Numérique'
 
 class TimeZone:
+  __slots__ = ('timestamp', 'text')
   def __init__(self, timestamp=None, text=False):
     self.timestamp = timestamp if timestamp is not None else None
     self.text = text
   def eval(self):
     tzcode = '%Z' if self.text else '%z'
     if self.timestamp:
+      from datetime import datetime
       try:
         tz = datetime.fromtimestamp(self.timestamp.eval()).astimezone().strftime(tzcode)
       except ValueError:
@@ -1290,6 +1878,7 @@ class TimeZone:
     return 'Chaîne'
 
 class Shell:
+  __slots__ = ('cmd',)
   def __init__(self, cmd):
     self.cmd = cmd
   def eval(self):
@@ -1302,6 +1891,7 @@ class Shell:
     return map_type(r.stdout.decode()[:-1])
 
 class GetTermSize:
+  __slots__ = ()
   def eval(self):
     size = os.get_terminal_size(stdout.fileno())
     array = Array('Entier', 1)
@@ -1316,7 +1906,9 @@ class GetTermSize:
     return 'Tableau[1] en Entier'
 
 class GetCursorPos:
+  __slots__ = ()
   def eval(self):
+    from termios import tcgetattr, tcsetattr, CREAD, ECHO, ICANON, TCSADRAIN
     tty = os.ttyname(stdin.fileno())
     fd = os.open(tty, os.O_RDWR + os.O_NOCTTY)
     cflag, lflag = 2, 3
@@ -1351,14 +1943,11 @@ class GetCursorPos:
     return 'Tableau[1] en Entier'
 
 class Import:
-  def __init__(self, filename, Lexer, lex, parser, alias=None):
+  __slots__ = ('filename', 'alias')
+  def __init__(self, filename, alias=None):
     self.filename = filename
-    self.lexer = lex(object=Lexer())
-    self.parser = parser
     self.alias = alias
   def eval(self):
-    libs.set_lexer(self.lexer)
-    libs.set_parser(self.parser)
     libs.import_lib(self.filename, self.alias)
   def __str__(self):
     return repr(self)
@@ -1367,37 +1956,40 @@ class Import:
       return f'Importer "{self.filename}" Alias {self.alias}'
     return f'Importer "{self.filename}"'
 
+# Expressions algo_to_python evaluates until it gets a Python value.
+EVALUABLE = (
+    ArrayGetItem,
+    BinOp, Boolean,
+    Char, Chr,
+    EOF,
+    Find,
+    Len,
+    Neg, Number,
+    Ord,
+    Mid,
+    Node,
+    Nothing,
+    Random,
+    Shell,
+    SizeOf,
+    String,
+    StructureGetItem,
+    Sum,
+    TableKeyExists,
+    TimeZone,
+    ToBoolean, ToFloat, ToInteger, ToString,
+    Trim,
+    Type,
+    UnixTimestamp,
+    Variable,
+)
+
 def algo_to_python(expression):
   '''
   Evaluate an Algo expression/type to a Python type
   '''
-  types = (
-      ArrayGetItem,
-      BinOp, Boolean,
-      Char, Chr,
-      EOF,
-      Find,
-      Len,
-      Neg, Number,
-      Ord,
-      Mid,
-      Node,
-      Nothing,
-      Random,
-      Shell,
-      SizeOf,
-      String,
-      StructureGetItem,
-      TableKeyExists,
-      TimeZone,
-      ToBoolean, ToFloat, ToInteger, ToString,
-      Trim,
-      Type,
-      UnixTimestamp,
-      Variable,
-  )
   exp = expression
-  while isinstance(exp, types):
+  while isinstance(exp, EVALUABLE):
     exp = exp.eval()
   return exp
 
@@ -0,0 +1,147 @@
+'''Cache'''
+#  _______ ______        _______ _____   _______ _______
+# |    ___|   __ \______|   _   |     |_|     __|       |
+# |    ___|      <______|       |       |    |  |   -   |
+# |___|   |___|__|      |___|___|_______|_______|_______|
+#
+# This file is part of FRALGO
+# Copyright © 2024-2026 Stéphane MEYER (Teegre)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+# OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import hashlib
+import os
+import pickle
+
+def get_cache_dir(*subdirs):
+  '''
+  Return the cache directory of FRALGO, or None if caching is disabled.
+  $FRALGO_CACHE overrides the default location ($XDG_CACHE_HOME/fralgo),
+  an empty $FRALGO_CACHE disables caching.
+  '''
+  cachedir = os.getenv('FRALGO_CACHE')
+  if cachedir is None:
+    base = os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    cachedir = os.path.join(base, 'fralgo')
+  elif not cachedir:
+    return None
+  return os.path.join(cachedir, *subdirs)
+
+# Compiled trees (.algoc)
+
+_fingerprint = None
+
+def _interpreter_fingerprint():
+  '''
+  Identify the interpreter that produced a tree: the version number and the
+  size and modification time of its sources, so that a tree is never
+  loaded by an interpreter whose AST classes differ.
+  '''
+  global _fingerprint
+  if _fingerprint is None:
+    from fralgo import __version__
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha256(__version__.encode('utf-8'))
+    for directory in (root, os.path.join(root, 'lib')):
+      for name in sorted(os.listdir(directory)):
+        if name.endswith('.py'):
+          st = os.stat(os.path.join(directory, name))
+          digest.update(f'{name}:{st.st_size}:{st.st_mtime_ns}'.encode('utf-8'))
+    _fingerprint = digest.hexdigest()
+  return _fingerprint
+
+def _cache_filename(subdir, key, extension):
+  cachedir = get_cache_dir(subdir)
+  if cachedir is None:
+    return None
+  key = key.encode('utf-8')
+  return os.path.join(cachedir, hashlib.sha256(key).hexdigest()[:32] + extension)
+
+def _tree_filename(path, namespace):
+  return _cache_filename('ast', f'{os.path.abspath(path)}\0{namespace}', '.algoc')
+
+def _code_filename(path):
+  return _cache_filename('py', os.path.abspath(path), '.algopy')
+
+def _source_hash(source):
+  return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+def _load(filename, source, field):
+  if filename is None:
+    return None
+  try:
+    with open(filename, 'rb') as f:
+      data = pickle.load(f)
+  except Exception:
+    # Missing, truncated or incompatible file: parse again.
+    return None
+  if not isinstance(data, dict):
+    return None
+  if data.get('interpreter') != _interpreter_fingerprint():
+    return None
+  if data.get('source') != _source_hash(source):
+    return None
+  return data.get(field)
+
+def _store(filename, source, field, value):
+  if filename is None or value is None:
+    return
+  data = {
+    'interpreter': _interpreter_fingerprint(),
+    'source': _source_hash(source),
+    field: value,
+  }
+  try:
+    payload = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+  except (pickle.PicklingError, RecursionError, TypeError, AttributeError):
+    return
+  import tempfile
+  try:
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    fd, tmpname = tempfile.mkstemp(dir=os.path.dirname(filename), prefix='.algoc-')
+    with os.fdopen(fd, 'wb') as f:
+      f.write(payload)
+    os.replace(tmpname, filename)
+  except OSError:
+    pass
+
+def load_tree(path, source, namespace='main'):
+  '''
+  Return the tree previously parsed from `source` (file `path`, parsed in
+  `namespace`) or None if there is no up-to-date compiled tree.
+  '''
+  return _load(_tree_filename(path, namespace), source, 'tree')
+
+def store_tree(path, source, tree, namespace='main'):
+  '''Save a parsed tree. Trees that cannot be serialized are not cached.'''
+  _store(_tree_filename(path, namespace), source, 'tree', tree)
+
+# Python translations (--compiler)
+
+def load_code(path, source):
+  '''
+  Return the translation of `source` previously stored by store_code:
+  (python source, ALGO line numbers), the reason why the program cannot
+  be translated, None if nothing is stored.
+  '''
+  return _load(_code_filename(path), source, 'code')
+
+def store_code(path, source, code):
+  '''Save a translation, or the reason why the program cannot be translated'''
+  _store(_code_filename(path), source, 'code', code)
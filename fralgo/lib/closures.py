@@ -0,0 +1,308 @@
+'''Closure compiler'''
+#  _______ ______        _______ _____   _______ _______
+# |    ___|   __ \______|   _   |     |_|     __|       |
+# |    ___|      <______|       |       |    |  |   -   |
+# |___|   |___|__|      |___|___|_______|_______|_______|
+#
+# This file is part of FR-ALGO
+# Copyright © 2024-2026 Stéphane MEYER (Teegre)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+# OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from sys import stdout, stderr
+
+from fralgo.lib.ast import namespaces, algo_to_python, resolve, EVALUABLE
+from fralgo.lib.ast import Assign, BinOp, Continue, Exit, For, FunctionCall, FunctionReturn
+from fralgo.lib.ast import If, Node, Print, PrintErr, Reference, TypedBinOp, Variable, While
+from fralgo.lib.datatypes import Array, Boolean, Number, String, map_type
+from fralgo.lib.exceptions import BadType, FralgoException, FralgoInterruption, InterruptedByUser
+
+# Python values algo_to_python returns as they are.
+PLAIN = (int, float, str, bool)
+
+# node type → function returning the closure of a node.
+COMPILERS = {}
+
+# Function bodies, compiled on their first call.
+_bodies = {}
+
+def compiles(*node_types):
+  def register(compiler):
+    for node_type in node_types:
+      COMPILERS[node_type] = compiler
+    return compiler
+  return register
+
+def compile_tree(tree):
+  '''
+  Turn a parsed tree into nested closures.
+  Return a callable behaving like tree.eval()
+  '''
+  return compile_node(tree)
+
+def compile_node(node):
+  compiler = COMPILERS.get(type(node))
+  if compiler is None:
+    # not specialised: tree walk
+    return node.eval
+  return compiler(node)
+
+def compile_body(body):
+  code = _bodies.get(body)
+  if code is None:
+    code = _bodies[body] = compile_node(body)
+  return code
+
+def compile_operand(node):
+  '''Closure returning algo_to_python(node)'''
+  if not isinstance(node, EVALUABLE):
+    return lambda: node
+  code = compile_node(node)
+  def operand():
+    value = code()
+    if type(value) in PLAIN:
+      return value
+    return algo_to_python(value)
+  return operand
+
+@compiles(Node)
+def compile_sequence(node):
+  statement = compile_node(node.statement) if node.statement else None
+  children = [compile_node(child) for child in node.children]
+  handle_err = node.handle_err
+  if statement is not None and not children:
+    def sequence():
+      try:
+        return statement()
+      except RecursionError:
+        handle_err('STOP : excès de récursivité !')
+      except FralgoException as e:
+        handle_err(e.message)
+    return sequence
+  def sequence():
+    try:
+      if statement is not None:
+        result = statement()
+        if result is not None:
+          return result
+      for child in children:
+        result = child()
+        if result is not None:
+          return result
+      return None
+    except RecursionError:
+      handle_err('STOP : excès de récursivité !')
+    except FralgoException as e:
+      handle_err(e.message)
+  return sequence
+
+@compiles(Variable, Reference)
+def compile_variable(node):
+  lookup = node.lookup
+  def variable():
+    var = lookup()
+    if isinstance(var, tuple): # constant!
+      var = var[1]
+    if isinstance(var, (Boolean, Number, String, Variable)):
+      return var.eval()
+    return var
+  return variable
+
+@compiles(BinOp)
+def compile_binop(node):
+  op = node.op
+  operation = BinOp.operations[op]
+  a = compile_operand(node.a)
+  b = compile_operand(node.b)
+  def binop():
+    x = a()
+    y = b()
+    try:
+      return operation(x, y)
+    except BadType:
+      if isinstance(x, Array) or isinstance(y, Array):
+        from fralgo.lib.vectors import operate
+        return operate(op, x, y)
+      raise
+  return binop
+
+@compiles(TypedBinOp)
+def compile_typed_binop(node):
+  operation = node.operation
+  a = compile_operand(node.a)
+  b = compile_operand(node.b)
+  return lambda: operation(a(), b())
+
+@compiles(Assign)
+def compile_assign(node):
+  get_namespace = namespaces.get_namespace
+  if issubclass(type(node.value), Array):
+    array = node.value
+    value = lambda: array
+  else:
+    value = compile_node(node.value)
+  if isinstance(node.var, list):
+    namespace, name = node.var
+    def assign():
+      sym = get_namespace(namespace)
+      sym.assign_value(name, value(), namespace, resolve(node, sym, name))
+  elif node.checked:
+    name = node.var
+    def assign():
+      # types verified beforehand (--verifier)
+      resolve(node, get_namespace(namespaces.current_namespace), name).value = value()
+  else:
+    name = node.var
+    def assign():
+      namespace = namespaces.current_namespace
+      sym = get_namespace(namespace)
+      sym.assign_value(name, value(), namespace, resolve(node, sym, name))
+  return assign
+
+@compiles(If)
+def compile_if(node):
+  condition = compile_node(node.condition)
+  dothis = compile_node(node.dothis)
+  dothat = compile_node(node.dothat) if node.dothat is not None else None
+  def branch():
+    if condition():
+      return dothis()
+    if dothat is not None:
+      return dothat()
+    return None
+  return branch
+
+@compiles(While)
+def compile_while(node):
+  condition = compile_node(node.condition)
+  dothis = compile_node(node.dothis)
+  def loop():
+    while condition():
+      try:
+        result = dothis()
+        if isinstance(result, Continue):
+          continue
+        elif isinstance(result, Exit):
+          return None
+        elif result is not None:
+          return result
+      except KeyboardInterrupt:
+        print()
+        print('\033[?1049l', end='')
+        raise InterruptedByUser('Interrompu par l\'utilisateur')
+      except FralgoInterruption:
+        return None
+    return None
+  return loop
+
+@compiles(For)
+def compile_for(node):
+  get_namespace = namespaces.get_namespace
+  var, var_next, namespace = node.var, node.var_next, node.namespace
+  start = compile_node(node.start)
+  end = compile_node(node.end)
+  step = compile_node(node.step)
+  dothis = compile_node(node.dothis)
+  def loop():
+    sym = get_namespace(namespace)
+    if var != var_next:
+      raise FralgoException(f'Pour `{var}` ... `{var_next}` Suivant')
+    i = algo_to_python(start())
+    last = algo_to_python(end())
+    increment = algo_to_python(step())
+    sym.assign_value(var, i, var=resolve(node, sym, var))
+    while i <= last if increment > 0 else i >= last:
+      try:
+        result = dothis()
+        if isinstance(result, Exit):
+          return None
+      except KeyboardInterrupt:
+        print()
+        print('\033[?1049l', end='')
+        raise InterruptedByUser('Interrompu par l\'utilisateur')
+      except FralgoInterruption:
+        return None
+      if result is not None and not isinstance(result, Continue):
+        return result
+      try:
+        i += increment
+      except TypeError:
+        i = i.eval()
+        i += increment
+      sym.assign_value(var, i, var=resolve(node, sym, var))
+    return None
+  return loop
+
+@compiles(Print, PrintErr)
+def compile_print(node):
+  # BinOp and Variable elements are evaluated twice, as in Print.eval.
+  elements = [(isinstance(e, (BinOp, Variable)), compile_node(e)) for e in node.data]
+  std = stdout if not node.err else stderr
+  end = '\n' if node.newline else ''
+  def display():
+    result = []
+    for twice, element in elements:
+      if twice and isinstance(element(), bool):
+        result.append(str(map_type(element())))
+        continue
+      result.append(str(element()))
+    std.write(' '.join(result) + end)
+    std.flush()
+  return display
+
+def run_body(body):
+  return compile_body(body)()
+
+@compiles(FunctionCall)
+def compile_call(node):
+  if node.tail:
+    # made by the calling function, see FunctionCall.call
+    return lambda: node
+  function, bind, recall, result, unbind = node.function, node.bind, node.recall, node.result, node.unbind
+  def call():
+    func = function()
+    bind(func)
+    try:
+      key, value = recall(func)
+      if value is None:
+        value = compile_body(func.body)()
+    except BaseException:
+      unbind()
+      raise
+    if isinstance(value, FunctionCall):
+      return node.call(func, key, value, run_body)
+    try:
+      returned = result(func, value)
+      if key is not None:
+        func.memo.put(key, value)
+      return returned
+    finally:
+      unbind()
+  return call
+
+@compiles(FunctionReturn)
+def compile_return(node):
+  get_namespace = namespaces.get_namespace
+  namespace = node.namespace
+  expression = compile_node(node.expression)
+  def ret():
+    if get_namespace(namespace).is_local_function():
+      return expression()
+    raise FralgoException('Erreur de syntaxe : `Retourne` en dehors d\'une fonction')
+  return ret
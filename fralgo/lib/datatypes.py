@@ -25,6 +25,7 @@
 # TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
 # OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+import array as arrays
 import os
 from copy import deepcopy
 
@@ -33,8 +34,10 @@ from fralgo.lib.exceptions import ArrayInvalidSize, ArrayResizeFailed, InvalidCh
 from fralgo.lib.exceptions import InvalidStructureValueCount, UnknownStructureField, KeyNotFound
 
 class Base:
+  # Values are held by millions: no __dict__, every subclass declares its
+  # slots. Any changes its __class__, so its subclasses add none.
+  __slots__ = ('value',)
   _type = 'Base'
-  value = None
   def eval(self):
     raise NotImplementedError
   def set_value(self, value):
@@ -51,8 +54,15 @@ class Base:
     return self._type
 
 class Nothing:
+  # It has no state: Nothing() is always the same object.
+  __slots__ = ()
   _type = 'Rien'
   value = None
+  _instance = None
+  def __new__(cls):
+    if cls._instance is None:
+      cls._instance = super().__new__(cls)
+    return cls._instance
   def eval(self):
     raise VarUndefined('Valeur indéfinie.')
   def __str__(self):
@@ -76,6 +86,7 @@ class Nothing:
     return self._type
 
 class Number(Base):
+  __slots__ = ()
   def set_value(self, value):
     raise NotImplementedError
   def eval(self):
@@ -116,6 +127,7 @@ class Number(Base):
     return str(self.value)
 
 class Integer(Number):
+  __slots__ = ()
   _type = 'Entier'
   def __init__(self, value):
     self.value = value if value is not None else Nothing()
@@ -128,6 +140,7 @@ class Integer(Number):
       raise BadType(f'Type `{self.data_type}` attendu [{value}]')
 
 class Float(Number):
+  __slots__ = ()
   _type = 'Numérique'
   def __init__(self, value):
     self.value = value if value is not None else Nothing()
@@ -142,6 +155,7 @@ class Float(Number):
       raise BadType(f'Type `{self.data_type}` attendu [{value}]')
 
 class String(Base):
+  __slots__ = ()
   _type = 'Chaîne'
   def __init__(self, value):
     self.value = value if value is not None else Nothing()
@@ -194,6 +208,7 @@ class String(Base):
     return f'"{self.value.encode("unicode_escape").decode("ASCII")}"'
 
 class Char(String):
+  __slots__ = ('size',)
   _type = 'Caractère'
   def __init__(self, value, size=Integer(1)):
     super().__init__(value)
@@ -228,6 +243,7 @@ class Char(String):
     return (self._type, self.size.eval())
 
 class Boolean(Base):
+  __slots__ = ()
   _type = 'Booléen'
   def __init__(self, value):
     if value in ('VRAI', 'FAUX'):
@@ -284,19 +300,108 @@ class Boolean(Base):
       return '?'
     return 'VRAI' if self.value else 'FAUX'
 
+class TypedBuffer:
+  '''
+  Elements of an array of Entier, Numérique or Booléen: the values in an
+  array.array, whether each one is defined in a bitmap.
+  Elements are boxed when they are read.
+  '''
+  __slots__ = ('box', 'datatype', 'values', 'defined')
+  # element type → (array.array type code, box)
+  CODES = {'Entier': ('q', Integer), 'Numérique': ('d', Float), 'Booléen': ('b', Boolean)}
+  def __init__(self, datatype, size):
+    code, self.box = self.CODES[datatype]
+    self.datatype = datatype
+    self.values = arrays.array(code, [0]) * size
+    self.defined = bytearray((size + 7) // 8)
+  @classmethod
+  def of(cls, datatype, values):
+    '''Buffer whose elements are all defined: values is an array.array or a list'''
+    buffer = cls(datatype, 0)
+    code = buffer.values.typecode
+    if not isinstance(values, arrays.array):
+      try:
+        values = arrays.array(code, values)
+      except OverflowError:
+        values = list(values)
+    buffer.values = values
+    size = len(values)
+    buffer.defined = bytearray(b'\xff' * (size // 8))
+    if size % 8:
+      buffer.defined.append((1 << (size % 8)) - 1)
+    return buffer
+  def __len__(self):
+    return len(self.values)
+  def __getitem__(self, index):
+    if type(index) is not int or index < 0:
+      return list(self)[index]
+    if self.defined[index >> 3] >> (index & 7) & 1:
+      value = self.values[index]
+      return self.box(value if self.datatype != 'Booléen' else bool(value))
+    self.values[index] # IndexError
+    return self.box(None)
+  def get(self, index, default=None):
+    '''Value of an element, not boxed, default if it is undefined'''
+    if self.defined[index >> 3] >> (index & 7) & 1:
+      value = self.values[index]
+      return value if self.datatype != 'Booléen' else bool(value)
+    return default
+  def __setitem__(self, index, value):
+    if index < 0:
+      index += len(self.values)
+    if isinstance(value, Base):
+      if value.is_empty:
+        self.values[index] = 0
+        self.defined[index >> 3] &= ~(1 << (index & 7))
+        return
+      value = value.value
+    try:
+      self.values[index] = value
+    except OverflowError:
+      # Entier beyond 64 bits: the values are kept as Python ints from now on
+      self.values = list(self.values)
+      self.values[index] = value
+    self.defined[index >> 3] |= 1 << (index & 7)
+  def __iter__(self):
+    for index in range(len(self.values)):
+      yield self[index]
+  def count(self):
+    '''Number of defined elements'''
+    return int.from_bytes(self.defined, 'little').bit_count()
+  def __eq__(self, other):
+    if isinstance(other, TypedBuffer) and self.count() == len(self) == other.count():
+      return self.values == other.values
+    return list(self) == list(other)
+  def __ne__(self, other):
+    return not self == other
+  def __gt__(self, other):
+    return list(self) > list(other)
+  def __ge__(self, other):
+    return list(self) >= list(other)
+  def __lt__(self, other):
+    return list(self) < list(other)
+  def __le__(self, other):
+    return list(self) <= list(other)
+  def __repr__(self):
+    return repr(list(self))
+
 class Array(Base):
+  __slots__ = ('datatype', 'indexes', 'sizes', 'strides', 'get_structure')
   _type = 'Tableau'
 
   @classmethod
   def get_datatype(cls, value):
-    if isinstance(value, list) or issubclass(type(value), Array):
+    if isinstance(value, (list, TypedBuffer)) or issubclass(type(value), Array):
       return cls.get_datatype(value[0])
     return map_type(value).data_type
   @classmethod
   def check_types(cls, value, expected, datatype=None, index=None):
+    if isinstance(value, TypedBuffer):
+      # typed: the first element tells the type of all of them
+      value = [value[0]] if len(value) else []
     if isinstance(value, list) or issubclass(type(value), Array):
       for i, e in enumerate(value):
-        if isinstance(e, list) or issubclass(type(e), Array):
+        if isinstance(e, (list, TypedBuffer)) or issubclass(type(e), Array):
           if index is None:
             cls.check_types(e, expected, datatype, (i,))
           else:
@@ -309,59 +414,93 @@ class Array(Base):
             badtype = map_type(e).data_type
             raise BadType(f'Type `{badtype}` invalide à l\'index [{indexes}] : attendu `{expected}`')
   @classmethod
+  def nested(cls, value):
+    '''Tell if value holds its elements in nested lists (literal [[1, 2], [3, 4]])'''
+    return isinstance(value, list) and len(value) > 0 \
+      and (isinstance(value[0], list) or issubclass(type(value[0]), Array))
+  @classmethod
+  def flatten(cls, value):
+    '''The elements of nested lists, in the order of a flat storage'''
+    for e in value:
+      if isinstance(e, list) or issubclass(type(e), Array):
+        yield from cls.flatten(e)
+      else:
+        yield e
+  @classmethod
   def get_indexes(cls, value):
-    if (isinstance(value, list) or issubclass(type(value), Array)) and len(value) > 0:
-      if isinstance(value[0], list) or issubclass(type(value[0]), Array):
+    if (isinstance(value, (list, TypedBuffer)) or issubclass(type(value), Array)) and len(value) > 0:
+      if isinstance(value[0], (list, TypedBuffer)) or issubclass(type(value[0]), Array):
         size = len(value[0]) - 1
         for idx, e in enumerate(value):
-          if (isinstance(e, list) or issubclass(type(e), Array)) and size != len(e) - 1:
+          if (isinstance(e, (list, TypedBuffer)) or issubclass(type(e), Array)) and size != len(e) - 1:
             raise ArrayInvalidSize(f'Taille invalide à l\'index {idx} : {len(e)} ({size+1})')
       return (len(value) - 1,) + cls.get_indexes(value[0])
     return ()
-  @classmethod
-  def multi_len(cls, value):
-    count = 0
-    if isinstance(value, list) or issubclass(type(value), Array):
-      for e in value:
-        count += cls.multi_len(e)
-    else:
-      if not isinstance(value.value, Nothing):
-        count += 1
-    return count
 
   def __init__(self, datatype, *indexes):
     # http://cours.pise.info/algo/tableaux.htm
     # http://cours.pise.info/algo/tableauxmulti.htm
     self.datatype = datatype # array content type
-    self.indexes = indexes # max index(es)
-    self.sizes = tuple(idx + 1 for idx in indexes) # size(s)
+    self.reshape(indexes)
     self.value = None
     self.get_structure = None
+  def reshape(self, indexes):
+    '''
+    Set the max index(es), the size(s) and the strides: the element at
+    [i, j] of a [n, m] array is self.value[i * m + j].
+    '''
+    self.indexes = indexes
+    self.sizes = tuple(idx + 1 for idx in indexes)
+    strides = [1] * len(indexes)
+    for i in range(len(indexes) - 2, -1, -1):
+      strides[i] = strides[i + 1] * self.sizes[i + 1]
+    self.strides = tuple(strides)
   def set_get_structure(self, get_structure_func):
     self.get_structure = get_structure_func
   def new_array(self, *sizes):
+    '''Storage for the elements of an array of these sizes, in one flat sequence'''
     if len(sizes) == 0:
       return []
-    if len(sizes) == 1:
-      datatype = _get_type(self.datatype, self.get_structure)
-      if isinstance(datatype, (list, tuple)):
-        if issubclass(datatype[0], StructureData):
-          data = [datatype[0](datatype[1]) for _ in range(sizes[0])]
-          for struct in data:
-            struct.set_get_structure(self.get_structure)
-            struct.data = struct.new_structure_data()
-          return data
-        # sized Char
-        return [datatype[0](None, datatype[1])] * sizes[0]
-      # Basic type / structure
-      return [datatype(None)] * sizes[0]
-    return [self.new_array(*sizes[1:]) for _ in range(sizes[0])]
-  def _validate_index(self, index):
-    if len(index) != len(self.sizes):
+    size = 1
+    for dimension in sizes:
+      size *= dimension
+    datatype = _get_type(self.datatype, self.get_structure)
+    if isinstance(datatype, (list, tuple)):
+      if issubclass(datatype[0], StructureData):
+        data = [datatype[0](datatype[1]) for _ in range(size)]
+        for struct in data:
+          struct.set_get_structure(self.get_structure)
+          struct.data = struct.new_structure_data()
+        return data
+      # sized Char
+      return [datatype[0](None, datatype[1])] * size
+    if self.datatype in TypedBuffer.CODES:
+      return TypedBuffer(self.datatype, size)
+    # Basic type / structure
+    return [datatype(None)] * size
+  def _offset(self, indexes):
+    '''Evaluate indexes and return the position of their element in self.value'''
+    if len(indexes) != len(self.sizes):
       raise VarUndefined('Index invalide')
-    for i, size in enumerate(index):
-      if size < 0 or size >= self.indexes[i] + 1:
-        raise IndexOutOfRange(f'Index hors limite : {size}')
+    offset = 0
+    for index, size, stride in zip(indexes, self.sizes, self.strides):
+      while not isinstance(index, int):
+        try:
+          index = index.eval()
+        except AttributeError:
+          raise BadType('Index manquant')
+      if index < 0 or index >= size:
+        raise IndexOutOfRange(f'Index hors limite : {index}')
+      offset += index * stride
+    return offset
+  def rows(self):
+    '''The elements in nested lists, one level per dimension'''
+    def split(values, sizes):
+      if len(sizes) <= 1 or not values:
+        return values
+      step = len(values) // sizes[0] if sizes[0] else 0
+      return [split(values[i * step:(i + 1) * step], sizes[1:]) for i in range(sizes[0])]
+    return split(list(self.value), self.sizes)
   def eval(self):
     return self
   def _eval_indexes(self, *indexes):
@@ -377,12 +516,7 @@ class Array(Base):
       idxs.append(idx)
     return tuple(idxs)
   def get_item(self, *indexes):
-    idxs = self._eval_indexes(*indexes)
-    self._validate_index(idxs)
-    array = self.value
-    for i in idxs:
-      array = array[i]
-    return array
+    return self.value[self._offset(indexes)]
   def set_array(self, array, ref=False):
     '''
     self ← array
@@ -392,37 +526,34 @@ class Array(Base):
       if len(array) == 0:
         self.value = []
         return
-      indexes = Array.get_indexes(array.value)
-      datatype = Array.get_datatype(array.value)
+      value = array.value
+      indexes = Array.get_indexes(value) if Array.nested(value) else array.indexes
+      datatype = Array.get_datatype(value)
       if datatype != self.datatype:
         raise BadType(f'Type `{self.datatype}` attendu [`{datatype}`]')
-      Array.check_types(array.value, datatype)
-      temparray = Array(datatype, *indexes)
-      if self.sizes == temparray.sizes:
-        self.indexes = indexes
-        self.sizes = temparray.sizes
-        self.value = deepcopy(array.value)
+      Array.check_types(value, datatype)
+      if self.sizes == tuple(idx + 1 for idx in indexes):
+        self.reshape(indexes)
+        self.value = deepcopy(list(Array.flatten(value)) if Array.nested(value) else value)
         return
       else:
-        raise BadType(f'Nombre de valeurs invalide : {len(array.value)} ({len(self.value)})')
+        raise BadType(f'Nombre de valeurs invalide : {indexes[0] + 1} ({self.sizes[0]})')
     try:
       if self.sizes != array.sizes:
-        raise BadType(f'Nombre de valeurs invalide : {len(array)} ({len(self.value)}) ')
+        raise BadType(f'Nombre de valeurs invalide : {array.sizes[0]} ({self.sizes[0]})')
     except AttributeError:
       array = array.eval()
       if self.sizes != array.sizes:
-        raise BadType(f'Nombre de valeurs invalide : {len(array)} ({len(self.value)}) ')
+        raise BadType(f'Nombre de valeurs invalide : {array.sizes[0]} ({self.sizes[0]})')
     if self.datatype != array.datatype and array.datatype != 'Quelconque':
       raise BadType(f'Type `{self.datatype}` attendu [`{array.datatype}`]')
     if ref:
       # /!\ Not implemented in grammar.
       # References are only available in procedure.
-      self.indexes = array.indexes
-      self.sizes = array.sizes
+      self.reshape(array.indexes)
       self.value = array.value
     else:
-      self.indexes = deepcopy(array.indexes)
-      self.sizes = deepcopy(array.sizes)
+      self.reshape(array.indexes)
       self.value = deepcopy(array.value)
   def set_value(self, indexes, value):
     datatype = self.datatype
@@ -438,7 +569,7 @@ class Array(Base):
         # check if elements are lists and check their lengths
         length = sum([len(ar.eval()) for ar in value if isinstance(ar.eval(), (Array, list))])
         if length != self.sizes[0]:
-          raise BadType(f'Nombre de valeurs invalide : {len(value)} ({len(self.value)})')
+          raise BadType(f'Nombre de valeurs invalide : {len(value)} ({self.sizes[0]})')
         else:
           array = []
           for e in value:
@@ -461,27 +592,26 @@ class Array(Base):
           nn = map_type(n.eval())
           if nn.data_type != datatype:
             raise BadType(f'Type `{datatype}` attendu [{nn.data_type}]')
-        array[i] = map_type(n.eval())
+        array[i] = own_box(n.eval())
       self.value = array
       return
     if isinstance(value, Number) and datatype == 'Numérique':
       value = Float(float(value.eval()))
     if not issubclass(type(value), Array):
-      typed_value = map_type(value.eval())
+      typed_value = own_box(value.eval())
     else:
       typed_value = value
     if typed_value.data_type != datatype and datatype != 'Quelconque':
       raise BadType(f'Type `{datatype}` attendu [{repr_datatype(typed_value.data_type, shortform=False)}]')
-    idxs = self._eval_indexes(*indexes)
-    self._validate_index(idxs)
-    array = self.value
-    for i in idxs[:-1]:
-      array = array[i]
+    offset = self._offset(indexes)
     # /!\ deepcopy StructureData
     if isinstance(typed_value, StructureData):
-      array[idxs[-1]] = deepcopy(typed_value)
+      self.value[offset] = deepcopy(typed_value)
     else:
-      array[idxs[-1]] = typed_value
+      self.value[offset] = typed_value
+  def set_item(self, indexes, value):
+    '''self[indexes] ← value, its type being verified beforehand'''
+    self.value[self._offset(indexes)] = own_box(value)
   def _indexes_to_copy(self, old, new):
     '''
     Generator yielding indexes for copying values
@@ -502,8 +632,7 @@ class Array(Base):
     array.set_get_structure(self.get_structure)
     array.value = array.new_array(*array.sizes)
     if self.is_empty():
-      self.indexes = idxs
-      self.sizes = sizes
+      self.reshape(idxs)
       self.value = array.value
       return
     for i, idx in enumerate(self.indexes):
@@ -512,43 +641,36 @@ class Array(Base):
           raise ArrayResizeFailed('Redimensionnement impossible')
       except IndexError:
         raise ArrayResizeFailed('Redimensionnement impossible')
+    # elements are moved from one flat storage to the other, undefined ones included
     for idx in self._indexes_to_copy(self.sizes, sizes):
-      value = self.get_item(*idx)
-      if value is None:
-        continue
+      value = self.value[self._offset(idx)]
       if isinstance(value, StructureData):
         value = deepcopy(value)
-      array.set_value(idx, map_type(value))
-    self.indexes = idxs
-    self.sizes = sizes
+      array.value[array._offset(idx)] = value
+    self.reshape(idxs)
     self.value = array.value
   def is_empty(self, array=None):
-    if array is not None:
-      for item in array:
-        if isinstance(item, list):
-          return self.is_empty(item)
-        if not map_type(item).is_empty:
-          return False
-    else:
-      for item in self.value:
-        if isinstance(item, list):
-          return self.is_empty(item)
-        if not map_type(item).is_empty:
-          return False
+    if array is None:
+      array = self.value
+    if isinstance(array, TypedBuffer):
+      return array.count() == 0
+    for item in array:
+      if not map_type(item).is_empty:
+        return False
     return True
   def __len__(self):
-    if len(self.sizes) == 1:
-      return sum([1 if not isinstance(map_type(e).value, Nothing) else 0 for e in self.value])
-    return Array.multi_len(self.value)
+    if isinstance(self.value, TypedBuffer):
+      return self.value.count()
+    return sum([1 if not isinstance(map_type(e).value, Nothing) else 0 for e in self.value])
   def __getitem__(self, index):
     return self.value[index]
   def __eq__(self,  other):
     if isinstance(other, Array):
-      return self.value == other.value
+      return self.sizes == other.sizes and self.value == other.value
     return False
   def __ne__(self, other):
     if isinstance(other, Array):
-      return self.value != other.value
+      return self.sizes != other.sizes or self.value != other.value
     return False
   def __gt__(self, other):
     if isinstance(other, Array):
@@ -573,9 +695,9 @@ class Array(Base):
       if isinstance(array, list):
         return '[' + ','.join(recursive_repr(item) for item in array) + ']'
       return '?' if array is None else str(map_type(array))
-    return recursive_repr(self.value)
+    return recursive_repr(self.rows())
   def __str__(self):
-    return str(self.value)
+    return str(self.rows())
   @property
   def size(self):
     if len(self.sizes) == 1:
@@ -598,11 +720,12 @@ class Array(Base):
 
 class Structure(Base):
   '''Structure skeleton'''
+  __slots__ = ('name', 'fields')
   _type = 'Structure'
   def __init__(self, name, fields):
     self.name =  name
     self.fields = fields # list of names and types
-    self._type = name
+    self.value = None
   def eval(self):
     return NotImplemented
   def __iter__(self):
@@ -616,8 +739,10 @@ class Structure(Base):
 
 class StructureData(Base):
   ''' A Structure instance '''
+  __slots__ = ('structure', 'name', 'data', 'get_structure')
   _type = 'StructureData'
   def __init__(self, structure):
+    self.value = None
     self.structure = structure
     self.name = structure.name
     self.data = None
@@ -748,6 +873,7 @@ class StructureData(Base):
     return self.name
 
 class Table(Base):
+  __slots__ = ('key_type', 'value_type')
   _type = 'Table'
   def __init__(self, key_type, value_type, value=None):
     self.key_type = key_type
@@ -805,6 +931,7 @@ class Table(Base):
     return f'({(", ".join(str(k) + ": " + str(v) for k, v in self.value.items()))})'
 
 class Any(Base):
+  __slots__ = ()
   def __init__(self, value=None):
     if value is not None:
       self.set_value(value)
@@ -852,7 +979,33 @@ def _get_type(datatype, get_structure):
   raise BadType(f'`{datatype}` : type de données inconnu')
 
 def map_type(value):
-  '''Convert Python type to an Algo type'''
+  '''
+  Convert Python type to an Algo type.
+  VRAI, FAUX, small integers, short strings and undefined values are shared:
+  the result must not be modified in place, what is stored gets own_box(value).
+  '''
+  if isinstance(value, bool):
+    return TRUE if value else FALSE
+  if isinstance(value, int):
+    if SMALL_INTEGERS[0] <= value < SMALL_INTEGERS[1]:
+      return _integers[value - SMALL_INTEGERS[0]]
+    return Integer(value)
+  if isinstance(value, float):
+    return Float(value)
+  if isinstance(value, str):
+    if len(value) > SHORT_STRING:
+      return String(value)
+    try:
+      return _strings[value]
+    except KeyError:
+      string = _strings[value] = String(value)
+      return string
+  if value is None:
+    return Nothing()
+  return value
+
+def own_box(value):
+  '''Convert Python type to an Algo type, in a new box that can be modified in place'''
   if isinstance(value, int) and not isinstance(value, bool):
     return Integer(value)
   if isinstance(value, float):
@@ -865,6 +1018,13 @@ def map_type(value):
     return Nothing()
   return value
 
+# Shared values of map_type
+TRUE, FALSE = Boolean(True), Boolean(False)
+SMALL_INTEGERS = (-5, 257)
+_integers = tuple(Integer(n) for n in range(*SMALL_INTEGERS))
+SHORT_STRING = 1 # length
+_strings = {}
+
 def repr_datatype(datatype, shortform=True):
   if isinstance(datatype[0], tuple):
     datatype = datatype[0]
@@ -0,0 +1,355 @@
+'''Static type inference'''
+#  _______ ______        _______ _____   _______ _______
+# |    ___|   __ \______|   _   |     |_|     __|       |
+# |    ___|      <______|       |       |    |  |   -   |
+# |___|   |___|__|      |___|___|_______|_______|_______|
+#
+# This file is part of FR-ALGO
+# Copyright © 2024-2026 Stéphane MEYER (Teegre)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+# OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from fralgo.lib.ast import Declare, DeclareArray, DeclareConst, DeclareSizedChar, DeclareTable
+from fralgo.lib.ast import Function, Node, Reference, Variable
+from fralgo.lib.datatypes import Boolean, Float, Integer, String
+
+# Static types of scalar values.
+INTEGER = 'Entier'
+FLOAT = 'Numérique'
+NUMBER = 'Entier ou Numérique' # only known at run time
+STRING = 'Chaîne'
+BOOLEAN = 'Booléen'
+BOXED = 'Booléen (objet)' # a Boolean object: DP, Booléen(), function results
+
+ARRAY = 'Tableau'
+STRUCTURE = 'Structure'
+
+NUMBERS = (INTEGER, FLOAT, NUMBER)
+BOOLEANS = (BOOLEAN, BOXED)
+
+SCALARS = {
+  'Entier': INTEGER,
+  'Numérique': FLOAT,
+  'Chaîne': STRING,
+  'Booléen': BOOLEAN,
+}
+
+LITERALS = {
+  Integer: INTEGER,
+  Float: FLOAT,
+  String: STRING,
+  Boolean: BOOLEAN,
+}
+
+COMPARISONS = ('=', '<>', '<', '>', '<=', '>=')
+LOGICAL = ('ET', 'OU', 'OUX')
+
+class Untyped(Exception):
+  '''The type of an expression cannot be known statically'''
+  def __init__(self, message):
+    super().__init__(message)
+    self.message = message
+
+class Signature:
+  '''Parameters [(name, type, is_reference)] and result type of a function'''
+  def __init__(self, name, params, result):
+    self.name = name
+    self.params = params
+    self.result = result
+  def __repr__(self):
+    return f'{self.name}{self.params} → {self.result}'
+
+def declared_type(datatype):
+  '''Static type of a declared variable, parameter or function'''
+  if not isinstance(datatype, str) or datatype not in SCALARS:
+    raise Untyped(f'type `{datatype}` non pris en charge')
+  return SCALARS[datatype]
+
+def arithmetic(a, b):
+  if a == b == INTEGER:
+    return INTEGER
+  if FLOAT in (a, b):
+    return FLOAT
+  return NUMBER
+
+def assignable(target, value):
+  '''
+  How a value is stored into a variable of type `target`:
+  None (as is), 'float' (conversion) or 'int' (checked at run time).
+  '''
+  if target == value:
+    return None
+  if target == INTEGER and value == NUMBER:
+    return 'int'
+  if target == FLOAT and value in NUMBERS:
+    return 'float'
+  if target == BOOLEAN and value == BOXED:
+    return None
+  raise Untyped(f'affectation de `{value}` à `{target}`')
+
+def passable(target, value):
+  '''How a value is passed to a parameter of type `target`'''
+  if target == INTEGER and value != INTEGER:
+    # parameter types are checked against the type of the argument
+    raise Untyped(f'paramètre `{target}` : `{value}`')
+  return assignable(target, value)
+
+def returnable(target, value):
+  if target == value or (target == BOOLEAN and value == BOXED):
+    return
+  raise Untyped(f'`Retourne` : `{value}` au lieu de `{target}`')
+
+class Inference:
+  '''
+  Infer the static type of expressions.
+  `variables(name, namespace)` returns the type of a variable,
+  `functions(name, namespace)` the Signature of a function and
+  `arrays(name, namespace)`, if given, the type of the elements of an array
+  and `fields(node)`, if given, the type of the structure field node reads.
+  They raise Untyped when the name cannot be resolved statically.
+  '''
+  def __init__(self, variables, functions, arrays=None, fields=None):
+    self.variables = variables
+    self.functions = functions
+    self.arrays = arrays
+    self.fields = fields
+  def infer(self, node):
+    literal = LITERALS.get(type(node))
+    if literal is not None:
+      return literal
+    method = getattr(self, 'infer_' + type(node).__name__, None)
+    if method is None:
+      raise Untyped(f'`{type(node).__name__}` non pris en charge')
+    return method(node)
+  def expect(self, node, *types):
+    datatype = self.infer(node)
+    if datatype not in types:
+      raise Untyped(f'{node} : type `{datatype}` inattendu')
+    return datatype
+  def infer_Node(self, node):
+    if node.children or node.statement is None:
+      raise Untyped('bloc d\'instructions dans une expression')
+    return self.infer(node.statement)
+  def infer_Variable(self, node):
+    return self.variables(node.name, node.namespace)
+  def infer_ArrayGetItem(self, node):
+    if self.arrays is None or type(node.var) is not Variable:
+      raise Untyped('élément de tableau')
+    return self.arrays(node.var.name, node.var.namespace)
+  def infer_StructureGetItem(self, node):
+    if self.fields is None:
+      raise Untyped('champ de structure')
+    return self.fields(node)
+  def infer_BinOp(self, node):
+    op = node.op
+    if op == 'NON':
+      self.expect(node.a, *BOOLEANS)
+      return BOOLEAN
+    if op in LOGICAL:
+      self.expect(node.a, *BOOLEANS)
+      self.expect(node.b, *BOOLEANS)
+      return BOOLEAN
+    if op == '&':
+      self.expect(node.a, STRING)
+      self.expect(node.b, STRING)
+      return STRING
+    if op in COMPARISONS:
+      a = self.infer(node.a)
+      b = self.infer(node.b)
+      if (a in NUMBERS and b in NUMBERS) or a == b in (STRING, BOOLEAN):
+        return BOOLEAN
+      raise Untyped(f'{node} : comparaison de `{a}` et `{b}`')
+    a = self.expect(node.a, *NUMBERS)
+    b = self.expect(node.b, *NUMBERS)
+    if op == 'DP':
+      return BOXED
+    if op == '^':
+      return FLOAT if FLOAT in (a, b) else NUMBER
+    return arithmetic(a, b)
+  infer_TypedBinOp = infer_BinOp
+  def infer_Neg(self, node):
+    return self.expect(node.value, *NUMBERS)
+  def infer_Len(self, node):
+    self.expect(node.value, STRING)
+    return INTEGER
+  def infer_Mid(self, node):
+    self.expect(node.exp, STRING)
+    self.expect(node.start, INTEGER)
+    self.expect(node.length, INTEGER)
+    return STRING
+  def infer_Trim(self, node):
+    self.expect(node.exp, STRING)
+    self.expect(node.length, INTEGER)
+    return STRING
+  def infer_Find(self, node):
+    self.expect(node.str1, STRING)
+    self.expect(node.str2, STRING)
+    return INTEGER
+  def infer_Chr(self, node):
+    self.expect(node.value, INTEGER)
+    return STRING
+  def infer_Ord(self, node):
+    self.expect(node.value, STRING)
+    return INTEGER
+  def infer_ToInteger(self, node):
+    self.expect(node.value, *NUMBERS, STRING, *BOOLEANS)
+    return INTEGER
+  def infer_ToFloat(self, node):
+    self.expect(node.value, *NUMBERS, STRING, *BOOLEANS)
+    return FLOAT
+  def infer_ToString(self, node):
+    self.expect(node.value, *NUMBERS, STRING, *BOOLEANS)
+    return STRING
+  def infer_ToBoolean(self, node):
+    self.expect(node.value, *NUMBERS, STRING, *BOOLEANS)
+    return BOXED
+  def infer_Random(self, node):
+    return FLOAT
+  def infer_UnixTimestamp(self, node):
+    return FLOAT
+  def infer_FunctionCall(self, node):
+    signature = self.signature(node)
+    if signature.result is None:
+      raise Untyped(f'`{node.name}` : procédure dans une expression')
+    return BOXED if signature.result == BOOLEAN else signature.result
+  def signature(self, node):
+    '''Signature of the called function, once its arguments are checked'''
+    signature = self.functions(node.name, node.namespace)
+    args = node.params or []
+    if len(args) != len(signature.params):
+      raise Untyped(f'`{node.name}` : nombre de paramètres invalide')
+    for (name, datatype, reference), arg in zip(signature.params, args):
+      if reference:
+        if type(arg) is not Variable or self.infer(arg) != datatype:
+          raise Untyped(f'`{node.name}` : référence `{name}` invalide')
+      else:
+        passable(datatype, self.infer(arg))
+    return signature
+
+class Declarations:
+  '''
+  Static types of the variables and functions of a tree parsed in
+  `namespace`, from their declarations: parameters and locals in a
+  function, variables of the program elsewhere. A function only sees
+  the variables of the program that no function declares, as scoping
+  is dynamic: a caller could hide them.
+  '''
+  def __init__(self, tree, namespace):
+    self.namespace = namespace
+    self.variables = {} # variables of the program: name → type, None if unknown
+    self.functions = {} # name → Signature, None if unknown
+    self.local_names = set() # parameters and locals of every function
+    self.scope = None # name → type in a function, None in the program
+    for statement in self.statements(tree):
+      if isinstance(statement, Declare):
+        self.declare(self.variables, statement.name, statement.var_type)
+      elif isinstance(statement, DeclareArray):
+        self.declare_array(self.variables, statement.name, statement.var_type)
+      elif isinstance(statement, Function):
+        self.local_names |= statement.names
+        self.declare_function(statement)
+    self.inference = Inference(self.variable_type, self.signature)
+  def statements(self, node):
+    '''Statements of the program, those of its blocks included'''
+    if isinstance(node, Node):
+      yield from self.statements(node.statement)
+      for child in node.children:
+        yield from self.statements(child)
+    elif node is not None:
+      yield node
+  def declare(self, scope, name, datatype):
+    try:
+      datatype = declared_type(datatype)
+    except Untyped:
+      datatype = None
+    if name in scope and scope[name] != datatype:
+      datatype = None
+    scope[name] = datatype
+  def declare_array(self, scope, name, datatype):
+    '''An array is known by the type of its elements: (ARRAY, type)'''
+    try:
+      datatype = ARRAY, declared_type(datatype)
+    except Untyped:
+      datatype = None
+    if name in scope and scope[name] != datatype:
+      datatype = None
+    scope[name] = datatype
+  def declare_function(self, function):
+    signature = None
+    if function.name not in self.functions:
+      try:
+        params = []
+        for param in function.params or ():
+          if len(param) != 2:
+            raise Untyped('paramètre tableau')
+          name, datatype = param
+          reference = isinstance(name, Reference)
+          params.append((name.name if reference else name, declared_type(datatype), reference))
+        result = None if function.return_type is None else declared_type(function.return_type)
+        signature = Signature(function.name, params, result)
+      except Untyped:
+        pass
+    self.functions[function.name] = signature
+  def function_scope(self, function):
+    '''Types of the parameters and locals of a function'''
+    if any(isinstance(param[0], Reference) for param in function.params or ()):
+      # the name of a reference of any function may hide them
+      return dict.fromkeys(function.names)
+    scope = {}
+    for param in function.params or ():
+      if len(param) == 4: # array
+        self.declare_array(scope, param[0], param[2])
+      else:
+        self.declare(scope, param[0], param[1])
+    for statement in self.statements(function.body):
+      if isinstance(statement, Declare):
+        self.declare(scope, statement.name, statement.var_type)
+      elif isinstance(statement, DeclareArray):
+        self.declare_array(scope, statement.name, statement.var_type)
+      elif isinstance(statement, (DeclareConst, DeclareSizedChar, DeclareTable)):
+        scope[statement.name] = None
+    return scope
+  def declared(self, name, namespace):
+    '''Declared type of a name, None if it is unknown'''
+    if namespace not in (None, self.namespace):
+      raise Untyped(f'espace `{namespace}`')
+    scope = self.scope
+    if scope is None:
+      return self.variables.get(name)
+    if name in scope:
+      return scope[name]
+    if name in self.local_names:
+      raise Untyped(f'`{name}` : variable non locale partagée')
+    return self.variables.get(name)
+  def variable_type(self, name, namespace=None):
+    datatype = self.declared(name, namespace)
+    if datatype is None or isinstance(datatype, tuple):
+      raise Untyped(f'`{name}` : type inconnu')
+    return datatype
+  def array_type(self, name, namespace=None):
+    '''Type of the elements of an array'''
+    datatype = self.declared(name, namespace)
+    if not isinstance(datatype, tuple):
+      raise Untyped(f'`{name}` : tableau inconnu')
+    return datatype[1]
+  def signature(self, name, namespace=None):
+    signature = self.functions.get(name) if namespace in (None, self.namespace) else None
+    if signature is None:
+      raise Untyped(f'`{name}` : fonction inconnue')
+    return signature
@@ -0,0 +1,74 @@
+'''Compilation of the hot loops (--jit)'''
+#  _______ ______        _______ _____   _______ _______
+# |    ___|   __ \______|   _   |     |_|     __|       |
+# |    ___|      <______|       |       |    |  |   -   |
+# |___|   |___|__|      |___|___|_______|_______|_______|
+#
+# This file is part of FR-ALGO
+# Copyright © 2024-2026 Stéphane MEYER (Teegre)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+# OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import sys
+
+from fralgo.lib.ast import For, While
+from fralgo.lib.exceptions import FralgoException
+
+# Iterations of a loop after which its body is compiled.
+THRESHOLD = 1000
+
+# Given to enable().
+threshold = None
+
+# Compiled loops, in compilation order (--stats).
+loops = []
+
+def enable(iterations=THRESHOLD):
+  '''Compile the loops running more than iterations times, None: never'''
+  global threshold
+  threshold = While.threshold = For.threshold = iterations
+
+def compile_loop(loop):
+  '''
+  Compile the body of loop, with its condition or its bounds, into closures
+  (see fralgo.lib.closures) and keep them in loop.compiled.
+  Return None if the loop is to be walked as before.
+  '''
+  from fralgo.lib.closures import compile_node
+  try:
+    if isinstance(loop, While):
+      compiled = compile_node(loop.condition), compile_node(loop.dothis)
+    else:
+      compiled = tuple(compile_node(node) for node in (loop.start, loop.end, loop.step, loop.dothis))
+  except FralgoException:
+    return None
+  loop.compiled = compiled
+  loops.append(loop)
+  return compiled
+
+def report():
+  '''Print the compiled loops (--stats)'''
+  sys.stderr.write(f'*** Boucles compilées (après {threshold} itérations)\n')
+  if not loops:
+    sys.stderr.write('... aucune boucle compilée\n')
+  for loop in loops:
+    kind = 'TantQue' if isinstance(loop, While) else f'Pour {loop.var}'
+    sys.stderr.write(f'... Ligne {loop.lineno:<6} {kind}\n')
+  sys.stderr.flush()
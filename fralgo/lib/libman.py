@@ -27,58 +27,104 @@
 
 import os
 
+from fralgo.lib.cache import load_tree, store_tree
 from fralgo.lib.exceptions import FralgoException, FatalError, print_err
 
 class LibMan:
   def __init__(self):
     self.parser = None
+    self.optimizer = None
+    self.lexer = None
     self.mainfile = None
     self.__path = None
     self.__local_lib_path = os.path.join(os.getenv("HOME"), '.local/lib/fralgo')
     self.namespaces = None
     self.imports = ['main']
+    # Parsed libraries: (path, alias) → (mtime, tree)
+    self.__trees = {}
+    self.hits = 0
+    self.misses = 0
   def set_main(self, mainfile=None):
     self.mainfile = mainfile
     if mainfile is not None:
       self.__path = os.path.dirname(os.path.abspath(mainfile))
     else:
       self.__path = os.getcwd()
-  def set_lexer(self, lexer):
-    self.lexer = lexer
   def set_parser(self, parser):
     self.parser = parser
+  def set_optimizer(self, optimizer):
+    self.optimizer = optimizer
+  def get_parser(self):
+    # built on demand: unneeded when every tree comes from the cache.
+    if self.parser is None:
+      from fralgo.fralgoparse import parser
+      self.parser = parser
+    return self.parser
   def set_namespaces(self, ns):
     self.namespaces = ns
   def import_lib(self, libfile, alias=None):
     libpath = os.path.join(self.path, libfile + '.algo')
     if not os.path.isfile(libpath):
       libpath = os.path.join(self.__local_lib_path, libfile + '.algo')
+    libpath = os.path.realpath(libpath)
+    if not alias:
+      alias = os.path.basename(libfile)
     try:
-      with open(libpath, 'r', encoding='utf-8') as f:
-        lib = f.readlines()
+      mtime = os.stat(libpath).st_mtime_ns
     except FileNotFoundError:
       name = os.path.basename(libpath)
       raise FatalError(f'Importer : fichier `{name}` non trouvé')
-    try:
-      self.checklib(lib, libfile)
-    except FatalError as e:
-      print_err(f'Librairie : {libfile}.algo')
-      raise e
-    if not alias:
-      alias = os.path.basename(libfile)
+    # Parsed trees depend on the namespace they were parsed in.
+    key = (libpath, alias)
+    cached = self.__trees.get(key)
+    if cached is not None and cached[0] == mtime:
+      self.hits += 1
+      statements = cached[1]
+    else:
+      self.misses += 1
+      statements = None
+      try:
+        with open(libpath, 'r', encoding='utf-8') as f:
+          lib = f.readlines()
+      except FileNotFoundError:
+        name = os.path.basename(libpath)
+        raise FatalError(f'Importer : fichier `{name}` non trouvé')
+      try:
+        self.checklib(lib, libfile)
+      except FatalError as e:
+        print_err(f'Librairie : {libfile}.algo')
+        raise e
+    self.lexer = None
     self.imports.append(alias)
     self.namespaces.declare_namespace(alias)
     try:
-      statements = self.parser.parse(''.join(lib), lexer=self.lexer)
+      if statements is None:
+        source = ''.join(lib)
+        statements = load_tree(libpath, source, alias)
+        if statements is None:
+          from fralgo.fralgolex import new_lexer
+          self.lexer = new_lexer()
+          statements = self.get_parser().parse(source, lexer=self.lexer)
+          store_tree(libpath, source, statements, alias)
+        if self.optimizer is not None:
+          statements = self.optimizer(statements, alias)
+        # like store_tree, keep no tree evaluated at parse time.
+        from fralgo.lib.ast import is_volatile
+        if not is_volatile(statements):
+          self.__trees[key] = (mtime, statements)
       statements.eval()
     except FralgoException as e:
       print_err(f'Librairie : {libfile}.algo')
-      print_err(f'Ligne {self.lexer.lineno}')
+      if self.lexer is not None:
+        print_err(f'Ligne {self.lexer.lineno}')
       self.namespaces.del_namespace(alias)
       raise e
     finally:
       self.imports.pop()
       self.namespaces.set_current_namespace(self.imports[-1])
+  def cache_info(self):
+    '''Parsed libraries cache statistics: (hits, misses, size)'''
+    return self.hits, self.misses, len(self.__trees)
   def checklib(self, algocontent, libfile):
     start = False
     for line in algocontent:
@@ -0,0 +1,184 @@
+'''Memoisation of pure functions'''
+#  _______ ______        _______ _____   _______ _______
+# |    ___|   __ \______|   _   |     |_|     __|       |
+# |    ___|      <______|       |       |    |  |   -   |
+# |___|   |___|__|      |___|___|_______|_______|_______|
+#
+# This file is part of FR-ALGO
+# Copyright © 2024-2026 Stéphane MEYER (Teegre)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+# OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import sys
+from collections import OrderedDict
+
+from fralgo.lib.ast import namespaces
+from fralgo.lib.ast import ArrayGetItem, Assign, CloseFile, EOF, For, Function, FunctionCall
+from fralgo.lib.ast import GetCursorPos, GetTermSize, Import, OpenFile, Print, PrintErr, Random
+from fralgo.lib.ast import Read, ReadFile, Reference, Shell, Sleep, StructureGetItem
+from fralgo.lib.ast import StructureSetItem, TimeZone, UnixTimestamp, Variable, WriteFile, fields
+from fralgo.lib.datatypes import Base
+from fralgo.lib.exceptions import FralgoException
+
+# Results remembered per function, the least recently used are evicted first.
+SIZE = 10000
+
+# Parameter and result types of a memoised function.
+SCALARS = ('Entier', 'Numérique', 'Chaîne', 'Caractère', 'Booléen')
+
+# Results that can be remembered: returned again, they cannot be altered.
+PLAIN = (int, float, str, bool)
+
+# Input, output, time, randomness and nested declarations.
+IMPURE = (
+  CloseFile, EOF, Function, GetCursorPos, GetTermSize, Import, OpenFile, Print, PrintErr,
+  Random, Read, ReadFile, Shell, Sleep, TimeZone, UnixTimestamp, WriteFile,
+)
+
+# --memoiser: memoise the functions proven pure, not only the Mémoïsée ones.
+analyse = False
+
+# Every Memo, in creation order (--stats).
+memos = []
+
+class Memo:
+  '''Results of a function, by argument values (bounded LRU cache)'''
+  def __init__(self, function, size=SIZE):
+    self.function = function
+    self.size = size
+    self.results = OrderedDict()
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+  def key(self, variables, params):
+    '''Argument values, read from the bound parameters'''
+    if not params:
+      return ()
+    return tuple(variables[param[0]].eval() for param in params)
+  def get(self, key):
+    '''Remembered result, or None'''
+    try:
+      result = self.results[key]
+    except KeyError:
+      self.misses += 1
+      return None
+    self.results.move_to_end(key)
+    self.hits += 1
+    return result
+  def put(self, key, result):
+    if type(result) not in PLAIN:
+      return
+    self.results[key] = result
+    if len(self.results) > self.size:
+      self.results.popitem(last=False)
+      self.evictions += 1
+
+def memo_of(func):
+  '''The Memo of func, False when its results are not remembered'''
+  memo = False
+  if func.memoized or analyse and memoizable(func) and is_pure(func):
+    memo = Memo(func)
+    memos.append(memo)
+  func.memo = memo
+  return memo
+
+def scalar(datatype):
+  if isinstance(datatype, tuple): # sized char
+    datatype = datatype[0]
+  return datatype in SCALARS
+
+def memoizable(func):
+  '''Tell if the parameters and the result of func can be remembered'''
+  if func.return_type is None or not scalar(func.return_type):
+    return False
+  for param in func.params or ():
+    if isinstance(param[0], Reference) or len(param) != 2 or not scalar(param[1]):
+      return False
+  return True
+
+def is_pure(func, pending=None):
+  '''
+  Tell if the result of func only depends on its arguments: no input or
+  output, no clock or random value, no call to an impure function and no
+  variable other than its parameters and locals. Scoping is dynamic, so
+  any other variable belongs to a caller and may change between calls.
+  '''
+  if pending is None:
+    pending = set()
+  pending.add(id(func)) # (mutual) recursion: pure unless proven otherwise
+  for node in nodes(func.body):
+    if isinstance(node, IMPURE):
+      return False
+    for namespace, name in names(node):
+      if namespace not in (None, func.namespace) or name not in func.names:
+        return False
+    if isinstance(node, FunctionCall):
+      try:
+        callee = namespaces.get_function(node.name, node.namespace)
+      except FralgoException:
+        return False
+      if id(callee) not in pending and not is_pure(callee, pending):
+        return False
+  return True
+
+def nodes(node):
+  '''Nodes of a function body, not those of the functions it calls'''
+  if isinstance(node, (list, tuple)):
+    for item in node:
+      yield from nodes(item)
+    return
+  attributes = fields(node)
+  if attributes is not None and not isinstance(node, Base):
+    yield node
+    if isinstance(node, FunctionCall):
+      yield from nodes(node.params)
+    else:
+      for value in attributes.values():
+        yield from nodes(value)
+
+def names(node):
+  '''(namespace, name) of the variables a node reads or writes by name'''
+  if isinstance(node, Variable):
+    return [(node.namespace, node.name)]
+  if isinstance(node, Assign):
+    if isinstance(node.var, list):
+      return [tuple(node.var)]
+    return [(None, node.var)]
+  if isinstance(node, For):
+    return [(node.namespace, node.var), (node.namespace, node.var_next)]
+  if isinstance(node, (ArrayGetItem, StructureGetItem, StructureSetItem)):
+    var = node.name if isinstance(node, StructureGetItem) else node.var
+    if isinstance(var, tuple):
+      var = var[0]
+    if isinstance(var, str):
+      return [(node.namespace, var)]
+  return []
+
+def report():
+  '''Print the statistics of the memoised functions (--stats)'''
+  sys.stderr.write('*** Mémoïsation\n')
+  if not memos:
+    sys.stderr.write('... aucune fonction mémoïsée\n')
+  for memo in memos:
+    calls = memo.hits + memo.misses
+    rate = memo.hits * 100 / calls if calls else 0
+    sys.stderr.write(
+      f'... {memo.function.name:<22} {len(memo.results):>6}/{memo.size} résultats, '
+      f'{memo.hits}/{calls} appels évités ({rate:.1f} %), {memo.evictions} évictions\n')
+  sys.stderr.flush()
@@ -0,0 +1,267 @@
+'''Tree optimizer'''
+#  _______ ______        _______ _____   _______ _______
+# |    ___|   __ \______|   _   |     |_|     __|       |
+# |    ___|      <______|       |       |    |  |   -   |
+# |___|   |___|__|      |___|___|_______|_______|_______|
+#
+# This file is part of FR-ALGO
+# Copyright © 2024-2026 Stéphane MEYER (Teegre)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+# OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import operator
+
+from fralgo.lib.ast import ArrayGetItem, ArraySetItem, Assign, BinOp, Chr, Declare
+from fralgo.lib.ast import DeclareArray, DeclareConst, DeclareSizedChar, DeclareTable
+from fralgo.lib.ast import Find, For, Function, FunctionReturn, If, Len, Mid, Neg, Node
+from fralgo.lib.ast import Ord, Panic, Print, PrintErr, Reference, ToBoolean, ToFloat, ToInteger
+from fralgo.lib.ast import ToString, Trim, TypedBinOp, Variable, While, WriteFile
+from fralgo.lib.ast import _divide, _divisible, _float_divide, _int_divide, fields
+from fralgo.lib.datatypes import Base, Boolean, Float, Integer, String, map_type
+from fralgo.lib.exceptions import FralgoException
+from fralgo.lib.inference import BOOLEAN, FLOAT, INTEGER, NUMBERS, STRING
+from fralgo.lib.inference import Declarations, Untyped
+
+# Literal values an expression can be folded into.
+LITERALS = (Boolean, Float, Integer, String)
+
+# Pure expressions and their operands: evaluated once, at compile time,
+# when every operand is a literal.
+FOLDABLE = {
+  BinOp: ('a', 'b'),
+  Neg: ('value',),
+  Len: ('value',),
+  Mid: ('exp', 'start', 'length'),
+  Trim: ('exp', 'length'),
+  Find: ('str1', 'str2'),
+  Chr: ('value',),
+  Ord: ('value',),
+  ToInteger: ('value',),
+  ToFloat: ('value',),
+  ToString: ('value',),
+  ToBoolean: ('value',),
+}
+
+# Fields read as plain values, where a constant may replace its name.
+VALUES = {
+  **FOLDABLE,
+  Assign: ('value',),
+  DeclareConst: ('value',),
+  If: ('condition',),
+  While: ('condition',),
+  For: ('start', 'end', 'step'),
+  FunctionReturn: ('expression',),
+  Print: ('data',),
+  PrintErr: ('data',),
+  ArrayGetItem: ('indexes',),
+}
+
+# Fields whose node type is checked at run time: left as they are.
+KEEP = {
+  ArraySetItem: ('value',),
+}
+
+# Displayed fields: a boolean expression is printed VRAI or FAUX,
+# whereas a boolean literal is not, so these are never folded into one.
+DISPLAY = {
+  Print: ('data',),
+  PrintErr: ('data',),
+  Panic: ('data',),
+  WriteFile: ('var',),
+}
+
+DECLARATIONS = (Declare, DeclareArray, DeclareConst, DeclareSizedChar, DeclareTable)
+
+def is_literal(value):
+  return type(value) in LITERALS
+
+# Operations on operands of known types (see typed_operation).
+ARITHMETIC = {
+  '+': operator.add,
+  '-': operator.sub,
+  '*': operator.mul,
+  '%': operator.mod,
+  '^': operator.pow,
+  'DP': _divisible,
+}
+
+COMPARISON = {
+  '=': operator.eq,
+  '<>': operator.ne,
+  '<': operator.lt,
+  '>': operator.gt,
+  '<=': operator.le,
+  '>=': operator.ge,
+}
+
+LOGICAL = {
+  'ET': operator.and_,
+  'OU': operator.or_,
+  'OUX': operator.xor,
+}
+
+def optimize(tree, namespace='main'):
+  '''Optimize a tree parsed in `namespace` in place and return it'''
+  tree = ConstantFolder(tree, namespace).visit(tree)
+  return Specializer(tree, namespace).visit(tree)
+
+class ConstantFolder:
+  '''
+  Fold literal expressions and replace constants by their value.
+  Only top-level literal constants whose name is never declared again
+  (variable, parameter...) are replaced, once their declaration is met.
+  '''
+  def __init__(self, tree, namespace):
+    self.namespace = namespace
+    self.declared = {}
+    self.count_declarations(tree, set())
+    self.constants = {}
+    self.depth = 0 # function definitions nesting
+  def count_declarations(self, node, seen):
+    if isinstance(node, (list, tuple)):
+      for item in node:
+        self.count_declarations(item, seen)
+      return
+    attributes = fields(node)
+    if attributes is None or isinstance(node, Base) or id(node) in seen:
+      return
+    seen.add(id(node))
+    if isinstance(node, DECLARATIONS):
+      self.declared[node.name] = self.declared.get(node.name, 0) + 1
+    elif isinstance(node, Function):
+      for param in node.params or ():
+        name = param[0].name if isinstance(param[0], Variable) else param[0]
+        self.declared[name] = self.declared.get(name, 0) + 1
+    for value in attributes.values():
+      self.count_declarations(value, seen)
+  def visit(self, node, value=False, display=False):
+    '''
+    Return the optimized node.
+    `value` tells if node is read as a value, `display` if it is printed.
+    '''
+    if isinstance(node, list):
+      return [self.visit(item, value, display) for item in node]
+    if isinstance(node, tuple):
+      return tuple(self.visit(item, value, display) for item in node)
+    if isinstance(node, Node):
+      node.statement = self.visit(node.statement)
+      node.children = self.visit(node.children)
+      return node
+    if isinstance(node, Variable):
+      if value and not isinstance(node, Reference):
+        constant = self.constants.get((node.namespace, node.name))
+        if constant is not None and not (display and isinstance(constant, Boolean)):
+          return constant
+      return node
+    attributes = fields(node)
+    if attributes is None or isinstance(node, Base):
+      return node
+    values = VALUES.get(type(node), ())
+    keep = KEEP.get(type(node), ())
+    displayed = DISPLAY.get(type(node), ())
+    self.depth += isinstance(node, Function)
+    for field, child in attributes.items():
+      new = self.visit(child, field in values, field in displayed)
+      if field not in keep:
+        setattr(node, field, new)
+    self.depth -= isinstance(node, Function)
+    if isinstance(node, DeclareConst):
+      self.declare(node)
+    return self.fold(node, display)
+  def declare(self, node):
+    if self.depth == 0 and is_literal(node.value) and self.declared.get(node.name) == 1 \
+        and not node.name.startswith('@'):
+      self.constants[(self.namespace, node.name)] = node.value
+  def fold(self, node, display):
+    operands = FOLDABLE.get(type(node))
+    if operands is None:
+      return node
+    for operand in operands:
+      child = getattr(node, operand)
+      if child is not None and not is_literal(child):
+        return node
+    try:
+      result = node.eval()
+    except (FralgoException, ArithmeticError, TypeError, ValueError):
+      # keep runtime errors where they belong
+      return node
+    if isinstance(result, Base) or (display and isinstance(result, bool)):
+      return node
+    result = map_type(result)
+    return result if is_literal(result) else node
+
+def typed_operation(op, a, b):
+  '''
+  Operation of a BinOp whose operands are Python values of types a and b,
+  or None when BinOp has to check them at run time.
+  '''
+  if a in NUMBERS and b in NUMBERS:
+    if op == '/':
+      if a == b == INTEGER:
+        return _int_divide
+      if FLOAT in (a, b):
+        return _float_divide
+      return _divide # Entier or Numérique: only known at run time
+    if op in ARITHMETIC:
+      return ARITHMETIC[op]
+    return COMPARISON.get(op)
+  if a == b == STRING:
+    if op == '&':
+      return operator.add
+    return COMPARISON.get(op)
+  if a == b == BOOLEAN:
+    return COMPARISON.get(op) or LOGICAL.get(op)
+  return None
+
+class Specializer(Declarations):
+  '''
+  Replace the BinOp nodes whose operand types are known by TypedBinOp
+  nodes (see Declarations for the types of the variables).
+  '''
+  def visit(self, node):
+    '''Return the node, its BinOp nodes specialized when possible'''
+    if isinstance(node, list):
+      return [self.visit(item) for item in node]
+    if isinstance(node, tuple):
+      return tuple(self.visit(item) for item in node)
+    attributes = fields(node)
+    if attributes is None or isinstance(node, Base):
+      return node
+    if isinstance(node, Function):
+      scope, self.scope = self.scope, self.function_scope(node)
+      node.body = self.visit(node.body)
+      self.scope = scope
+      return node
+    keep = KEEP.get(type(node), ())
+    for field, child in attributes.items():
+      if field not in keep:
+        setattr(node, field, self.visit(child))
+    if type(node) is BinOp and node.b is not None:
+      return self.specialize(node)
+    return node
+  def specialize(self, node):
+    try:
+      a = self.inference.infer(node.a)
+      b = self.inference.infer(node.b)
+    except Untyped:
+      return node
+    operation = typed_operation(node.op, a, b)
+    if operation is None:
+      return node
+    return TypedBinOp(node.op, node.a, node.b, operation)
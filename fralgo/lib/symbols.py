@@ -28,11 +28,26 @@
 import fralgo.lib.exceptions as ex
 from fralgo.lib.datatypes import Array, Char, StructureData, Table
 
-class Context:
-  def __init__(self, context_name:str):
+class Frame:
+  '''Local scope of a function call: variables, references, functions and structures'''
+  __slots__ = ('name', 'dereference', 'has_reference', 'variables', 'references', 'functions', 'structures',
+               'stamp')
+  def __init__(self):
+    self.variables = {}
+    self.references = {}
+    self.functions = {}
+    self.structures = {}
+    self.stamp = 0
+  def open(self, context_name:str):
     self.name = context_name
     self.dereference = False
     self.has_reference = False
+    Symbols.restamp(self)
+    return self
+  def close(self):
+    for table in (self.variables, self.references, self.functions, self.structures):
+      if table:
+        table.clear()
   def __repr__(self):
     return f'{self.name} [{"+" if self.dereference else "-"}]'
   def __str__(self):
@@ -58,6 +73,7 @@ class StructuresRegistry:
     cls.__structures.clear()
 
 class Symbol:
+  __slots__ = ('namespace', 'datatype', 'name')
   def __init__(self, namespace=None, datatype=None, name=None):
     self.namespace = namespace
     self.datatype = datatype
@@ -75,14 +91,25 @@ class Symbols:
   __func         = 'functions'
   __vars         = 'variables'
   __structs      = 'structures'
-  __local        = 'local'
-  __localfunc    = 'localfunctions'
-  __localstructs = 'localstructs'
-  __context      = 'context'
 
   __superglobal  = {}
   __main_global  = {}
-  __localrefs    = []
+  # Frames of every namespace, in call order: references are looked up
+  # across namespaces.
+  __frames       = []
+  # Frames of returned calls, ready for reuse.
+  __pool         = []
+
+  # Bumped whenever a name may resolve to another symbol, in any scope.
+  # See Variable.lookup.
+  generation     = 0
+  # Last stamp given to a frame: a frame gets a new one when it opens and
+  # whenever one of its names may resolve to another symbol, so that the
+  # names resolved in a scope stay valid across the calls it makes.
+  stamp          = 0
+  # Bumped whenever a function name may resolve to another function.
+  # See FunctionCall.function.
+  function_generation = 0
 
 # TODO: ORDER METHODS
 
@@ -91,47 +118,62 @@ class Symbols:
       self.__func         : {},
       self.__vars         : {},
       self.__structs      : {},
-      self.__local        : [],
-      self.__localfunc    : [],
-      self.__localstructs : [],
-      self.__context      : [],
     }
+    self.frames = [] # Frame of each call in this namespace
     self.get_type = get_type_func
     self.namespace = namespace
 
+  @classmethod
+  def changed(cls):
+    cls.generation += 1
+  @classmethod
+  def functions_changed(cls):
+    cls.function_generation += 1
+  @classmethod
+  def restamp(cls, frame):
+    cls.stamp += 1
+    frame.stamp = cls.stamp
+  def scope_changed(self):
+    '''A name of the current scope only may resolve to another symbol'''
+    if self.frames:
+      self.restamp(self.frames[-1])
+    else:
+      self.changed()
+  def scope(self):
+    '''Stamp of the current scope, 0 outside of a call'''
+    frames = self.frames
+    return frames[-1].stamp if frames else 0
+  @classmethod
+  def depth(cls):
+    '''Number of ALGO calls in progress'''
+    return len(cls.__frames)
   def is_structure(self, name):
     if isinstance(name, list):
       namespace, name = name[0], name[1]
     else:
       namespace = self.namespace
     if self.is_local():
-      table = self.get_localstructs_table()
-      for structs in reversed(table):
-        if structs.get(name, None) is not None:
+      for frame in reversed(self.frames):
+        if frame.structures.get(name, None) is not None:
           return True
     if namespace != self.namespace:
       return StructuresRegistry.get_structure(namespace, name) is not None
     struct = self.table[self.__structs].get(name, None)
     return struct is not None
   def is_local(self):
-    return bool(self.table[self.__local])
+    return bool(self.frames)
   def is_local_function(self):
-    return bool(self.table[self.__localfunc])
+    return bool(self.frames)
   def get_local_table(self):
-    table = self.table[self.__local]
-    return table[-1]
+    return self.frames[-1].variables
   def get_local_ref_context(self):
-    table = self.table[self.__context]
-    return table[-1]
+    return self.frames[-1]
   def get_localrefs_table(self):
-    table = self.__localrefs
-    return table[-1]
+    return self.__frames[-1].references
   def get_localfunc_table(self):
-    table = self.table[self.__localfunc]
-    return table[-1]
+    return self.frames[-1].functions
   def get_localstructs_table(self):
-    table = self.table[self.__localstructs]
-    return table[-1]
+    return self.frames[-1].structures
   def get_variables(self):
     if self.is_local():
       return self.get_local_table()
@@ -143,12 +185,15 @@ class Symbols:
       return self.get_localstructs_table()
     return self.table[self.__structs]
   def set_local_ref_context(self, dereference:bool):
+    self.scope_changed()
     context = self.get_local_ref_context()
     context.dereference = dereference
   def set_local_ref_context_has_reference(self, has_reference:bool):
+    self.scope_changed()
     context = self.get_local_ref_context()
     context.has_reference = has_reference
   def declare_var(self, name, data_type, superglobal=False):
+    self.changed() if superglobal else self.scope_changed()
     if superglobal:
       variables = self.__superglobal
     else:
@@ -167,6 +212,7 @@ class Symbols:
     else:
       variables[name] = datatype(None)
   def declare_const(self, name, value, superglobal=False):
+    self.changed() if superglobal else self.scope_changed()
     if superglobal:
       variables = self.__superglobal
     else:
@@ -185,11 +231,13 @@ class Symbols:
     else:
       variables[name] = ('CONST', value)
   def declare_ref(self, name, var):
+    self.changed()
     refs = self.get_localrefs_table()
     if refs.get(name, None) is not None:
       raise ex.VarRedeclared(f'Redéclaration de la référence `{name}`')
     refs[name] = var
   def declare_array(self, name, data_type, *max_indexes, superglobal=False):
+    self.changed() if superglobal else self.scope_changed()
     if superglobal:
       variables = self.__superglobal
     elif self.is_local():
@@ -203,19 +251,22 @@ class Symbols:
     array.value = array.new_array(*array.sizes)
     variables[name] = array
   def declare_table(self, name, key_type, value_type):
+    self.scope_changed()
     variables = self.get_variables()
     if variables.get(name, None) is not None:
       raise ex.VarRedeclared(f'Redéclaration de la variable `{name}`')
     variables[name] = Table(key_type, value_type)
   def declare_sized_char(self, name, size):
+    self.scope_changed()
     variables = self.get_variables()
     if variables.get(name, None) is not None:
       raise ex.VarRedeclared(f'Redéclaration de la variable `{name}`')
     variables[name] = Char(None, size)
-  def assign_value(self, name, value, namespace=None):
+  def assign_value(self, name, value, namespace=None, var=None):
     if name.startswith('@') and self.namespace != namespace:
       raise ex.FralgoException('Affectation d\'une valeur à un symbole privé.')
-    var = self.get_variable(name)
+    if var is None:
+      var = self.get_variable(name)
     if isinstance(var, tuple): # constant!
       raise ex.ReadOnlyValue(f'Constante `{name}` : en lecture seule')
     elif issubclass(type(value), Array):
@@ -226,21 +277,22 @@ class Symbols:
       except TypeError:
         raise ex.FralgoException(f'{name} ← {value} : affectation impossible')
   def get_variable(self, name, visited=None):
-    if self.is_local():
-      context = self.get_local_ref_context()
+    frames = self.frames
+    if frames:
+      context = frames[-1]
       if not context.has_reference:
-        for variables in reversed(self.table[self.__local]):
-          if name in variables:
-            return variables[name]
+        for frame in reversed(frames):
+          if name in frame.variables:
+            return frame.variables[name]
       if context.dereference:
         if visited is None:
           visited = set()
         elif name in visited:
           return None
         visited.add(name)
-        for references in reversed(self.__localrefs):
-          if name in references:
-            var = references[name]
+        for frame in reversed(self.__frames):
+          if name in frame.references:
+            var = frame.references[name]
             try:
               if var.namespace != self.namespace and self.namespace is not None:
                 return var.eval()
@@ -249,9 +301,9 @@ class Symbols:
             resolved = self.get_variable(var.name, visited)
             if resolved is not None:
               return resolved
-      for variables in reversed(self.table[self.__local]):
-        if name in variables:
-          return variables[name]
+      for frame in reversed(frames):
+        if name in frame.variables:
+          return frame.variables[name]
     var = self.table[self.__vars].get(name, None)
     if var is None:
       var = self.__main_global.get(name, None)
@@ -263,15 +315,16 @@ class Symbols:
       raise ex.VarUndeclared(f'Variable `{name}` non déclarée')
     return var
   def declare_function(self, function):
+    self.functions_changed()
     if self.is_local_function():
       self.get_localfunc_table()[function.name] = function
     else:
       self.table[self.__func][function.name] = function
   def get_function(self, name):
     if self.is_local_function():
-      for functions in reversed(self.table[self.__localfunc]):
-        if name in functions:
-          return functions[name]
+      for frame in reversed(self.frames):
+        if name in frame.functions:
+          return frame.functions[name]
     function = self.table[self.__func].get(name, None)
     if function is None:
       raise ex.VarUndeclared(f'Fonction `{name}` non déclarée')
@@ -289,9 +342,9 @@ class Symbols:
     else:
       namespace = self.namespace
     if self.is_local():
-      for structs in reversed(self.table[self.__localstructs]):
-        if name in structs:
-          return structs[name]
+      for frame in reversed(self.frames):
+        if name in frame.structures:
+          return frame.structures[name]
     if self.namespace == namespace:
       struct = self.table[self.__structs].get(name, None)
       if struct is not None:
@@ -301,38 +354,59 @@ class Symbols:
       return struct
     raise ex.VarUndeclared(f'Structure `{name}` non déclarée')
   def set_local(self, context_name: str):
-    self.table[self.__local].append({})
-    self.table[self.__context].append(Context(context_name))
-    self.__localrefs.append({})
-    self.table[self.__localfunc].append({})
-    self.table[self.__localstructs].append({})
+    # the new frame gets its own stamp: names resolved below stay valid
+    pool = self.__pool
+    frame = pool.pop() if pool else Frame()
+    frame.open(context_name)
+    self.frames.append(frame)
+    self.__frames.append(frame)
   def del_local(self):
-    if self.table[self.__local]:
-      self.table[self.__local].pop()
-    if self.table[self.__context]:
-      self.table[self.__context].pop()
-    if self.__localrefs:
-      self.__localrefs.pop()
-    if self.table[self.__localfunc]:
-      self.table[self.__localfunc].pop()
-    if self.table[self.__localstructs]:
-      self.table[self.__localstructs].pop()
+    frame = self.frames.pop() if self.frames else None
+    last = self.__frames.pop() if self.__frames else None
+    if frame is not None:
+      if frame.functions:
+        self.functions_changed()
+      if frame is last:
+        frame.close()
+        self.__pool.append(frame)
+  def replace_local(self, names):
+    '''
+    Tail call: remove the scope below the current one, when the current
+    scope will hide all its variables (`names`) and nothing refers to it.
+    Return True if it was removed.
+    '''
+    frames, everything = self.frames, self.__frames
+    if len(frames) < 2 or len(everything) < 2:
+      return False
+    frame, below = frames[-1], frames[-2]
+    if everything[-1] is not frame or everything[-2] is not below:
+      return False
+    if frame.references or below.references or below.functions or below.structures:
+      return False
+    if not below.variables.keys() <= names:
+      return False
+    del frames[-2]
+    del everything[-2]
+    below.close()
+    self.__pool.append(below)
+    self.restamp(frame)
+    return True
   def del_variable(self, name):
+    self.changed()
     try:
       self.table[self.__vars].pop(name)
     except KeyError:
       raise ex.VarUndeclared(f'Variable `{name}` non déclarée')
   def reset(self):
+    self.changed()
+    self.functions_changed()
     self.__superglobal.clear()
     self.__main_global.clear()
     self.table[self.__func].clear()
-    self.table[self.__local].clear()
-    self.table[self.__context].clear()
     self.table[self.__vars].clear()
     self.table[self.__structs].clear()
-    self.__localrefs.clear()
-    self.table[self.__localfunc].clear()
-    self.table[self.__localstructs].clear()
+    self.frames.clear()
+    self.__frames.clear()
   def dump(self):
     if self.__superglobal:
       print('%%% Super globales')
@@ -370,31 +444,31 @@ class Symbols:
         print('...', v)
       print('---')
     if self.is_local():
-      if self.table[self.__local]:
-        print('@@@ Variables locales')
-        for i, locs in enumerate(self.table[self.__local]):
-          context = self.table[self.__context][i]
-          print('### Contexte', context.name, '+' if context.dereference else '-')
-          for k, v in locs.items():
+      print('@@@ Variables locales')
+      for frame in self.frames:
+        print('### Contexte', frame.name, '+' if frame.dereference else '-')
+        for k, v in frame.variables.items():
+          print('...', k, '=', repr(v))
+        print('---')
+      frame = self.frames[-1]
+      if frame.structures:
+        print('+++ Structures locales')
+        for v in frame.structures.values():
+          print('...', v)
+        print('---')
+      if frame.functions:
+        print('+++ Fonctions et Procédures')
+        for k, v in sorted(frame.functions.items()):
+          if k.startswith('@'):
+            continue
+          print(f'... {k} :', v)
+        print('---')
+      if any(frame.references for frame in self.__frames):
+        print('&&& Références locales')
+        for frame in self.__frames:
+          for k, v in sorted(frame.references.items()):
             print('...', k, '=', repr(v))
-          print('---')
-        if self.table[self.__localstructs][-1]:
-          print('+++ Structures locales')
-          for v in sorted(self.table[self.__localstructs].values()):
-            print('...', v)
-        if not self.table[self.__localfunc]:
-          print('+++ Fonctions et Procédures')
-          for k, v in sorted(self.table[self.__localfunc].items()):
-            if k.startswith('@'):
-              continue
-            print(f'... {k} :', v)
-          print('---')
-        if self.__localrefs:
-          print('&&& Références locales')
-          for refs in self.__localrefs:
-            for k, v in sorted(refs.items()):
-              print('...', k, '=', repr(v))
-          print('---')
+        print('---')
     if self.table[self.__func]:
       print('+++ Fonctions et Procédures')
       for k, v in sorted(self.table[self.__func].items()):
@@ -413,8 +487,12 @@ class Namespaces:
     self.__namespaces['main'] = Symbols(get_type_func=get_type, namespace='main')
     self.current_namespace = 'main'
   def set_current_namespace(self, name):
+    if name != self.current_namespace:
+      Symbols.changed()
     self.current_namespace = name
   def declare_namespace(self, name):
+    Symbols.changed()
+    Symbols.functions_changed()
     if name in self.__namespaces:
       raise ex.VarRedeclared(f'Redéclaration de l\'espace `{name}`')
     self.__namespaces[name] = Symbols(self.get_type, name)
@@ -457,12 +535,16 @@ class Namespaces:
     sym = self.get_namespace(namespace)
     sym.del_local()
   def del_namespace(self, name):
+    Symbols.changed()
+    Symbols.functions_changed()
     namespace = self.__namespaces.get(name, None)
     if namespace is not None:
       self.__namespaces.pop(name)
     else:
       raise ex.VarUndeclared(f'Espace `{name}` non défini.')
   def reset(self):
+    Symbols.changed()
+    Symbols.functions_changed()
     for symbols in self.__namespaces.values():
       symbols.reset()
     StructuresRegistry.clear_structures()
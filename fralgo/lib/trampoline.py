@@ -0,0 +1,341 @@
+'''Explicit-stack evaluator'''
+#  _______ ______        _______ _____   _______ _______
+# |    ___|   __ \______|   _   |     |_|     __|       |
+# |    ___|      <______|       |       |    |  |   -   |
+# |___|   |___|__|      |___|___|_______|_______|_______|
+#
+# This file is part of FR-ALGO
+# Copyright © 2024-2026 Stéphane MEYER (Teegre)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+# OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from fralgo.lib.ast import namespaces, algo_to_python, resolve
+from fralgo.lib.ast import ArrayGetItem, ArraySetItem, Assign, BinOp, Chr, Continue, Exit, Find
+from fralgo.lib.ast import For, FunctionCall, FunctionReturn, If, Len, Mid, Neg, Node, Ord
+from fralgo.lib.ast import Print, PrintErr, SizeOf, Sleep, StructureGetItem, StructureSetItem, Sum
+from fralgo.lib.ast import TableKeyExists, ToBoolean, ToFloat, ToInteger, ToString, Trim, Type
+from fralgo.lib.ast import TypedBinOp, Variable, While
+from fralgo.lib.datatypes import Array, map_type
+from fralgo.lib.exceptions import BadType, FatalError, FralgoException, FralgoInterruption, InterruptedByUser
+from fralgo.lib.transpiler import has_call
+
+# The steps of a node are a generator: it yields the nodes whose value it
+# needs and receives their value. run() keeps these generators on a list,
+# so that an ALGO call does not nest Python calls, and the recursion depth
+# is only bounded by memory.
+
+# node type → generator function evaluating a node step by step.
+STEPS = {}
+
+# id(node) → (node, whether a function is called while evaluating it)
+_calls = {}
+
+def steps(*node_types):
+  def register(function):
+    for node_type in node_types:
+      STEPS[node_type] = function
+    return function
+  return register
+
+def run(tree):
+  '''Evaluate tree like tree.eval()'''
+  show_depth, Node.show_depth = Node.show_depth, True
+  try:
+    return drive(step(tree))
+  finally:
+    Node.show_depth = show_depth
+
+def drive(generator):
+  stack = [generator]
+  value, error = None, None
+  while stack:
+    generator = stack[-1]
+    try:
+      if error is None:
+        request = generator.send(value)
+      else:
+        request = generator.throw(error)
+        error = None
+    except StopIteration as stop:
+      stack.pop()
+      value = stop.value
+      continue
+    except BaseException as e:
+      stack.pop()
+      if not stack:
+        raise
+      error = e
+      continue
+    stack.append(step(request))
+    value = None
+  return value
+
+def step(node):
+  function = STEPS.get(type(node))
+  if function is None:
+    return direct(node)
+  return function(node)
+
+def direct(node):
+  return node.eval()
+  yield # pylint: disable=unreachable
+
+def calls(node):
+  try:
+    return _calls[id(node)][1]
+  except KeyError:
+    result = has_call(node)
+    _calls[id(node)] = node, result
+    return result
+
+def evaluate(node):
+  '''Value of node.eval(), calling functions through run()'''
+  if calls(node):
+    return (yield node)
+  return node.eval()
+
+def operand(node):
+  '''Value of algo_to_python(node)'''
+  if calls(node):
+    return algo_to_python((yield node))
+  return algo_to_python(node)
+
+@steps(Node)
+def node_steps(node):
+  try:
+    if node.statement:
+      result = yield from evaluate(node.statement)
+      if result is not None:
+        return result
+    for child in node.children:
+      result = yield from evaluate(child)
+      if result is not None:
+        return result
+    return None
+  except RecursionError:
+    node.handle_err('STOP : excès de récursivité !')
+  except MemoryError:
+    node.handle_err('STOP : mémoire insuffisante !')
+  except (FatalError, FralgoException) as e:
+    node.handle_err(e.message)
+
+@steps(FunctionCall)
+def call_steps(node):
+  func = node.function()
+  binding = node.binding(func)
+  try:
+    argument = next(binding)
+    while True:
+      try:
+        value = yield from evaluate(argument)
+      except Exception as e:
+        argument = binding.throw(e)
+      else:
+        argument = binding.send(value)
+  except StopIteration:
+    pass
+  try:
+    key, value = node.recall(func)
+    if value is None:
+      value = yield func.body
+    result = node.result(func, value)
+    if key is not None:
+      func.memo.put(key, value)
+    return result
+  finally:
+    node.unbind()
+
+@steps(FunctionReturn)
+def return_steps(node):
+  if namespaces.get_namespace(node.namespace).is_local_function():
+    return (yield from evaluate(node.expression))
+  raise FralgoException('Erreur de syntaxe : `Retourne` en dehors d\'une fonction')
+
+@steps(Assign)
+def assign_steps(node):
+  value = node.value
+  if not issubclass(type(value), Array):
+    value = yield from evaluate(value)
+  node.assign(value)
+
+@steps(BinOp)
+def binop_steps(node):
+  a = yield from operand(node.a)
+  b = yield from operand(node.b)
+  try:
+    return BinOp.operations[node.op](a, b)
+  except BadType:
+    if isinstance(a, Array) or isinstance(b, Array):
+      from fralgo.lib.vectors import operate
+      return operate(node.op, a, b)
+    raise
+
+@steps(TypedBinOp)
+def typed_binop_steps(node):
+  a = yield from operand(node.a)
+  b = yield from operand(node.b)
+  return node.operation(a, b)
+
+# node type → (fields holding operands, fields holding an access path whose
+# own operands are evaluated, like s.T[f(i)].x).
+OPERANDS = {
+  ArrayGetItem: (('indexes',), ('var',)),
+  ArraySetItem: (('indexes', 'value'), ()),
+  Chr: (('value',), ()),
+  Find: (('str1', 'str2'), ()),
+  Len: (('value',), ()),
+  Mid: (('exp', 'start', 'length'), ()),
+  Neg: (('value',), ()),
+  Ord: (('value',), ()),
+  SizeOf: (('var',), ()),
+  Sleep: (('duration',), ()),
+  StructureGetItem: ((), ('name',)),
+  StructureSetItem: (('value',), ('var',)),
+  Sum: (('value',), ()),
+  TableKeyExists: (('key',), ()),
+  ToBoolean: (('value',), ()),
+  ToFloat: (('value',), ()),
+  ToInteger: (('value',), ()),
+  ToString: (('value',), ()),
+  Trim: (('exp', 'length'), ()),
+  Type: (('var',), ()),
+}
+
+def operand_values(node, values):
+  '''
+  Evaluate the operands of node that call a function, and of its access
+  paths: values receives (object, field, value). Operands in a list are
+  left to node.eval().
+  '''
+  operands, paths = OPERANDS[type(node)]
+  for name in operands:
+    operand = getattr(node, name)
+    if isinstance(operand, tuple):
+      if any(calls(item) for item in operand):
+        items = []
+        for item in operand:
+          items.append(map_type((yield item)) if calls(item) else item)
+        values.append((node, name, tuple(items)))
+    elif not isinstance(operand, list) and calls(operand):
+      values.append((node, name, map_type((yield operand))))
+  for name in paths:
+    path = getattr(node, name)
+    if type(path) in OPERANDS and calls(path):
+      yield from operand_values(path, values)
+
+@steps(*OPERANDS)
+def operands_steps(node):
+  '''
+  node.eval() once the operands calling a function are evaluated here:
+  they are replaced by their value while node.eval() runs.
+  '''
+  values = []
+  yield from operand_values(node, values)
+  # not before: the node may be evaluated again by the calls above.
+  saved = []
+  try:
+    for owner, name, value in values:
+      saved.append((owner, name, getattr(owner, name)))
+      setattr(owner, name, value)
+    return node.eval()
+  finally:
+    for owner, name, value in reversed(saved):
+      setattr(owner, name, value)
+
+@steps(Sum)
+def sum_steps(node):
+  if node.function() is not None:
+    return (yield node.call)
+  return (yield from operands_steps(node))
+
+@steps(If)
+def if_steps(node):
+  if (yield from evaluate(node.condition)):
+    result = yield from evaluate(node.dothis)
+    if result is not None:
+      return result
+  elif node.dothat is not None:
+    result = yield from evaluate(node.dothat)
+    if result is not None:
+      return result
+  return None
+
+def interrupted():
+  print()
+  print('\033[?1049l', end='')
+  return InterruptedByUser('Interrompu par l\'utilisateur')
+
+@steps(While)
+def while_steps(node):
+  while (yield from evaluate(node.condition)):
+    try:
+      result = yield from evaluate(node.dothis)
+      if isinstance(result, Continue):
+        continue
+      elif isinstance(result, Exit):
+        return None
+      elif result is not None:
+        return result
+    except KeyboardInterrupt:
+      raise interrupted()
+    except FralgoInterruption:
+      return None
+  return None
+
+@steps(For)
+def for_steps(node):
+  sym = namespaces.get_namespace(node.namespace)
+  if node.var != node.var_next:
+    raise FralgoException(f'Pour `{node.var}` ... `{node.var_next}` Suivant')
+  i = algo_to_python((yield from evaluate(node.start)))
+  end = algo_to_python((yield from evaluate(node.end)))
+  step = algo_to_python((yield from evaluate(node.step)))
+  sym.assign_value(node.var, i, var=resolve(node, sym, node.var))
+  while i <= end if step > 0 else i >= end:
+    try:
+      result = yield from evaluate(node.dothis)
+      if isinstance(result, Exit):
+        return None
+    except KeyboardInterrupt:
+      raise interrupted()
+    except FralgoInterruption:
+      return None
+    if result is not None and not isinstance(result, Continue):
+      return result
+    try:
+      i += step
+    except TypeError:
+      i = i.eval()
+      i += step
+    sym.assign_value(node.var, i, var=resolve(node, sym, node.var))
+  return None
+
+@steps(Print, PrintErr)
+def print_steps(node):
+  result = []
+  for element in node.data:
+    if isinstance(element, (BinOp, Variable)):
+      value = yield from evaluate(element)
+      if isinstance(value, bool):
+        # evaluated again, as in Print.eval
+        value = yield from evaluate(element)
+        result.append(str(map_type(value)))
+        continue
+    result.append(str((yield from evaluate(element))))
+  node.write(result)
@@ -0,0 +1,1058 @@
+'''ALGO to Python translator'''
+#  _______ ______        _______ _____   _______ _______
+# |    ___|   __ \______|   _   |     |_|     __|       |
+# |    ___|      <______|       |       |    |  |   -   |
+# |___|   |___|__|      |___|___|_______|_______|_______|
+#
+# This file is part of FR-ALGO
+# Copyright © 2024-2026 Stéphane MEYER (Teegre)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+# OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import re
+import sys
+from collections import Counter
+
+from fralgo.lib.ast import ArrayGetItem, Assign, BinOp, Declare, DeclareArray, DeclareConst
+from fralgo.lib.ast import DeclareStruct, For, Function, FunctionCall, If, Node, Read, Reference
+from fralgo.lib.ast import StructureGetItem, Variable
+from fralgo.lib.ast import fields, repr_datatype
+from fralgo.lib.datatypes import Base, Boolean, Integer
+from fralgo.lib.exceptions import BadType, FralgoException, IndexOutOfRange, InterruptedByUser
+from fralgo.lib.exceptions import VarUndefined
+from fralgo.lib.inference import ARRAY, BOOLEAN, BOOLEANS, BOXED, FLOAT, INTEGER, NUMBERS, STRING
+from fralgo.lib.inference import STRUCTURE, Inference, Signature, Untyped
+from fralgo.lib.inference import assignable, declared_type, returnable
+
+FILENAME = '<algo>'
+
+# Python operators of ALGO binary operators (operands of known types).
+OPERATORS = {
+  '+': '+', '-': '-', '*': '*', '%': '%', '^': '**', '&': '+',
+  '=': '==', '<>': '!=', '<': '<', '>': '>', '<=': '<=', '>=': '>=',
+  'ET': '&', 'OU': '|', 'OUX': '^',
+}
+
+# Types of the elements of the arrays translated into lists.
+ELEMENTS = (INTEGER, FLOAT, BOOLEAN)
+
+# Python expressions that can be repeated: names and integers.
+SIMPLE = re.compile(r'-?\d+|[A-Za-z_][\w.]*')
+
+def flatten(node, lineno=0):
+  '''Statements of a block, in execution order, with their line number'''
+  if isinstance(node, Node):
+    if node.statement:
+      yield from flatten(node.statement, node.lineno)
+    for child in node.children:
+      yield from flatten(child, node.lineno)
+  elif node is not None:
+    yield node, lineno
+
+def walk(node):
+  '''Every object of a subtree'''
+  if isinstance(node, (list, tuple)):
+    for item in node:
+      yield from walk(item)
+    return
+  attributes = fields(node)
+  if attributes is not None and not isinstance(node, Base):
+    yield node
+    for value in attributes.values():
+      yield from walk(value)
+
+def has_call(node):
+  return any(isinstance(n, FunctionCall) for n in walk(node))
+
+def is_structure(datatype):
+  return isinstance(datatype, tuple) and datatype[0] == STRUCTURE
+
+class Scope:
+  '''A function (or the main program when function is None)'''
+  def __init__(self, function=None):
+    self.function = function
+    self.variables = {} # name → type, (ARRAY, type of the elements, sizes) for an array,
+                        # (STRUCTURE, name) for a structure
+    self.references = set() # & parameters
+    self.cells = set() # variables passed by reference
+    self.nonlocals = set() # main program variables assigned here
+    self.needs_init = set() # & parameters read before being assigned
+    self.exits = [] # assigned variables at each exit point
+    self.outputs = None # & parameters always assigned, once translated
+    self.loops = 0
+
+class Translator:
+  '''
+  Translate a parsed program into the source code of a Python function.
+  Untyped is raised when the program uses something the translator does
+  not handle (arrays of strings or of structures, operations on whole
+  arrays, files, imports...) or when a type or a variable initialization
+  cannot be proven: such a program is left to the interpreter.
+  '''
+  def __init__(self, tree):
+    self.tree = tree
+    self.main = Scope()
+    self.constants = set()
+    self.structures = {} # name → ({field: (position, type)}, size)
+    self.functions = {} # name → (Function, Signature, Scope)
+    self.local_names = set() # every local name of every function
+    self.scope = self.main
+    self.inference = Inference(self.variable_type, self.signature, self.array_type, self.field_type)
+    self.temporaries = 0
+    self.lines = [] # (python code, ALGO line)
+    self.indent = 0
+    self.lineno = 0
+
+  # Names
+
+  def declared(self, name, namespace):
+    if namespace not in (None, 'main'):
+      raise Untyped(f'espace `{namespace}`')
+    scope = self.scope
+    if name in scope.variables and scope is not self.main:
+      return scope.variables[name]
+    if scope is not self.main and name in self.local_names:
+      # dynamic scoping: another function could shadow this variable
+      raise Untyped(f'`{name}` : variable non locale partagée')
+    if name in self.main.variables:
+      return self.main.variables[name]
+    raise Untyped(f'`{name}` : variable non déclarée')
+  def variable_type(self, name, namespace=None):
+    datatype = self.declared(name, namespace)
+    if isinstance(datatype, tuple):
+      whole = 'un tableau entier' if datatype[0] == ARRAY else 'une structure entière'
+      raise Untyped(f'`{name}` : opération sur {whole}')
+    return datatype
+  def array(self, name, namespace=None):
+    '''Type of the elements and sizes of an array'''
+    datatype = self.declared(name, namespace)
+    if not isinstance(datatype, tuple) or datatype[0] != ARRAY:
+      raise Untyped(f'`{name}` : tableau inconnu')
+    return datatype[1:]
+  def array_type(self, name, namespace=None):
+    return self.array(name, namespace)[0]
+  def path(self, names, namespace=None):
+    '''
+    Variable, position in its list and type of a structure or of one of
+    its fields: names = (variable, field, subfield...)
+    '''
+    if not all(isinstance(name, str) for name in names):
+      raise Untyped('structure dans un tableau')
+    name, position = names[0], 0
+    datatype = self.declared(name, namespace)
+    if not is_structure(datatype):
+      raise Untyped(f'`{name}` : structure inconnue')
+    for field in names[1:]:
+      if not is_structure(datatype):
+        raise Untyped(f'`{name}.{field}` : champ d\'un champ simple')
+      fields, _ = self.structures[datatype[1]]
+      if field not in fields:
+        raise Untyped(f'`{name}.{field}` : champ inconnu')
+      offset, datatype = fields[field]
+      position += offset
+    return name, position, datatype
+  def field_path(self, node):
+    '''Names of the variable and of the fields a StructureGetItem reads'''
+    names = node.name if isinstance(node.name, tuple) else (node.name,)
+    return names + (node.field,)
+  def field_type(self, node):
+    _, _, datatype = self.path(self.field_path(node), node.namespace)
+    if isinstance(datatype, tuple):
+      raise Untyped(f'`{node}` : opération sur une structure entière')
+    return datatype
+  def composite(self, node):
+    '''Type of the array or structure node stands for as a whole, None for a scalar'''
+    if type(node) is Variable:
+      datatype = self.declared(node.name, node.namespace)
+    elif type(node) is StructureGetItem:
+      datatype = self.path(self.field_path(node), node.namespace)[2]
+    else:
+      return None
+    return datatype if isinstance(datatype, tuple) else None
+  def size(self, datatype):
+    '''Length of the list of a structure, 1 for a scalar field'''
+    return self.structures[datatype[1]][1] if is_structure(datatype) else 1
+  def booleans(self, datatype, start=0):
+    '''Positions of the Booléen fields in the list of a structure'''
+    positions = []
+    for offset, fieldtype in self.structures[datatype[1]][0].values():
+      if is_structure(fieldtype):
+        positions += self.booleans(fieldtype, start + offset)
+      elif fieldtype == BOOLEAN:
+        positions.append(start + offset)
+    return tuple(positions)
+  def signature(self, name, namespace=None):
+    if namespace not in (None, 'main') or name not in self.functions:
+      raise Untyped(f'`{name}` : fonction inconnue')
+    return self.functions[name][1]
+  def is_local(self, name):
+    return self.scope is not self.main and name in self.scope.variables
+  def python_name(self, name):
+    if not name.isidentifier():
+      raise Untyped(f'`{name}` : nom non pris en charge')
+    return 'v_' + name
+  def target(self, name):
+    '''Python expression of a variable, for reading or assignment'''
+    if self.is_local(name):
+      is_cell = name in self.scope.references or name in self.scope.cells
+    else:
+      is_cell = name in self.main.cells
+    return self.python_name(name) + ('.v' if is_cell else '')
+  def temporary(self):
+    self.temporaries += 1
+    return f'_t{self.temporaries}'
+
+  # Output
+
+  def emit(self, code, lineno=None):
+    self.lines.append(('  ' * self.indent + code, self.lineno if lineno is None else lineno))
+
+  # Declarations
+
+  def translate(self):
+    '''Return the Python source and its ALGO line numbers'''
+    statements = list(flatten(self.tree))
+    for stmt, _ in statements:
+      if isinstance(stmt, Declare):
+        self.declare(self.main, stmt.name, stmt.var_type)
+      elif isinstance(stmt, DeclareArray):
+        self.declare_array(self.main, stmt)
+      elif isinstance(stmt, DeclareStruct):
+        self.declare_struct(stmt)
+      elif isinstance(stmt, DeclareConst):
+        self.declare(self.main, stmt.name, None)
+        self.constants.add(stmt.name)
+      elif isinstance(stmt, Function):
+        self.declare_function(stmt)
+    for name, (_, _, scope) in self.functions.items():
+      self.local_names |= set(scope.variables)
+    self.find_cells(statements)
+    self.constant_types(statements)
+    initialized = self.initialized(statements)
+    self.emit('def _program():', 0)
+    self.indent += 1
+    for name, datatype in self.main.variables.items():
+      if isinstance(datatype, tuple):
+        self.emit(self.new_list(name, datatype), 0)
+      else:
+        self.emit(f'{self.python_name(name)} = {"_Cell()" if name in self.main.cells else "None"}', 0)
+    for name in self.functions:
+      self.function(name, initialized)
+    self.scope = self.main
+    self.block(statements, set(), main=True)
+    return '\n'.join(code for code, _ in self.lines) + '\n', [lineno for _, lineno in self.lines]
+  def declare(self, scope, name, datatype):
+    if name in scope.variables:
+      raise Untyped(f'`{name}` : redéclaration')
+    self.python_name(name)
+    if isinstance(datatype, str) and datatype in self.structures:
+      scope.variables[name] = STRUCTURE, datatype
+    else:
+      scope.variables[name] = None if datatype is None else declared_type(datatype)
+  def declare_array(self, scope, stmt):
+    '''Arrays of Entier, Numérique or Booléen of a given size are lists'''
+    if stmt.name in scope.variables:
+      raise Untyped(f'`{stmt.name}` : redéclaration')
+    self.python_name(stmt.name)
+    datatype = declared_type(stmt.var_type)
+    if datatype not in ELEMENTS:
+      raise Untyped(f'`{stmt.name}` : tableau de type `{datatype}`')
+    if any(index < 0 for index in stmt.max_indexes):
+      raise Untyped(f'`{stmt.name}` : tableau non dimensionné')
+    sizes = tuple(index + 1 for index in stmt.max_indexes)
+    scope.variables[stmt.name] = ARRAY, datatype, sizes
+  def declare_struct(self, stmt):
+    '''
+    A structure is a list of its fields, in their order: those of a
+    nested structure take its place.
+    '''
+    if stmt.name in self.structures:
+      raise Untyped(f'`{stmt.name}` : redéclaration')
+    fields, size = {}, 0
+    for field, datatype in stmt.fields:
+      if field in fields:
+        raise Untyped(f'`{stmt.name}.{field}` : champ dupliqué')
+      if isinstance(datatype, str) and datatype in self.structures:
+        datatype = STRUCTURE, datatype
+      else:
+        datatype = declared_type(datatype)
+      fields[field] = size, datatype
+      size += self.size(datatype)
+    self.structures[stmt.name] = fields, size
+  def new_list(self, name, datatype):
+    '''Python code creating an array or a structure: None stands for an undefined element'''
+    if datatype[0] == ARRAY:
+      size = 1
+      for dimension in datatype[2]:
+        size *= dimension
+    else:
+      size = self.size(datatype)
+    return f'{self.python_name(name)} = [None] * {size}'
+  def declare_function(self, function):
+    if function.name in self.functions:
+      raise Untyped(f'`{function.name}` : redéclaration')
+    if function.memoized:
+      raise Untyped(f'`{function.name}` : fonction mémoïsée')
+    self.python_name(function.name)
+    scope = Scope(function)
+    params = []
+    for param in function.params or []:
+      if len(param) != 2:
+        raise Untyped(f'`{function.name}` : paramètre tableau')
+      name, datatype = param
+      reference = isinstance(name, Reference)
+      name = name.name if reference else name
+      self.declare(scope, name, datatype)
+      if isinstance(scope.variables[name], tuple):
+        raise Untyped(f'`{function.name}` : paramètre structure')
+      if reference:
+        scope.references.add(name)
+      params.append((name, scope.variables[name], reference))
+    result = None if function.return_type is None else declared_type(function.return_type)
+    body = list(flatten(function.body))
+    for stmt, _ in body:
+      if isinstance(stmt, Declare):
+        self.declare(scope, stmt.name, stmt.var_type)
+      elif isinstance(stmt, DeclareArray):
+        self.declare_array(scope, stmt)
+      elif isinstance(stmt, (DeclareConst, DeclareStruct, Function)):
+        raise Untyped(f'`{function.name}` : déclaration locale non prise en charge')
+    self.functions[function.name] = (function, Signature(function.name, params, result), scope)
+  def find_cells(self, statements):
+    '''
+    Variables passed by reference are stored in cells.
+    The interpreter resolves references by name through every active
+    function: only names no other frame can shadow are translated.
+    '''
+    declared = Counter(self.main.variables.keys())
+    for _, _, scope in self.functions.values():
+      declared.update(scope.variables.keys())
+    for _, _, scope in self.functions.values():
+      for name in scope.references:
+        if declared[name] > 1:
+          raise Untyped(f'`{name}` : nom de référence partagé')
+    recursive = self.recursive_functions()
+    scopes = [(self.main, statements)]
+    scopes += [(scope, flatten(f.body)) for f, _, scope in self.functions.values()]
+    for scope, stmts in scopes:
+      for call in walk([stmt for stmt, _ in stmts]):
+        if not isinstance(call, FunctionCall) or call.name not in self.functions:
+          continue
+        signature = self.functions[call.name][1]
+        for (_, _, reference), arg in zip(signature.params, call.params or []):
+          if not reference or type(arg) is not Variable or arg.name in scope.references:
+            continue
+          if scope is not self.main and arg.name in scope.variables:
+            if declared[arg.name] > 1 or scope.function.name in recursive:
+              raise Untyped(f'`{arg.name}` : référence non prise en charge')
+            scope.cells.add(arg.name)
+          elif arg.name in self.main.variables:
+            if arg.name in self.local_names:
+              raise Untyped(f'`{arg.name}` : référence non prise en charge')
+            self.main.cells.add(arg.name)
+  def recursive_functions(self):
+    calls = {}
+    for name, (function, _, _) in self.functions.items():
+      calls[name] = {n.name for n in walk(function.body)
+                     if isinstance(n, FunctionCall) and n.name in self.functions}
+    recursive = set()
+    for name in calls:
+      seen, pending = set(), list(calls[name])
+      while pending:
+        callee = pending.pop()
+        if callee == name:
+          recursive.add(name)
+          break
+        if callee not in seen:
+          seen.add(callee)
+          pending.extend(calls[callee])
+    return recursive
+  def constant_types(self, statements):
+    for stmt, lineno in statements:
+      if isinstance(stmt, DeclareConst):
+        if has_call(stmt.value):
+          raise Untyped(f'`{stmt.name}` : constante calculée par une fonction')
+        self.lineno = lineno
+        self.main.variables[stmt.name] = self.inference.infer(stmt.value)
+  def initialized(self, statements):
+    '''Main program variables assigned before the first function call'''
+    assigned = set()
+    for stmt, _ in statements:
+      if isinstance(stmt, Function):
+        continue
+      if has_call(stmt):
+        break
+      if isinstance(stmt, (Assign, DeclareConst)):
+        assigned.add(stmt.var if isinstance(stmt, Assign) else stmt.name)
+      elif isinstance(stmt, Read):
+        assigned.add(stmt.var)
+      elif isinstance(stmt, For):
+        assigned.add(stmt.var)
+    return assigned
+
+  # Functions
+
+  def function(self, name, initialized):
+    function, signature, scope = self.functions[name]
+    self.scope = scope
+    params = ', '.join(self.python_name(p) for p, _, _ in signature.params)
+    self.emit(f'def f_{name}({params}):', 0)
+    self.indent += 1
+    header = len(self.lines)
+    for cell in scope.cells:
+      self.emit(f'{self.python_name(cell)} = _Cell()', 0)
+    for local, datatype in scope.variables.items():
+      if isinstance(datatype, tuple):
+        # a new array or structure at each call
+        self.emit(self.new_list(local, datatype), 0)
+    state = {p for p, _, reference in signature.params if not reference}
+    state |= {v for v in initialized if v not in scope.variables}
+    state = self.block(list(flatten(function.body)), state)
+    if state is not None:
+      if signature.result is not None:
+        raise Untyped(f'`{name}` : instruction `Retourne` absente')
+      scope.exits.append(state)
+    if scope.nonlocals:
+      names = ', '.join(self.python_name(n) for n in sorted(scope.nonlocals))
+      self.lines.insert(header, ('  ' * self.indent + f'nonlocal {names}', 0))
+    self.indent -= 1
+    outputs = set(scope.references)
+    for exit_state in scope.exits:
+      outputs &= exit_state
+    scope.outputs = outputs
+
+  # Statements
+
+  def block(self, statements, state, main=False):
+    '''
+    Emit a block. `state` is the set of variables assigned for sure.
+    Return it as it is at the end of the block, None if the end is never reached.
+    '''
+    start = len(self.lines)
+    for stmt, lineno in statements:
+      if state is None:
+        break
+      self.lineno = lineno
+      state = self.statement(stmt, state, main)
+    if len(self.lines) == start:
+      self.emit('pass')
+    return state
+  def statement(self, stmt, state, main):
+    if isinstance(stmt, (Declare, DeclareArray, DeclareStruct)) or (isinstance(stmt, Function) and main):
+      return state
+    if isinstance(stmt, DeclareConst) and main:
+      code, _ = self.expression(stmt.value, state)
+      self.emit(f'{self.python_name(stmt.name)} = {code}')
+      return state | {stmt.name}
+    method = getattr(self, 'statement_' + type(stmt).__name__, None)
+    if method is None:
+      raise Untyped(f'`{type(stmt).__name__}` non pris en charge')
+    return method(stmt, state)
+  def assign(self, name, datatype, code, state):
+    if name in self.constants and not self.is_local(name):
+      raise Untyped(f'`{name}` : constante')
+    code = self.converted(self.variable_type(name), datatype, code)
+    if self.scope is not self.main and not self.is_local(name) and name not in self.main.cells:
+      self.scope.nonlocals.add(name)
+    self.emit(f'{self.target(name)} = {code}')
+    return state | {name}
+  def converted(self, target, datatype, code):
+    '''Code of a value of type `datatype` stored as `target`'''
+    match assignable(target, datatype):
+      case 'float':
+        return f'float({code})'
+      case 'int':
+        return f'_integer({code})'
+    return code
+  def statement_Assign(self, stmt, state):
+    if not isinstance(stmt.var, str):
+      raise Untyped('affectation dans un autre espace')
+    if is_structure(self.declared(stmt.var, None)):
+      return self.copy((stmt.var,), None, stmt.value, state)
+    code, datatype = self.expression(stmt.value, state)
+    return self.assign(stmt.var, datatype, code, state)
+  def statement_Read(self, stmt, state):
+    if stmt.args:
+      raise Untyped('`Lire` dans un tableau')
+    datatype = self.variable_type(stmt.var)
+    reader = {INTEGER: 'integer', FLOAT: 'float', STRING: 'string', BOOLEAN: 'boolean'}[datatype]
+    return self.assign(stmt.var, datatype, f'_read_{reader}()', state)
+  def statement_ArraySetItem(self, stmt, state):
+    if type(stmt.var) is not Variable or not stmt.indexes:
+      raise Untyped('affectation d\'un tableau entier')
+    name = stmt.var.name
+    datatype, sizes = self.array(name, stmt.var.namespace)
+    value = stmt.value
+    if type(value) is ArrayGetItem and self.inference.infer(value) == datatype:
+      # an undefined element is copied as it is
+      checks, position = self.element(value, state)
+      code = f'{self.python_name(value.var.name)}[{position}]'
+      if checks:
+        code = f'({code} if {" and ".join(checks)} else None)'
+    else:
+      code, valuetype = self.expression(value, state)
+      if datatype == FLOAT and type(value) is Integer:
+        # number literals only are converted
+        code = repr(float(value.eval()))
+      elif valuetype != datatype and (datatype, valuetype) != (BOOLEAN, BOXED):
+        raise Untyped(f'`{name}` : élément `{datatype}` ← `{valuetype}`')
+    if not SIMPLE.fullmatch(code) or has_call(stmt.indexes):
+      # the value is evaluated before the indexes
+      temporary = self.temporary()
+      self.emit(f'{temporary} = {code}')
+      code = temporary
+    indexes = []
+    for index, size in self.indexes(stmt, state):
+      if not self.in_range(index, size):
+        if not SIMPLE.fullmatch(index):
+          temporary = self.temporary()
+          self.emit(f'{temporary} = {index}')
+          index = temporary
+        self.emit(f'if not 0 <= {index} < {size}:')
+        self.indent += 1
+        self.emit(f'_out_of_range({index})')
+        self.indent -= 1
+      indexes.append(index)
+    self.emit(f'{self.python_name(name)}[{self.position(indexes, sizes)}] = {code}')
+    return state
+  def statement_StructureSetItem(self, stmt, state):
+    if isinstance(stmt.var, tuple):
+      names = stmt.var
+    elif isinstance(stmt.var, str):
+      names = (stmt.var,)
+    else:
+      raise Untyped('structure dans un tableau')
+    if stmt.field is not None:
+      names += (stmt.field,)
+    if isinstance(stmt.value, list):
+      return self.sequence(names, stmt.namespace, stmt.value, state)
+    name, position, datatype = self.path(names, stmt.namespace)
+    if is_structure(datatype):
+      return self.copy(names, stmt.namespace, stmt.value, state)
+    value = stmt.value
+    if type(value) is StructureGetItem and self.inference.infer(value) == datatype in (STRING, BOOLEAN):
+      # an undefined Chaîne or Booléen is copied as it is
+      source, start, _ = self.path(self.field_path(value), value.namespace)
+      code = f'{self.python_name(source)}[{start}]'
+    else:
+      code, valuetype = self.expression(value, state)
+      code = self.converted(datatype, valuetype, code)
+    self.emit(f'{self.python_name(name)}[{position}] = {code}')
+    return state
+  def sequence(self, names, namespace, values, state):
+    '''Fields of a structure ← values, one after the other'''
+    name, position, datatype = self.path(names, namespace)
+    if not is_structure(datatype):
+      raise Untyped(f'`{name}` : valeurs affectées à un champ simple')
+    fields, _ = self.structures[datatype[1]]
+    if len(values) != len(fields) or any(is_structure(t) for _, t in fields.values()):
+      raise Untyped(f'`{name}` : affectation de valeurs non prise en charge')
+    for (offset, fieldtype), value in zip(fields.values(), values):
+      code, valuetype = self.expression(value, state)
+      code = self.converted(fieldtype, valuetype, code)
+      self.emit(f'{self.python_name(name)}[{position + offset}] = {code}')
+    return state
+  def copy(self, names, namespace, value, state):
+    '''A structure ← a copy of another one of the same type'''
+    name, position, datatype = self.path(names, namespace)
+    if type(value) is Variable:
+      source = self.path((value.name,), value.namespace)
+    elif type(value) is StructureGetItem:
+      source = self.path(self.field_path(value), value.namespace)
+    else:
+      raise Untyped(f'`{name}` : structure ← `{value}`')
+    if not is_structure(datatype) or source[2] != datatype:
+      raise Untyped(f'`{name}` : copie d\'une structure d\'un autre type')
+    self.emit(f'{self.fields(name, position, datatype)} = {self.fields(*source)}')
+    return state
+  def fields(self, name, position, datatype):
+    '''Python expression of the fields of a structure'''
+    return f'{self.python_name(name)}[{position}:{position + self.size(datatype)}]'
+  def statement_Print(self, stmt, state):
+    parts = []
+    for element in stmt.data:
+      composite = self.composite(element)
+      if is_structure(composite):
+        # undefined fields are written ?, FAUX for a Booléen (see Boolean.__str__)
+        structure = self.path((element.name,), element.namespace) if type(element) is Variable \
+          else self.path(self.field_path(element), element.namespace)
+        parts.append(f'_struct_str({self.fields(*structure)}, {self.booleans(composite)!r})')
+        continue
+      if composite is not None:
+        _, sizes = self.array(element.name, element.namespace)
+        parts.append(f'_array_str({self.python_name(element.name)}, {sizes!r})')
+        continue
+      if type(element) in (ArrayGetItem, StructureGetItem):
+        # an undefined element or field is written: ?, FAUX for a Booléen
+        read = self.read_element if type(element) is ArrayGetItem else self.read_field
+        if self.inference.infer(element) == BOOLEAN:
+          parts.append(read(element, state, "'FAUX'", '_bool_str'))
+        else:
+          parts.append(read(element, state, "'?'", 'str'))
+        continue
+      code, datatype = self.expression(element, state)
+      if isinstance(element, (BinOp, Variable)) and has_call(element):
+        # Print.eval evaluates these twice
+        code = f'({code}, {code})[1]'
+      if datatype in BOOLEANS:
+        if type(element) is Boolean:
+          code = f'str({code})'
+        else:
+          code = f'_bool_str({code})'
+      elif datatype != STRING:
+        code = f'str({code})'
+      parts.append(code)
+    text = parts[0] if len(parts) == 1 else f"' '.join(({', '.join(parts)},))"
+    std = '_stderr' if stmt.err else '_stdout'
+    end = " + '\\n'" if stmt.newline else ''
+    self.emit(f'{std}.write({text}{end})')
+    self.emit(f'{std}.flush()')
+    return state
+  statement_PrintErr = statement_Print
+  def condition(self, node, state):
+    code, datatype = self.expression(node, state)
+    if datatype not in BOOLEANS:
+      raise Untyped(f'{node} : condition de type `{datatype}`')
+    return code
+  def statement_If(self, stmt, state, keyword='if'):
+    self.emit(f'{keyword} {self.condition(stmt.condition, state)}:')
+    self.indent += 1
+    then_state = self.block(list(flatten(stmt.dothis)), set(state))
+    self.indent -= 1
+    if stmt.dothat is None:
+      else_state = state
+    else:
+      otherwise = list(flatten(stmt.dothat))
+      if len(otherwise) == 1 and isinstance(otherwise[0][0], If):
+        self.lineno = otherwise[0][1]
+        return self.merge(then_state, self.statement_If(otherwise[0][0], state, 'elif'))
+      self.emit('else:')
+      self.indent += 1
+      else_state = self.block(otherwise, set(state))
+      self.indent -= 1
+    return self.merge(then_state, else_state)
+  def merge(self, state1, state2):
+    if state1 is None:
+      return state2
+    if state2 is None:
+      return state1
+    return state1 & state2
+  def loop(self, body, state):
+    self.indent += 1
+    self.scope.loops += 1
+    self.block(body, set(state))
+    self.scope.loops -= 1
+    self.indent -= 1
+  def statement_While(self, stmt, state):
+    self.emit(f'while {self.condition(stmt.condition, state)}:')
+    self.loop(list(flatten(stmt.dothis)), state)
+    return state
+  def statement_For(self, stmt, state):
+    if stmt.var != stmt.var_next:
+      raise Untyped('`Pour` : variables différentes')
+    if self.variable_type(stmt.var) != INTEGER:
+      raise Untyped('`Pour` : variable non entière')
+    bounds = []
+    for bound in (stmt.start, stmt.end, stmt.step):
+      code, datatype = self.expression(bound, state)
+      if datatype != INTEGER:
+        raise Untyped('`Pour` : bornes non entières')
+      bounds.append(code)
+    start, end, step = self.temporary(), self.temporary(), self.temporary()
+    counter = self.temporary()
+    self.emit(f'{start} = {bounds[0]}')
+    self.emit(f'{end} = {bounds[1]}')
+    self.emit(f'{step} = {bounds[2]}')
+    state = self.assign(stmt.var, INTEGER, start, state)
+    # the loop variable is only assigned the next value at the end of an iteration
+    self.emit(f'{counter} = _range({start}, {end}, {step})')
+    self.emit(f'for {self.target(stmt.var)} in {counter}:')
+    self.loop(list(flatten(stmt.dothis)), state)
+    self.emit('else:')
+    self.indent += 1
+    self.emit(f'{self.target(stmt.var)} = {start} + len({counter}) * {step}')
+    self.indent -= 1
+    return state
+  def statement_Continue(self, stmt, state):
+    if not self.scope.loops:
+      raise Untyped('`Continuer` hors d\'une boucle')
+    self.emit('continue')
+    return None
+  def statement_Exit(self, stmt, state):
+    if not self.scope.loops:
+      raise Untyped('`Sortir` hors d\'une boucle')
+    self.emit('break')
+    return None
+  def statement_FunctionReturn(self, stmt, state):
+    signature = self.current_signature()
+    if signature is None or signature.result is None:
+      raise Untyped('`Retourne` hors d\'une fonction')
+    code, datatype = self.expression(stmt.expression, state)
+    returnable(signature.result, datatype)
+    self.emit(f'return {code}')
+    self.scope.exits.append(state)
+    return None
+  def statement_ProcTerminate(self, stmt, state):
+    signature = self.current_signature()
+    if signature is None or signature.result is not None:
+      raise Untyped('`Terminer` hors d\'une procédure')
+    self.emit('return')
+    self.scope.exits.append(state)
+    return None
+  def statement_Sleep(self, stmt, state):
+    code, datatype = self.expression(stmt.duration, state)
+    if datatype not in NUMBERS:
+      raise Untyped(f'`Dormir` : durée de type `{datatype}`')
+    self.emit(f'_sleep({code})')
+    return state
+  def statement_FunctionCall(self, stmt, state):
+    if self.signature(stmt.name, stmt.namespace).result is not None:
+      # the value of a function called as a statement ends the block
+      raise Untyped(f'`{stmt.name}` : fonction appelée comme une procédure')
+    self.inference.signature(stmt)
+    code, state = self.call(stmt, state)
+    self.emit(code)
+    return state
+  def current_signature(self):
+    if self.scope is self.main:
+      return None
+    return self.functions[self.scope.function.name][1]
+
+  # Expressions
+
+  def expression(self, node, state, term=False):
+    '''
+    Return the Python expression of node and its static type.
+    `term` tells node is an operand of an operator.
+    '''
+    datatype = self.inference.infer(node)
+    if isinstance(node, Node):
+      return self.expression(node.statement, state, term)[0], datatype
+    if type(node) is StructureGetItem and datatype in (STRING, BOOLEAN) and not term:
+      # only operators report an undefined Chaîne or Booléen field
+      raise Untyped(f'`{node}` : champ `{datatype}` hors d\'une opération')
+    if isinstance(node, FunctionCall):
+      return self.call(node, state)[0], datatype
+    if isinstance(node, Base):
+      return repr(node.eval()), datatype
+    if type(node) is Variable:
+      if node.name not in state:
+        if self.is_local(node.name) and node.name in self.scope.references:
+          self.scope.needs_init.add(node.name)
+        else:
+          raise Untyped(f'`{node.name}` : variable peut-être non initialisée')
+      return self.target(node.name), datatype
+    method = getattr(self, 'expression_' + type(node).__name__)
+    return method(node, state, datatype), datatype
+  def operand(self, node, state):
+    return self.expression(node, state)[0]
+  def term(self, node, state):
+    return self.expression(node, state, True)[0]
+  def indexes(self, node, state):
+    '''Python expressions of the indexes of an array element, with their size'''
+    name = node.var.name
+    _, sizes = self.array(name, node.var.namespace)
+    if len(node.indexes) != len(sizes):
+      raise Untyped(f'`{name}` : nombre d\'index invalide')
+    indexes = []
+    for index, size in zip(node.indexes, sizes):
+      code, datatype = self.expression(index, state)
+      if datatype != INTEGER:
+        raise Untyped(f'`{name}` : index de type `{datatype}`')
+      indexes.append((code, size))
+    return indexes
+  def in_range(self, index, size):
+    return index.isdigit() and int(index) < size
+  def position(self, indexes, sizes):
+    '''Position of an element in the list, from its indexes'''
+    terms, stride = [], 1
+    for index, size in zip(reversed(indexes), reversed(sizes)):
+      terms.append(index if stride == 1 else f'{index} * {stride}')
+      stride *= size
+    return ' + '.join(reversed(terms))
+  def element(self, node, state):
+    '''
+    Return the conditions checking the indexes of an array element and its
+    position in the list. An index is checked before the next one is
+    evaluated, as Array._offset does.
+    '''
+    checks, indexes = [], []
+    for index, size in self.indexes(node, state):
+      if self.in_range(index, size):
+        indexes.append(index)
+        continue
+      if SIMPLE.fullmatch(index):
+        checks.append(f'(0 <= {index} < {size} or _out_of_range({index}))')
+      else:
+        temporary = self.temporary()
+        checks.append(f'(0 <= ({temporary} := {index}) < {size} or _out_of_range({temporary}))')
+        index = temporary
+      indexes.append(index)
+    _, sizes = self.array(node.var.name, node.var.namespace)
+    return checks, self.position(indexes, sizes)
+  def read_element(self, node, state, missing, text=None):
+    '''Value of an array element, `missing` if it is undefined'''
+    checks, position = self.element(node, state)
+    value = self.temporary()
+    checks.append(f'({value} := {self.python_name(node.var.name)}[{position}]) is not None')
+    result = value if text is None else f'{text}({value})'
+    return f'({result} if {" and ".join(checks)} else {missing})'
+  def expression_ArrayGetItem(self, node, state, datatype):
+    return self.read_element(node, state, '_undefined()')
+  def read_field(self, node, state, missing, text=None):
+    '''Value of a structure field, `missing` if it is undefined'''
+    name, position, _ = self.path(self.field_path(node), node.namespace)
+    value = self.temporary()
+    result = value if text is None else f'{text}({value})'
+    return f'({result} if ({value} := {self.python_name(name)}[{position}]) is not None else {missing})'
+  def expression_StructureGetItem(self, node, state, datatype):
+    return self.read_field(node, state, '_undefined()')
+  def expression_BinOp(self, node, state, datatype):
+    a = self.term(node.a, state)
+    if node.op == 'NON':
+      return f'(not {a})'
+    b = self.term(node.b, state)
+    if node.op == '/':
+      return f'_divide({a}, {b})'
+    if node.op == 'DP':
+      return f'({a} % {b} == 0)'
+    return f'({a} {OPERATORS[node.op]} {b})'
+  expression_TypedBinOp = expression_BinOp
+  def expression_Neg(self, node, state, datatype):
+    return f'(-{self.operand(node.value, state)})'
+  def expression_Len(self, node, state, datatype):
+    return f'len({self.operand(node.value, state)})'
+  def expression_Mid(self, node, state, datatype):
+    args = (self.operand(n, state) for n in (node.exp, node.start, node.length))
+    return f'_mid({", ".join(args)})'
+  def expression_Trim(self, node, state, datatype):
+    trim = '_right' if node.right else '_left'
+    return f'{trim}({self.operand(node.exp, state)}, {self.operand(node.length, state)})'
+  def expression_Find(self, node, state, datatype):
+    return f'({self.operand(node.str1, state)}.find({self.operand(node.str2, state)}) + 1)'
+  def expression_Chr(self, node, state, datatype):
+    return f'chr({self.operand(node.value, state)})'
+  def expression_Ord(self, node, state, datatype):
+    return f'_ord({self.operand(node.value, state)})'
+  def conversion(self, node, state, function, checked):
+    code, datatype = self.expression(node.value, state)
+    if datatype == STRING and checked:
+      return f'{checked}({code})'
+    if datatype in BOOLEANS and function == 'str':
+      return f'_bool_str({code})'
+    return f'{function}({code})'
+  def expression_ToInteger(self, node, state, datatype):
+    return self.conversion(node, state, 'int', '_to_integer')
+  def expression_ToFloat(self, node, state, datatype):
+    return self.conversion(node, state, 'float', '_to_float')
+  def expression_ToString(self, node, state, datatype):
+    return self.conversion(node, state, 'str', None)
+  def expression_ToBoolean(self, node, state, datatype):
+    return self.conversion(node, state, 'bool', None)
+  def expression_Random(self, node, state, datatype):
+    return '_random()'
+  def expression_UnixTimestamp(self, node, state, datatype):
+    return '_time()'
+  def call(self, node, state):
+    '''Return the Python code of a call and the state after it'''
+    signature = self.signature(node.name, node.namespace)
+    callee = self.functions[node.name][2]
+    values, outputs = [], set()
+    for (name, datatype, reference), arg in zip(signature.params, node.params or []):
+      if reference:
+        if self.is_local(arg.name) and arg.name not in self.scope.references \
+            and arg.name not in self.scope.cells:
+          raise Untyped(f'`{arg.name}` : référence non prise en charge')
+        if not self.is_local(arg.name) and arg.name not in self.main.cells:
+          raise Untyped(f'`{arg.name}` : référence non prise en charge')
+        if arg.name in self.constants and not self.is_local(arg.name):
+          raise Untyped(f'`{arg.name}` : constante passée par référence')
+        if callee is self.scope and self.is_local(arg.name) \
+            and not (arg.name == name and arg.name in self.scope.references):
+          # the callee would resolve the name in its own frame, unless it
+          # is the same reference parameter: then it resolves to the caller's
+          raise Untyped(f'`{arg.name}` : référence récursive')
+        if arg.name not in state:
+          if callee.outputs is None or name in callee.needs_init:
+            if self.is_local(arg.name) and arg.name in self.scope.references:
+              self.scope.needs_init.add(arg.name)
+            else:
+              raise Untyped(f'`{arg.name}` : variable peut-être non initialisée')
+        if callee.outputs is not None and name in callee.outputs:
+          outputs.add(arg.name)
+        values.append(self.python_name(arg.name))
+        continue
+      code, argtype = self.expression(arg, state)
+      if datatype == FLOAT and argtype != FLOAT:
+        code = f'float({code})'
+      values.append(code)
+    return f'f_{node.name}({", ".join(values)})', state | outputs
+
+def _range(start, end, step):
+  if step > 0:
+    return range(start, end + 1, step)
+  if step < 0:
+    return range(start, end - 1, step)
+  # Pour ... Pas 0: endless loop unless it never starts
+  return _Endless(start) if start >= end else range(0)
+
+class _Endless:
+  def __init__(self, value):
+    self.value = value
+  def __iter__(self):
+    while True:
+      yield self.value
+  def __len__(self):
+    return 0
+
+class _Cell:
+  '''Variable passed by reference'''
+  __slots__ = ('v',)
+  def __init__(self):
+    self.v = None
+
+def _out_of_range(index):
+  raise IndexOutOfRange(f'Index hors limite : {index}')
+
+def _undefined():
+  raise VarUndefined('Valeur indéfinie.')
+
+def _array_str(values, sizes):
+  '''Text of an array as Array.__str__ writes it: nested lists, ? for undefined elements'''
+  items = ['?' if v is None else _bool_str(v) if isinstance(v, bool) else str(v) for v in values]
+  for size in reversed(sizes[1:]):
+    items = ['[' + ', '.join(items[i:i + size]) + ']' for i in range(0, len(items), size)]
+  return '[' + ', '.join(items) + ']'
+
+def _struct_str(values, booleans):
+  '''Text of a structure as StructureData.__str__ writes it: ? for undefined fields'''
+  return ','.join(_bool_str(v) if i in booleans else '?' if v is None else str(v)
+                  for i, v in enumerate(values))
+
+def _divide(a, b):
+  return BinOp.operations['/'](a, b)
+
+def _integer(value):
+  if isinstance(value, int):
+    return value
+  raise BadType(f'Type `Entier` attendu [{value}]')
+
+def _bool_str(value):
+  return 'VRAI' if value else 'FAUX'
+
+def _mid(exp, start, length):
+  return exp[start-1:start-1+length]
+
+def _left(exp, length):
+  return exp[:length]
+
+def _right(exp, length):
+  return exp[len(exp) - length:]
+
+def _ord(value):
+  if len(value) != 1:
+    raise BadType('CodeCar(`C`) : Chaîne de longueur 1 attendue')
+  return ord(value)
+
+def _to_integer(value):
+  try:
+    return int(value)
+  except ValueError:
+    raise BadType(f'Entier(N ou C) : conversion du type `{repr_datatype(STRING)}` impossible')
+
+def _to_float(value):
+  try:
+    return float(value)
+  except ValueError:
+    raise BadType(f'Entier(E ou C) : Conversion du type `{repr_datatype(STRING)}` impossible')
+
+def _random():
+  from random import random
+  return random()
+
+def _time():
+  from time import time
+  return time()
+
+def _sleep(duration):
+  from time import sleep
+  sleep(duration)
+
+def _input():
+  try:
+    return input()
+  except (KeyboardInterrupt, EOFError):
+    print()
+    print('\033[?1049l', end='')
+    raise InterruptedByUser('Interrompu par l\'utilisateur')
+
+def _read_integer():
+  value = _input()
+  try:
+    return int(value)
+  except ValueError:
+    raise BadType('Type `Entier` attendu')
+
+def _read_float():
+  value = _input()
+  try:
+    return float(value)
+  except ValueError:
+    raise BadType('Type `Numérique` attendu')
+
+def _read_string():
+  return _input()
+
+def _read_boolean():
+  value = _input()
+  if value not in ('VRAI', 'FAUX'):
+    raise BadType('Type `Booléen` attendu [?]')
+  return value == 'VRAI'
+
+RUNTIME = {name: value for name, value in globals().items() if name.startswith('_') and name[1:2] != '_'}
+
+def translate(tree):
+  '''Return (Python source, ALGO line numbers) or raise Untyped'''
+  return Translator(tree).translate()
+
+def run(python, lines):
+  '''Execute a translated program, reporting errors as the interpreter does'''
+  env = dict(RUNTIME)
+  env['_stdout'] = sys.stdout
+  env['_stderr'] = sys.stderr
+  try:
+    exec(compile(python, FILENAME, 'exec'), env)
+    env['_program']()
+  except RecursionError as e:
+    report('STOP : excès de récursivité !', e, lines)
+  except FralgoException as e:
+    report(e.message, e, lines)
+  except KeyboardInterrupt as e:
+    print()
+    print('\033[?1049l', end='')
+    report('Interrompu par l\'utilisateur', e, lines)
+
+def report(message, exception, lines):
+  lineno = 0
+  tb = exception.__traceback__
+  while tb is not None:
+    if tb.tb_frame.f_code.co_filename == FILENAME:
+      lineno = lines[tb.tb_lineno - 1]
+    tb = tb.tb_next
+  Node(lineno=lineno).handle_err(message)
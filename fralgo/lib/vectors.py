@@ -0,0 +1,196 @@
+'''Element by element operations on whole arrays: C ← A + B, Somme(T)'''
+#  _______ ______        _______ _____   _______ _______
+# |    ___|   __ \______|   _   |     |_|     __|       |
+# |    ___|      <______|       |       |    |  |   -   |
+# |___|   |___|__|      |___|___|_______|_______|_______|
+#
+# This file is part of FR-ALGO
+# Copyright © 2024-2026 Stéphane MEYER (Teegre)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+# OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import array as arrays
+from itertools import repeat
+
+from fralgo.lib.ast import BinOp
+from fralgo.lib.datatypes import Array, Base, TypedBuffer, map_type, own_box
+from fralgo.lib.exceptions import ArrayInvalidSize, BadType, VarUndefined
+
+# Operators applied element by element when an operand is an array.
+# Comparisons and logical operators keep comparing whole arrays.
+ELEMENTWISE = ('+', '-', '*', '/', '%', '^', '&')
+
+# Entier and Numérique arrays are computed with NumPy when it is installed,
+# unless use_numpy is False (--sans-numpy).
+use_numpy = True
+_numpy = None
+
+# array.array type code → NumPy type
+DTYPES = {'q': 'int64', 'd': 'float64'}
+
+def numpy():
+  '''The numpy module, or None when it is not installed or not used'''
+  global _numpy
+  if not use_numpy:
+    return None
+  if _numpy is None:
+    try:
+      import numpy as np
+      _numpy = np
+    except ImportError:
+      _numpy = False
+  return _numpy or None
+
+def operate(op, a, b):
+  '''a op b where a and/or b is an array: a new array of the results'''
+  if op not in ELEMENTWISE:
+    raise BadType(f'Opération `{op}` impossible sur des tableaux')
+  like = a if isinstance(a, Array) else b
+  indexes = _indexes(like)
+  if isinstance(a, Array) and isinstance(b, Array) and _indexes(b) != indexes:
+    raise ArrayInvalidSize(f'Tailles différentes : {_sizes(indexes)} et {_sizes(_indexes(b))}')
+  np = numpy()
+  if np is not None:
+    result = _numpy_operate(np, op, a, b)
+    if result is not None:
+      return _array(indexes, *result)
+  operation = BinOp.operations[op]
+  xs = _elements(a) if isinstance(a, Array) else repeat(a)
+  ys = _elements(b) if isinstance(b, Array) else repeat(b)
+  values = [operation(x, y) for x, y in zip(xs, ys)]
+  if not values:
+    return _array(indexes, like.datatype, values)
+  if any(type(v) is float for v in values):
+    return _array(indexes, 'Numérique', values)
+  return _array(indexes, map_type(values[0]).data_type, values)
+
+def total(array):
+  '''Somme(T): the sum of the elements of an array of Entier or Numérique'''
+  if not isinstance(array, Array):
+    raise BadType('Somme(T) : Type Tableau attendu')
+  buffer = array.value
+  if isinstance(buffer, TypedBuffer) and buffer.datatype != 'Booléen':
+    view = _view(numpy(), array)
+    if view is not None and view.dtype.kind == 'i' and len(view) * _bound(view) < 2**63:
+      return int(view.sum())
+    values = _elements(array)
+  else:
+    values = _elements(array)
+    for value in values:
+      if type(value) not in (int, float):
+        raise BadType('Somme(T) : Tableau de Entier ou Numérique attendu')
+  # same order, and same rounding, as a Pour loop
+  return sum(values)
+
+def _indexes(array):
+  if Array.nested(array.value):
+    return Array.get_indexes(array.value)
+  return array.indexes
+
+def _sizes(indexes):
+  return '[' + ', '.join(str(idx + 1) for idx in indexes) + ']'
+
+def _elements(array):
+  '''The elements of an array as Python values, in the order of a flat storage'''
+  value = array.value
+  if isinstance(value, TypedBuffer):
+    if value.count() != len(value):
+      raise VarUndefined('Valeur indéfinie')
+    if value.datatype == 'Booléen':
+      return [bool(v) for v in value.values]
+    return value.values
+  if Array.nested(value):
+    value = Array.flatten(value)
+  elements = []
+  for element in value or ():
+    if isinstance(element, Base):
+      if element.is_empty:
+        raise VarUndefined('Valeur indéfinie')
+      element = element.value
+    elements.append(element)
+  return elements
+
+def _array(indexes, datatype, values):
+  array = Array(datatype, *indexes)
+  if datatype in TypedBuffer.CODES:
+    array.value = TypedBuffer.of(datatype, values)
+  else:
+    array.value = [own_box(v) for v in values]
+  return array
+
+def _view(np, operand):
+  '''
+  NumPy array sharing the values of an Entier or Numérique array whose
+  elements are all defined, or None.
+  '''
+  if np is None:
+    return None
+  buffer = operand.value
+  if not isinstance(buffer, TypedBuffer) or not isinstance(buffer.values, arrays.array):
+    return None
+  dtype = DTYPES.get(buffer.values.typecode)
+  if dtype is None or len(buffer) == 0 or buffer.count() != len(buffer):
+    return None
+  return np.frombuffer(buffer.values, dtype=dtype)
+
+def _bound(values):
+  '''Largest absolute value of integers'''
+  return max(abs(int(values.min())), abs(int(values.max())))
+
+def _numpy_operate(np, op, a, b):
+  '''
+  a op b computed by NumPy: (type, array.array) or None when the operation
+  has to be done element by element, so that it behaves exactly the same:
+  other types, undefined elements, division by zero, Entier beyond 64 bits.
+  '''
+  if op in ('&', '^'):
+    return None
+  x = _view(np, a) if isinstance(a, Array) else _scalar(np, a)
+  y = _view(np, b) if isinstance(b, Array) else _scalar(np, b)
+  if x is None or y is None:
+    return None
+  if op in ('/', '%') and (y == 0).any():
+    return None
+  integers = x.dtype.kind == y.dtype.kind == 'i'
+  if integers:
+    bound = _bound(x) * _bound(y) if op == '*' else _bound(x) + _bound(y)
+    if bound >= 2**63:
+      return None
+  match op:
+    case '+':
+      result = x + y
+    case '-':
+      result = x - y
+    case '*':
+      result = x * y
+    case '/':
+      result = x // y if integers else x / y
+    case '%':
+      result = x % y
+  values = arrays.array('q' if integers else 'd')
+  values.frombytes(np.ascontiguousarray(result, dtype=DTYPES[values.typecode]).tobytes())
+  return ('Entier' if integers else 'Numérique'), values
+
+def _scalar(np, value):
+  if type(value) is int and -2**63 <= value < 2**63:
+    return np.asarray(value, dtype='int64')
+  if type(value) is float:
+    return np.asarray(value, dtype='float64')
+  return None
@@ -0,0 +1,182 @@
+'''Static type checker'''
+#  _______ ______        _______ _____   _______ _______
+# |    ___|   __ \______|   _   |     |_|     __|       |
+# |    ___|      <______|       |       |    |  |   -   |
+# |___|   |___|__|      |___|___|_______|_______|_______|
+#
+# This file is part of FR-ALGO
+# Copyright © 2024-2026 Stéphane MEYER (Teegre)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+# OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+from fralgo.lib.ast import Function, Node
+from fralgo.lib.ast import TypedBinOp, fields
+from fralgo.lib.datatypes import Base, Number
+from fralgo.lib.inference import BOOLEAN, BOXED, FLOAT, INTEGER, NUMBER, NUMBERS
+from fralgo.lib.inference import Declarations, Untyped, declared_type
+
+def compatible(target, value):
+  '''
+  Tell if a value of static type `value` can be stored as `target`:
+  True, False, or None when it depends on the value.
+  '''
+  if target == value or (target == BOOLEAN and value == BOXED):
+    return True
+  if target == FLOAT and value in NUMBERS:
+    return True
+  if target == INTEGER and value == NUMBER:
+    return None
+  return False
+
+def storable(target, value, node):
+  '''
+  Like compatible, for a value stored in an array: Array.set_value only
+  turns an Entier into a Numérique when it is a literal.
+  '''
+  if target == FLOAT and value == INTEGER:
+    return isinstance(node, Number)
+  if target == FLOAT and value == NUMBER:
+    return None
+  return compatible(target, value)
+
+def direct(node):
+  '''Tell if node evaluates to a Python value at once'''
+  return type(node) in TypedBinOp.direct or isinstance(node, TypedBinOp)
+
+def shown(datatype):
+  return BOOLEAN if datatype == BOXED else datatype
+
+class Verifier(Declarations):
+  '''
+  Check assignments, array stores, calls and returned values against the
+  declarations, before the execution. The nodes proven correct are marked
+  `checked` and skip their type checks at run time.
+  '''
+  def __init__(self, tree, namespace='main'):
+    super().__init__(tree, namespace)
+    self.errors = [] # (line, message)
+    self.lineno = 0
+    self.function = None # function being checked
+  def verify(self, tree):
+    '''Return the errors found: [(line, message)]'''
+    self.visit(tree)
+    return self.errors
+  def error(self, message):
+    self.errors.append((self.lineno, message))
+  def infer(self, node):
+    '''Static type of an expression, None if it is unknown'''
+    try:
+      return self.inference.infer(node)
+    except Untyped:
+      return None
+  def visit(self, node):
+    if isinstance(node, (list, tuple)):
+      for item in node:
+        self.visit(item)
+      return
+    attributes = fields(node)
+    if attributes is None or isinstance(node, Base):
+      return
+    if isinstance(node, Node):
+      self.lineno = node.lineno
+    if isinstance(node, Function):
+      self.visit_function(node)
+      return
+    method = getattr(self, 'verify_' + type(node).__name__, None)
+    if method is not None:
+      method(node)
+    for value in attributes.values():
+      self.visit(value)
+  def visit_function(self, function):
+    scope, caller = self.scope, self.function
+    self.scope, self.function = self.function_scope(function), function
+    # until a returned value is not proven
+    function.checked = function.return_type is not None
+    self.visit(function.body)
+    self.scope, self.function = scope, caller
+  def verify_Assign(self, node):
+    if isinstance(node.var, list):
+      namespace, name = node.var
+    else:
+      namespace, name = None, node.var
+    try:
+      target = self.variable_type(name, namespace)
+    except Untyped:
+      return
+    value = self.infer(node.value)
+    if value is None:
+      return
+    if compatible(target, value) is False:
+      self.error(f'`{name}` : type `{target}` attendu [{shown(value)}]')
+    elif target == value and direct(node.value):
+      node.checked = True
+  def verify_ArraySetItem(self, node):
+    name = node.var.name
+    try:
+      target = self.array_type(name, node.var.namespace)
+    except Untyped:
+      return
+    indexes = [self.infer(index) for index in node.indexes]
+    for index in indexes:
+      if index not in (None, INTEGER, NUMBER):
+        self.error(f'`{name}` : index de type `{shown(index)}`, `{INTEGER}` attendu')
+    value = self.infer(node.value)
+    if value is None:
+      return
+    if storable(target, value, node.value) is False:
+      self.error(f'`{name}` : type `{target}` attendu [{shown(value)}]')
+    elif target == value and direct(node.value) and all(i == INTEGER for i in indexes):
+      node.checked = True
+  def verify_FunctionCall(self, node):
+    try:
+      signature = self.signature(node.name, node.namespace)
+    except Untyped:
+      return
+    args = node.params or []
+    if len(args) != len(signature.params):
+      a, x = len(args), len(signature.params)
+      self.error(f'`{node.name}` nombre de paramètres invalide : {a}, attendu {x}')
+      return
+    checked = True
+    for i, ((_, datatype, reference), arg) in enumerate(zip(signature.params, args), 1):
+      value = None if reference else self.infer(arg)
+      ok = None if value is None else compatible(datatype, value)
+      if ok is False:
+        self.error(f'`{node.name}` : type `{datatype}` attendu [paramètre {i}]')
+      checked = checked and ok is True
+    node.checked = checked
+  def verify_FunctionReturn(self, node):
+    function = self.function
+    if function is None:
+      self.error('`Retourne` en dehors d\'une fonction')
+      return
+    if function.return_type is None:
+      self.error(f'`{function.name}` : instruction `Retourne` inattendue')
+      return
+    try:
+      target = declared_type(function.return_type)
+    except Untyped:
+      function.checked = False
+      return
+    value = self.infer(node.expression)
+    if target == value or (target == BOOLEAN and value == BOXED):
+      return
+    function.checked = False
+    if value not in (None, NUMBER):
+      self.error(f'`{function.name}` : type `{target}` attendu [{shown(value)}]')
@@ -0,0 +1,829 @@
+'''Register-based virtual machine'''
+#  _______ ______        _______ _____   _______ _______
+# |    ___|   __ \______|   _   |     |_|     __|       |
+# |    ___|      <______|       |       |    |  |   -   |
+# |___|   |___|__|      |___|___|_______|_______|_______|
+#
+# This file is part of FR-ALGO
+# Copyright © 2024-2026 Stéphane MEYER (Teegre)
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES
+# OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT.
+# IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM,
+# DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
+# TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE
+# OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import sys
+from copy import deepcopy
+
+from fralgo.lib.ast import ArrayGetItem, BinOp, Declare, DeclareArray, DeclareConst, DeclareStruct
+from fralgo.lib.ast import Function, FunctionCall, Node, StructureGetItem, Variable
+from fralgo.lib.datatypes import Array, Base, Boolean, Integer, Nothing, Structure, StructureData
+from fralgo.lib.exceptions import FralgoException, VarUndefined, ZeroDivide
+from fralgo.lib.inference import ARRAY, BOOLEAN, BOOLEANS, FLOAT, INTEGER, STRING, Untyped
+from fralgo.lib.inference import arithmetic, assignable
+from fralgo.lib.transpiler import Translator, flatten, has_call, is_structure
+from fralgo.lib import transpiler as rt
+
+# Instruction set. An instruction is a tuple (opcode, a, b, c);
+# r is the frame of the running function, g the frame of the main program.
+# Undefined elements and fields are read as Nothing.
+MOVE = 0      # r[a] ← r[b]
+LOADG = 1     # r[a] ← g[b]
+STOREG = 2    # g[a] ← r[b]
+CELLGET = 3   # r[a] ← r[b].v
+CELLSET = 4   # r[a].v ← r[b]
+GCELLGET = 5  # r[a] ← g[b].v
+GCELLSET = 6  # g[a].v ← r[b]
+NEWCELL = 7   # r[a] ← new cell
+ADD = 8       # r[a] ← r[b] + r[c] (Entier or Numérique, known at run time)
+SUB = 9
+MUL = 10
+MOD = 11
+POW = 12
+IDIV = 13     # r[a] ← r[b] // r[c] (integers)
+DIV = 14      # r[a] ← r[b] / r[c] (any number)
+DP = 15       # r[a] ← r[b] is a multiple of r[c]
+EQ = 16
+NE = 17
+LT = 18
+LE = 19
+GT = 20
+GE = 21
+AND = 22
+OR = 23
+XOR = 24
+NOT = 25      # r[a] ← not r[b]
+NEG = 26      # r[a] ← -r[b]
+TOFLOAT = 27  # r[a] ← float(r[b])
+TOINT = 28    # r[a] ← r[b], which must be an integer
+JMP = 29      # go to a
+JMPF = 30     # go to b if r[a] is false
+FORPREP = 31  # skip the loop (go to c) if r[a] is past r[b] = (end, step)
+FORLOOP = 32  # r[a] += step, r[var] ← r[a], loop (go to c) if not past end; b = (end, step, var)
+CALL = 33     # r[a] ← b(*r[c])
+CALLPY = 34   # r[a] ← b(*r[c]) for a Python function
+RET = 35      # return r[a]
+RETNONE = 36
+PRINT = 37    # write r[a] elements (register, format), end b, on stderr if c
+ADDI = 38     # r[a] ← r[b] + r[c] (Entier)
+SUBI = 39
+MULI = 40
+MODI = 41
+ADDF = 42     # r[a] ← r[b] + r[c] (Numérique)
+SUBF = 43
+MULF = 44
+CONCAT = 45   # r[a] ← r[b] & r[c]
+NEWARRAY = 46 # r[a] ← new array of the type and sizes of b
+ARRGET = 47   # r[a] ← r[b][r[c]...], which must be defined
+ARRPEEK = 48  # r[a] ← r[b][r[c]...]
+ARRSET = 49   # r[a][r[b]...] ← r[c]
+NEWSTRUCT = 50 # r[a] ← new structure shaped as b
+FIELD = 51    # r[a] ← field c of r[b] (a structure)
+FIELDGET = 52 # r[a] ← field c of r[b], which must be defined
+FIELDPEEK = 53 # r[a] ← field c of r[b]
+FIELDSET = 54 # field b of r[a] ← r[c]
+COPY = 55     # fields of r[a] ← copy of the fields of r[b]
+TAILCALL = 56 # return b(*r[c]), run in place of the running function
+
+OPNAMES = {value: name for name, value in globals().items() if name.isupper() and isinstance(value, int)}
+
+BINARY = {
+  '+': ADD, '-': SUB, '*': MUL, '%': MOD, '^': POW, '&': CONCAT, 'DP': DP,
+  '=': EQ, '<>': NE, '<': LT, '<=': LE, '>': GT, '>=': GE,
+  'ET': AND, 'OU': OR, 'OUX': XOR,
+}
+
+# Operations on operands of a given type: (operator, type of the result) → opcode
+TYPED = {
+  ('+', INTEGER): ADDI, ('-', INTEGER): SUBI, ('*', INTEGER): MULI, ('%', INTEGER): MODI,
+  ('+', FLOAT): ADDF, ('-', FLOAT): SUBF, ('*', FLOAT): MULF,
+}
+
+# Print formats
+PLAIN, TEXT, TRUTH = 0, 1, 2
+
+class Code:
+  '''Compiled function (or main program)'''
+  def __init__(self, name, params=0):
+    self.name = name
+    self.params = params
+    self.instructions = []
+    self.lines = []
+    self.registers = [] # initial frame: constants, None elsewhere
+    self.names = {} # register → variable name
+    self.constants = {} # register → value
+  def __repr__(self):
+    return f'<{self.name}>'
+
+class VMError(Exception):
+  def __init__(self, exception, lineno):
+    super().__init__(str(exception))
+    self.exception = exception
+    self.lineno = lineno
+
+def _find(str1, str2):
+  return str1.find(str2) + 1
+
+def _new_array(shape):
+  '''A new array of the type and sizes of shape, its elements undefined'''
+  array = Array(shape.datatype, *shape.indexes)
+  array.value = array.new_array(*array.sizes)
+  return array
+
+def _new_structure(shape):
+  '''A new instance of the structure of shape, its fields undefined'''
+  structure = StructureData(shape.structure)
+  structure.data = deepcopy(shape.data)
+  return structure
+
+def _print(elements, end, err, r):
+  result = []
+  for reg, fmt in elements:
+    value = r[reg]
+    if fmt == TRUTH:
+      result.append('VRAI' if value else 'FAUX')
+    elif fmt == PLAIN:
+      result.append(str(value))
+    else:
+      result.append(value)
+  std = sys.stderr if err else sys.stdout
+  std.write(' '.join(result) + end)
+  std.flush()
+
+def machine(g):
+  '''Return the function executing code with the main program frame g'''
+  divide = BinOp.operations['/']
+  nothing = Nothing()
+  def execute(code, r):
+    instructions = code.instructions
+    pc = 0
+    try:
+      while True:
+        op, a, b, c = instructions[pc]
+        pc += 1
+        if op == MOVE:
+          r[a] = r[b]
+        elif op == FORLOOP:
+          end, step, var = b
+          i = r[a] = r[a] + r[step]
+          r[var] = i
+          if (i <= r[end]) if r[step] > 0 else (i >= r[end]):
+            pc = c
+        elif op == JMPF:
+          if not r[a]:
+            pc = b
+        elif op == JMP:
+          pc = a
+        elif op == ADDI:
+          r[a] = r[b] + r[c]
+        elif op == SUBI:
+          r[a] = r[b] - r[c]
+        elif op == ARRGET:
+          array = r[b]
+          index = r[c[0]]
+          if len(c) != 1 or not 0 <= index < array.sizes[0]:
+            index = array._offset([r[i] for i in c])
+          value = r[a] = array.value.get(index, nothing)
+          if value is nothing:
+            raise VarUndefined('Valeur indéfinie.')
+        elif op == ARRSET:
+          array, value = r[a], r[c]
+          if value is nothing:
+            value = array.value.box(None)
+          index = r[b[0]]
+          if len(b) != 1 or not 0 <= index < array.sizes[0]:
+            index = array._offset([r[i] for i in b])
+          array.value[index] = value
+        elif op == MULI:
+          r[a] = r[b] * r[c]
+        elif op == ADDF:
+          r[a] = r[b] + r[c]
+        elif op == SUBF:
+          r[a] = r[b] - r[c]
+        elif op == MULF:
+          r[a] = r[b] * r[c]
+        elif op == MODI:
+          r[a] = r[b] % r[c]
+        elif op == FIELDGET:
+          value = r[a] = r[b].data[c].value
+          if value is nothing:
+            raise VarUndefined('Valeur indéfinie.')
+        elif op == FIELDSET:
+          r[a].data[b].value = r[c]
+        elif op == FIELD:
+          r[a] = r[b].data[c]
+        elif op == CONCAT:
+          r[a] = r[b] + r[c]
+        elif op == ADD:
+          r[a] = r[b] + r[c]
+        elif op == SUB:
+          r[a] = r[b] - r[c]
+        elif op == LT:
+          r[a] = r[b] < r[c]
+        elif op == EQ:
+          r[a] = r[b] == r[c]
+        elif op == MUL:
+          r[a] = r[b] * r[c]
+        elif op == MOD:
+          r[a] = r[b] % r[c]
+        elif op == LOADG:
+          r[a] = g[b]
+        elif op == STOREG:
+          g[a] = r[b]
+        elif op == CALL:
+          frame = b.registers[:]
+          for i, reg in enumerate(c):
+            frame[i] = r[reg]
+          r[a] = execute(b, frame)
+        elif op == TAILCALL:
+          frame = b.registers[:]
+          for i, reg in enumerate(c):
+            frame[i] = r[reg]
+          code, instructions, r, pc = b, b.instructions, frame, 0
+        elif op == RET:
+          return r[a]
+        elif op == RETNONE:
+          return None
+        elif op == LE:
+          r[a] = r[b] <= r[c]
+        elif op == GT:
+          r[a] = r[b] > r[c]
+        elif op == GE:
+          r[a] = r[b] >= r[c]
+        elif op == NE:
+          r[a] = r[b] != r[c]
+        elif op == CELLGET:
+          r[a] = r[b].v
+        elif op == CELLSET:
+          r[a].v = r[b]
+        elif op == GCELLGET:
+          r[a] = g[b].v
+        elif op == GCELLSET:
+          g[a].v = r[b]
+        elif op == IDIV:
+          if r[c] == 0:
+            raise ZeroDivide('Division par zéro')
+          r[a] = r[b] // r[c]
+        elif op == DIV:
+          r[a] = divide(r[b], r[c])
+        elif op == POW:
+          r[a] = r[b] ** r[c]
+        elif op == DP:
+          r[a] = r[b] % r[c] == 0
+        elif op == AND:
+          r[a] = r[b] & r[c]
+        elif op == OR:
+          r[a] = r[b] | r[c]
+        elif op == XOR:
+          r[a] = r[b] ^ r[c]
+        elif op == NOT:
+          r[a] = not r[b]
+        elif op == NEG:
+          r[a] = -r[b]
+        elif op == TOFLOAT:
+          r[a] = float(r[b])
+        elif op == TOINT:
+          r[a] = rt._integer(r[b])
+        elif op == FORPREP:
+          end, step = b
+          i = r[a]
+          if not ((i <= r[end]) if r[step] > 0 else (i >= r[end])):
+            pc = c
+        elif op == CALLPY:
+          r[a] = b(*[r[reg] for reg in c])
+        elif op == PRINT:
+          _print(a, b, c, r)
+        elif op == NEWCELL:
+          r[a] = rt._Cell()
+        elif op == ARRPEEK:
+          array = r[b]
+          r[a] = array.value.get(array._offset([r[i] for i in c]), nothing)
+        elif op == FIELDPEEK:
+          r[a] = r[b].data[c].value
+        elif op == COPY:
+          r[a].data = deepcopy(r[b].data)
+        elif op == NEWARRAY:
+          r[a] = _new_array(b)
+        elif op == NEWSTRUCT:
+          r[a] = _new_structure(b)
+        else:
+          raise FralgoException(f'Instruction inconnue : {op}')
+    except VMError:
+      raise
+    except (FralgoException, RecursionError, KeyboardInterrupt) as e:
+      raise VMError(e, code.lines[pc - 1])
+  return execute
+
+class Compiler:
+  '''
+  Compile a program into register code.
+  Only programs the Python translator accepts are compiled: they share
+  its static checks (types, initialized variables, name resolution).
+  Arrays and structures are those of the interpreter: Array (with a
+  TypedBuffer) and StructureData.
+  '''
+  def __init__(self, tree):
+    self.checker = Translator(tree)
+    self.checker.translate()
+    self.structures = {} # name → Structure
+    for stmt, _ in flatten(tree):
+      if isinstance(stmt, DeclareStruct):
+        self.structures[stmt.name] = Structure(stmt.name, stmt.fields)
+    self.main = Code('programme principal')
+    self.codes = {} # function name → Code
+    self.scope = None
+    self.code = None
+    self.slots = {}
+    self.loops = []
+    self.lineno = 0
+
+  def compile(self):
+    '''Return the Code of the main program and of the functions'''
+    checker = self.checker
+    self.main_slots = self.allocate(self.main, checker.main)
+    for name, (_, signature, _) in checker.functions.items():
+      self.codes[name] = Code(name, len(signature.params))
+    for name, (function, _, scope) in checker.functions.items():
+      self.compile_scope(self.codes[name], scope, list(flatten(function.body)))
+    self.compile_scope(self.main, checker.main, list(flatten(checker.tree)), self.main_slots)
+    return self.main, self.codes
+
+  # Registers
+
+  def allocate(self, code, scope):
+    slots = {}
+    for name in scope.variables:
+      slots[name] = self.register(code, name)
+    return slots
+  def register(self, code, name=None):
+    code.registers.append(None)
+    reg = len(code.registers) - 1
+    if name is not None:
+      code.names[reg] = name
+    return reg
+  def temporary(self):
+    return self.register(self.code)
+  def constant(self, value):
+    reg = self.register(self.code)
+    self.code.registers[reg] = value
+    self.code.constants[reg] = value
+    return reg
+
+  # Instructions
+
+  def emit(self, op, a=None, b=None, c=None):
+    self.code.instructions.append([op, a, b, c])
+    self.code.lines.append(self.lineno)
+    return len(self.code.instructions) - 1
+  def here(self):
+    return len(self.code.instructions)
+  def patch(self, index, field, target):
+    self.code.instructions[index][field] = target
+
+  # Scopes
+
+  def compile_scope(self, code, scope, statements, slots=None):
+    self.code = code
+    self.scope = scope
+    self.checker.scope = scope
+    self.slots = slots if slots is not None else self.allocate(code, scope)
+    is_main = scope is self.checker.main
+    self.lineno = 0
+    for name in scope.cells:
+      self.emit(NEWCELL, self.slots[name])
+    for name, datatype in scope.variables.items():
+      if isinstance(datatype, tuple):
+        # a new array or structure at each call
+        op = NEWARRAY if datatype[0] == ARRAY else NEWSTRUCT
+        self.emit(op, self.slots[name], self.shape(datatype))
+    for stmt, lineno in statements:
+      self.lineno = lineno
+      if isinstance(stmt, (Declare, DeclareArray, DeclareStruct, Function)):
+        continue
+      if isinstance(stmt, DeclareConst) and is_main:
+        self.store(stmt.name, self.value(stmt.value))
+        continue
+      getattr(self, 'statement_' + type(stmt).__name__)(stmt)
+    self.emit(RETNONE)
+    code.instructions = [tuple(i) for i in code.instructions]
+  def shape(self, datatype):
+    '''Array or structure new ones are made after'''
+    if datatype[0] == ARRAY:
+      _, elements, sizes = datatype
+      return Array(elements, *(size - 1 for size in sizes))
+    structure = StructureData(self.structures[datatype[1]])
+    structure.set_get_structure(self.structures.get)
+    structure.data = structure.new_structure_data()
+    return structure
+
+  # Variables
+
+  def kind(self, name):
+    '''Where a variable lives: reg, cell, global or gcell, and its register'''
+    if self.scope is not self.checker.main and name in self.scope.variables:
+      cell = name in self.scope.references or name in self.scope.cells
+      return ('cell' if cell else 'reg'), self.slots[name]
+    slot = self.main_slots[name]
+    cell = name in self.checker.main.cells
+    if self.scope is self.checker.main:
+      return ('cell' if cell else 'reg'), slot
+    return ('gcell' if cell else 'global'), slot
+  def load(self, name, dest=None):
+    kind, slot = self.kind(name)
+    if kind == 'reg':
+      if dest is not None and dest != slot:
+        self.emit(MOVE, dest, slot)
+        return dest
+      return slot
+    dest = self.temporary() if dest is None else dest
+    op = {'cell': CELLGET, 'global': LOADG, 'gcell': GCELLGET}[kind]
+    self.emit(op, dest, slot)
+    return dest
+  def store(self, name, src):
+    kind, slot = self.kind(name)
+    if kind == 'reg':
+      if src != slot:
+        self.emit(MOVE, slot, src)
+      return
+    op = {'cell': CELLSET, 'global': STOREG, 'gcell': GCELLSET}[kind]
+    self.emit(op, slot, src)
+  def destination(self, name):
+    '''Register an expression assigned to a variable can be computed into'''
+    kind, slot = self.kind(name)
+    return slot if kind == 'reg' else None
+
+  # Statements
+
+  def converted(self, target, node, dest=None):
+    '''Register of the value of node stored as `target`, dest if given'''
+    conversion = assignable(target, self.checker.inference.infer(node))
+    src = self.value(node, dest if conversion is None else None)
+    if conversion is None:
+      return src
+    dest = self.temporary() if dest is None else dest
+    self.emit(TOFLOAT if conversion == 'float' else TOINT, dest, src)
+    return dest
+  def assign(self, name, node):
+    target = self.checker.variable_type(name)
+    self.store(name, self.converted(target, node, self.destination(name)))
+  def statement_Assign(self, stmt):
+    if is_structure(self.checker.declared(stmt.var, None)):
+      self.copy((stmt.var,), stmt.value)
+      return
+    self.assign(stmt.var, stmt.value)
+  def statement_ArraySetItem(self, stmt):
+    datatype = self.checker.array_type(stmt.var.name, stmt.var.namespace)
+    value = stmt.value
+    if type(value) is ArrayGetItem and self.checker.inference.infer(value) == datatype:
+      # an undefined element is copied as it is
+      src = self.temporary()
+      self.element(ARRPEEK, src, value)
+    elif datatype == FLOAT and type(value) is Integer:
+      # number literals only are converted
+      src = self.constant(float(value.eval()))
+    else:
+      # the value is evaluated before the indexes
+      src = self.value(value, self.temporary() if has_call(stmt.indexes) else None)
+    indexes = self.indexes(stmt)
+    self.emit(ARRSET, self.load(stmt.var.name), indexes, src)
+  def statement_StructureSetItem(self, stmt):
+    names = stmt.var if isinstance(stmt.var, tuple) else (stmt.var,)
+    if stmt.field is not None:
+      names += (stmt.field,)
+    if isinstance(stmt.value, list):
+      self.sequence(names, stmt.value)
+      return
+    _, _, datatype = self.checker.path(names, stmt.namespace)
+    if is_structure(datatype):
+      self.copy(names, stmt.value)
+      return
+    value = stmt.value
+    structure = self.record(names[:-1])
+    if type(value) is StructureGetItem and self.checker.inference.infer(value) == datatype in (STRING, BOOLEAN):
+      # an undefined Chaîne or Booléen is copied as it is
+      source = self.checker.field_path(value)
+      src = self.temporary()
+      self.emit(FIELDPEEK, src, self.record(source[:-1]), source[-1])
+    else:
+      src = self.converted(datatype, value)
+    self.emit(FIELDSET, structure, names[-1], src)
+  def sequence(self, names, values):
+    '''Fields of a structure ← values, one after the other'''
+    _, _, datatype = self.checker.path(names)
+    fields, _ = self.checker.structures[datatype[1]]
+    structure = self.record(names)
+    for (field, (_, fieldtype)), value in zip(fields.items(), values):
+      self.emit(FIELDSET, structure, field, self.converted(fieldtype, value))
+  def copy(self, names, value):
+    '''A structure ← a copy of another one of the same type'''
+    structure = self.record(names)
+    source = (value.name,) if type(value) is Variable else self.checker.field_path(value)
+    self.emit(COPY, structure, self.record(source))
+  def statement_Read(self, stmt):
+    datatype = self.checker.variable_type(stmt.var)
+    reader = {INTEGER: rt._read_integer, FLOAT: rt._read_float,
+              STRING: rt._read_string}.get(datatype, rt._read_boolean)
+    dest = self.destination(stmt.var)
+    dest = self.temporary() if dest is None else dest
+    self.emit(CALLPY, dest, reader, ())
+    self.store(stmt.var, dest)
+  def statement_Print(self, stmt):
+    elements = []
+    for element in stmt.data:
+      if self.checker.composite(element) is not None:
+        # written as the interpreter writes an Array or a StructureData
+        if type(element) is Variable:
+          elements.append((self.load(element.name), PLAIN))
+        else:
+          elements.append((self.record(self.checker.field_path(element)), PLAIN))
+        continue
+      datatype = self.checker.inference.infer(element)
+      if type(element) in (ArrayGetItem, StructureGetItem):
+        # an undefined element or field is written: ?, FAUX for a Booléen
+        reg = self.temporary()
+        if type(element) is ArrayGetItem:
+          self.element(ARRPEEK, reg, element)
+        else:
+          names = self.checker.field_path(element)
+          self.emit(FIELDPEEK, reg, self.record(names[:-1]), names[-1])
+        elements.append((reg, TRUTH if datatype == BOOLEAN else PLAIN))
+        continue
+      if isinstance(element, (BinOp, Variable)) and has_call(element):
+        # Print.eval evaluates these twice
+        self.value(element)
+      reg = self.value(element)
+      if datatype in BOOLEANS:
+        fmt = PLAIN if type(element) is Boolean else TRUTH
+      else:
+        fmt = TEXT if datatype == STRING else PLAIN
+      elements.append((reg, fmt))
+    self.emit(PRINT, tuple(elements), '\n' if stmt.newline else '', stmt.err)
+  statement_PrintErr = statement_Print
+  def statement_If(self, stmt):
+    jump = self.emit(JMPF, self.value(stmt.condition))
+    self.block(stmt.dothis)
+    if stmt.dothat is None:
+      self.patch(jump, 2, self.here())
+      return
+    end = self.emit(JMP)
+    self.patch(jump, 2, self.here())
+    self.block(stmt.dothat)
+    self.patch(end, 1, self.here())
+  def block(self, node):
+    for stmt, lineno in flatten(node):
+      self.lineno = lineno
+      if isinstance(stmt, (Declare, DeclareArray, DeclareStruct)):
+        continue
+      getattr(self, 'statement_' + type(stmt).__name__)(stmt)
+  def loop(self, body, restart):
+    self.loops.append((restart, []))
+    self.block(body)
+    _, exits = self.loops.pop()
+    return exits
+  def statement_While(self, stmt):
+    start = self.here()
+    jump = self.emit(JMPF, self.value(stmt.condition))
+    exits = self.loop(stmt.dothis, start)
+    self.emit(JMP, start)
+    for index in exits + [jump]:
+      self.patch(index, 2 if index == jump else 1, self.here())
+  def statement_For(self, stmt):
+    start, end, step = (self.value(n, self.temporary()) for n in (stmt.start, stmt.end, stmt.step))
+    counter = start
+    self.store(stmt.var, counter)
+    var = self.destination(stmt.var)
+    prep = self.emit(FORPREP, counter, (end, step))
+    body = self.here()
+    if var is None:
+      # global or cell: FORLOOP updates a scratch register
+      var = self.temporary()
+      self.store(stmt.var, counter)
+      update = True
+    else:
+      update = False
+    self.loops.append((None, []))
+    self.block(stmt.dothis)
+    _, exits = self.loops.pop()
+    loop = self.emit(FORLOOP, counter, (end, step, var), body)
+    if update:
+      self.store(stmt.var, counter)
+    for index in exits:
+      self.patch(index, 1, loop if self.code.instructions[index][1] == 'continue' else self.here())
+    self.patch(prep, 3, self.here())
+  def statement_Continue(self, stmt):
+    restart, exits = self.loops[-1]
+    if restart is None:
+      exits.append(self.emit(JMP, 'continue'))
+    else:
+      self.emit(JMP, restart)
+  def statement_Exit(self, stmt):
+    self.loops[-1][1].append(self.emit(JMP, 'exit'))
+  def statement_FunctionReturn(self, stmt):
+    expression = stmt.expression
+    if isinstance(expression, Node) and not expression.children:
+      expression = expression.statement
+    if isinstance(expression, FunctionCall) and expression.tail:
+      self.call(expression, None, TAILCALL)
+      return
+    self.emit(RET, self.value(stmt.expression))
+  def statement_ProcTerminate(self, stmt):
+    self.emit(RETNONE)
+  def statement_Sleep(self, stmt):
+    self.builtin(self.temporary(), rt._sleep, stmt.duration)
+  def statement_FunctionCall(self, stmt):
+    if stmt.tail and self.checker.signature(stmt.name, stmt.namespace).result is None:
+      # a procedure ending the body: nothing to return but its None
+      self.call(stmt, None, TAILCALL)
+      return
+    self.call(stmt, self.temporary())
+
+  # Expressions
+
+  def value(self, node, dest=None):
+    '''Compile an expression, return the register holding its value'''
+    if isinstance(node, Node):
+      return self.value(node.statement, dest)
+    if isinstance(node, Base):
+      reg = self.constant(node.eval())
+      if dest is not None:
+        self.emit(MOVE, dest, reg)
+        return dest
+      return reg
+    if type(node) is Variable:
+      return self.load(node.name, dest)
+    if isinstance(node, FunctionCall):
+      return self.call(node, self.temporary() if dest is None else dest)
+    dest = self.temporary() if dest is None else dest
+    getattr(self, 'value_' + type(node).__name__)(node, dest)
+    return dest
+  def value_BinOp(self, node, dest):
+    infer = self.checker.inference.infer
+    if node.op == 'NON':
+      self.emit(NOT, dest, self.value(node.a))
+      return
+    a, b = self.value(node.a), self.value(node.b)
+    if node.op == '/':
+      op = IDIV if infer(node.a) == infer(node.b) == INTEGER else DIV
+    elif node.op in ('+', '-', '*', '%'):
+      op = TYPED.get((node.op, arithmetic(infer(node.a), infer(node.b))), BINARY[node.op])
+    else:
+      op = BINARY[node.op]
+    self.emit(op, dest, a, b)
+  value_TypedBinOp = value_BinOp
+  def indexes(self, node):
+    '''Registers of the indexes of an array element'''
+    if has_call(node.indexes[1:]):
+      # Array._offset checks an index before the next one is evaluated
+      raise Untyped(f'`{node.var.name}` : index calculé par une fonction')
+    return tuple(self.value(index) for index in node.indexes)
+  def element(self, op, dest, node):
+    '''dest ← an element of an array, read by ARRGET or ARRPEEK'''
+    array = self.load(node.var.name)
+    self.emit(op, dest, array, self.indexes(node))
+  def value_ArrayGetItem(self, node, dest):
+    self.element(ARRGET, dest, node)
+  def record(self, names):
+    '''Register of the structure names = (variable, field...) stand for'''
+    reg = self.load(names[0])
+    for field in names[1:]:
+      structure = self.temporary()
+      self.emit(FIELD, structure, reg, field)
+      reg = structure
+    return reg
+  def value_StructureGetItem(self, node, dest):
+    names = self.checker.field_path(node)
+    self.emit(FIELDGET, dest, self.record(names[:-1]), names[-1])
+  def value_Neg(self, node, dest):
+    self.emit(NEG, dest, self.value(node.value))
+  def builtin(self, dest, function, *nodes):
+    self.emit(CALLPY, dest, function, tuple(self.value(n) for n in nodes))
+  def value_Len(self, node, dest):
+    self.builtin(dest, len, node.value)
+  def value_Mid(self, node, dest):
+    self.builtin(dest, rt._mid, node.exp, node.start, node.length)
+  def value_Trim(self, node, dest):
+    self.builtin(dest, rt._right if node.right else rt._left, node.exp, node.length)
+  def value_Find(self, node, dest):
+    self.builtin(dest, _find, node.str1, node.str2)
+  def value_Chr(self, node, dest):
+    self.builtin(dest, chr, node.value)
+  def value_Ord(self, node, dest):
+    self.builtin(dest, rt._ord, node.value)
+  def conversion(self, node, dest, function, checked):
+    datatype = self.checker.inference.infer(node.value)
+    if datatype == STRING and checked is not None:
+      function = checked
+    elif datatype in BOOLEANS and function is str:
+      function = rt._bool_str
+    self.builtin(dest, function, node.value)
+  def value_ToInteger(self, node, dest):
+    self.conversion(node, dest, int, rt._to_integer)
+  def value_ToFloat(self, node, dest):
+    self.conversion(node, dest, float, rt._to_float)
+  def value_ToString(self, node, dest):
+    self.conversion(node, dest, str, None)
+  def value_ToBoolean(self, node, dest):
+    self.conversion(node, dest, bool, None)
+  def value_Random(self, node, dest):
+    self.builtin(dest, rt._random)
+  def value_UnixTimestamp(self, node, dest):
+    self.builtin(dest, rt._time)
+  def call(self, node, dest, op=CALL):
+    signature = self.checker.signature(node.name, node.namespace)
+    args = []
+    for (_, datatype, reference), arg in zip(signature.params, node.params or []):
+      if reference:
+        # pass the cell itself
+        kind, slot = self.kind(arg.name)
+        if kind == 'gcell':
+          reg = self.temporary()
+          self.emit(LOADG, reg, slot)
+          args.append(reg)
+        else:
+          args.append(slot)
+        continue
+      reg = self.value(arg)
+      if datatype == FLOAT and self.checker.inference.infer(arg) != FLOAT:
+        converted = self.temporary()
+        self.emit(TOFLOAT, converted, reg)
+        reg = converted
+      args.append(reg)
+    self.emit(op, dest, self.codes[node.name], tuple(args))
+    return dest
+
+def compile_program(tree):
+  '''Return the Code of the main program and of its functions, or raise Untyped'''
+  return Compiler(tree).compile()
+
+def run(main):
+  '''Execute a compiled program, reporting errors as the interpreter does'''
+  g = main.registers[:]
+  execute = machine(g)
+  try:
+    execute(main, g)
+  except VMError as e:
+    if isinstance(e.exception, KeyboardInterrupt):
+      print()
+      print('\033[?1049l', end='')
+      message = 'Interrompu par l\'utilisateur'
+    elif isinstance(e.exception, RecursionError):
+      message = 'STOP : excès de récursivité !'
+    else:
+      message = e.exception.message
+    Node(lineno=e.lineno).handle_err(message)
+
+# Disassembler
+
+def disassemble(main, codes, out=None):
+  '''Write a listing of the compiled program'''
+  out = sys.stdout if out is None else out
+  for code in [main, *codes.values()]:
+    out.write(f'{code.name} ({len(code.instructions)} instructions, {len(code.registers)} registres)\n')
+    for address, (instruction, lineno) in enumerate(zip(code.instructions, code.lines)):
+      op, *operands = instruction
+      text = ', '.join(operand(code, op, i, value) for i, value in enumerate(operands) if value is not None)
+      out.write(f'{lineno:>6} {address:>6}  {OPNAMES[op]:<9} {text}\n')
+    out.write('\n')
+
+def register_name(code, reg):
+  if reg in code.constants:
+    return repr(code.constants[reg])
+  if reg in code.names:
+    return f'r{reg}({code.names[reg]})'
+  return f'r{reg}'
+
+def operand(code, op, index, value):
+  if op in (LOADG, GCELLGET) and index == 1 or op in (STOREG, GCELLSET) and index == 0:
+    return f'g{value}'
+  if op == JMP or op == JMPF and index == 1 or op in (FORPREP, FORLOOP) and index == 2:
+    return f'→{value}'
+  if op == PRINT and index == 0:
+    return '(' + ', '.join(register_name(code, reg) for reg, _ in value) + ')'
+  if op == PRINT:
+    return repr(value) if index == 1 else ('err' if value else '')
+  if op == NEWARRAY and index == 1:
+    return f'{value.datatype}[{", ".join(str(i) for i in value.indexes)}]'
+  if op == NEWSTRUCT and index == 1:
+    return value.name
+  if op in (FIELD, FIELDGET, FIELDPEEK) and index == 2 or op == FIELDSET and index == 1:
+    return f'.{value}'
+  if isinstance(value, Code):
+    return value.name
+  if callable(value):
+    return value.__name__
+  if isinstance(value, tuple):
+    return '(' + ', '.join(register_name(code, reg) for reg in value) + ')'
+  return register_name(code, value)
@@ -64,7 +64,11 @@
 import re
 import types
 import sys
+import os
 import inspect
+import hashlib
+import pickle
+import tempfile
 
 #-----------------------------------------------------------------------------
 #                     === User configurable parameters ===
@@ -76,6 +80,9 @@ yaccdebug   = False            # Debugging mode.  If set, yacc generates a
                                # a 'parser.out' file in the current directory
 
 debug_file  = 'parser.out'     # Default name of the debugging file
+tab_prefix  = 'parsetab-'      # Prefix of the cached parsing table files
+tab_version = '1'              # Bumped whenever the cached table layout changes
+tab_keep    = 8                # Number of cached parsing tables kept in a directory
 error_count = 3                # Number of symbols that must be shifted to leave recovery mode
 resultlimit = 40               # Size limit of results when running in debug mode.
 
@@ -1922,6 +1929,116 @@ class LRTable:
             goto[st] = st_goto
             st += 1
 
+# -----------------------------------------------------------------------------
+#                         === TABLE CACHING ===
+#
+# Building the LALR tables is by far the most expensive part of yacc().  The
+# following classes and functions allow the tables to be pickled into a
+# directory and reloaded on the next run.  The file name is derived from a hash
+# of the grammar signature (start symbol, precedence, tokens, rule function
+# names and docstrings) so a modified grammar never picks up stale tables.
+# -----------------------------------------------------------------------------
+
+# This class serves as a minimal standin for Production objects when
+# reading table data from a cache file. It only contains information
+# actually used by the LR parsing engine, plus some additional
+# debugging information.
+class MiniProduction(object):
+    def __init__(self, str, name, len, func, file, line):
+        self.name     = name
+        self.len      = len
+        self.func     = func
+        self.callable = None
+        self.file     = file
+        self.line     = line
+        self.str      = str
+
+    def __str__(self):
+        return self.str
+
+    def __repr__(self):
+        return 'MiniProduction(%s)' % self.str
+
+    # Bind the production function name to a callable
+    def bind(self, pdict):
+        if self.func:
+            self.callable = pdict[self.func]
+
+# Holds the tables read back from a cache file.  It exposes the same
+# attributes as LRTable for the benefit of LRParser.
+class CachedLRTable(object):
+    def __init__(self, productions, action, goto):
+        self.lr_productions = productions
+        self.lr_action      = action
+        self.lr_goto        = goto
+
+    def bind_callables(self, pdict):
+        for p in self.lr_productions:
+            p.bind(pdict)
+
+def table_filename(tabdir, signature):
+    digest = hashlib.sha256((tab_version + signature).encode('utf-8')).hexdigest()
+    return os.path.join(tabdir, '%s%s.pickle' % (tab_prefix, digest[:32]))
+
+# Return a CachedLRTable if a table matching the signature exists
+# in tabdir, None otherwise.
+def read_table(tabdir, signature):
+    filename = table_filename(tabdir, signature)
+    try:
+        with open(filename, 'rb') as f:
+            data = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get('signature') != signature:
+        return None
+    try:
+        # Mark the table as recently used, see prune_tables()
+        os.utime(filename)
+    except OSError:
+        pass
+    productions = [MiniProduction(*p) for p in data['productions']]
+    return CachedLRTable(productions, data['action'], data['goto'])
+
+# Write the tables of lr into tabdir.  Failures are silently ignored: caching
+# is only an optimization and must never prevent the parser from being built.
+def write_table(tabdir, signature, lr):
+    filename = table_filename(tabdir, signature)
+    data = {
+        'signature': signature,
+        'productions': [(p.str, p.name, p.len, p.func, os.path.basename(p.file), p.line)
+                        for p in lr.lr_productions],
+        'action': lr.lr_action,
+        'goto': lr.lr_goto,
+    }
+    try:
+        os.makedirs(tabdir, exist_ok=True)
+        fd, tmpname = tempfile.mkstemp(dir=tabdir, prefix='.' + tab_prefix)
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpname, filename)
+        prune_tables(tabdir)
+    except OSError:
+        pass
+
+# Remove the least recently used tables of tabdir beyond the tab_keep most
+# recent ones.  Several grammars (e.g. two installed versions of a program)
+# may share the directory, so tables of another grammar are kept as well.
+def prune_tables(tabdir):
+    tables = []
+    for name in os.listdir(tabdir):
+        if name.startswith(tab_prefix):
+            filename = os.path.join(tabdir, name)
+            try:
+                tables.append((os.path.getmtime(filename), filename))
+            except OSError:
+                pass
+    tables.sort(reverse=True)
+    for _, filename in tables[tab_keep:]:
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
 # -----------------------------------------------------------------------------
 #                            === INTROSPECTION ===
 #
@@ -2034,6 +2151,8 @@ class ParserReflect(object):
             if self.tokens:
                 parts.append(' '.join(self.tokens))
             for f in self.pfuncs:
+                # productions are bound to their function by name
+                parts.append(f[2])
                 if f[3]:
                     parts.append(f[3])
         except (TypeError, ValueError):
@@ -2270,7 +2389,7 @@ class ParserReflect(object):
 
 def yacc(*, debug=yaccdebug, module=None, start=None,
          check_recursion=True, optimize=False, debugfile=debug_file,
-         debuglog=None, errorlog=None):
+         debuglog=None, errorlog=None, tabdir=None):
 
     # Reference to the parsing method of the last built parser
     global parse
@@ -2303,6 +2422,22 @@ def yacc(*, debug=yaccdebug, module=None, start=None,
     if pinfo.error:
         raise YaccError('Unable to build parser')
 
+    # Reuse the tables cached in tabdir, if any.  The grammar was validated
+    # when the tables were written, so validation is skipped as well.
+    if tabdir and not debug:
+        signature = pinfo.signature()
+        lr = read_table(tabdir, signature)
+        if lr is not None:
+            try:
+                lr.bind_callables(pinfo.pdict)
+            except KeyError:
+                # a rule function is missing: the tables are rebuilt
+                lr = None
+        if lr is not None:
+            parser = LRParser(lr, pinfo.error_func)
+            parse = parser.parse
+            return parser
+
     if debuglog is None:
         if debug:
             try:
@@ -2474,6 +2609,9 @@ def yacc(*, debug=yaccdebug, module=None, start=None,
                 errorlog.warning('Rule (%s) is never reduced', rejected)
                 warned_never.append(rejected)
 
+    if tabdir and not debug:
+        write_table(tabdir, signature, lr)
+
     # Build the parser
     lr.bind_callables(pinfo.pdict)
     parser = LRParser(lr, pinfo.error_func)
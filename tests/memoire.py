@@ -0,0 +1,134 @@
+'''
+Memory used by the elements of arrays and by the tree of a program,
+compared with the same figures measured on the sources of commit 4be5af4,
+before value and tree classes had __slots__. The reference is measured
+by this script, with this interpreter, on a copy of those sources taken
+from git.
+python tests/memoire.py
+'''
+import glob
+import io
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from fralgo.fralgoparse import parser
+from fralgo.lib.ast import namespaces
+from fralgo.lib.exceptions import FatalError
+
+ELEMENTS = 100000
+
+# The last commit before __slots__.
+REFERENCE = '4be5af4'
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+sym = namespaces.get_namespace('main')
+
+def traced(function):
+  '''Bytes allocated by function() and still in use when it returns, its result'''
+  tracemalloc.start()
+  before = tracemalloc.get_traced_memory()[0]
+  result = function()
+  after = tracemalloc.get_traced_memory()[0]
+  tracemalloc.stop()
+  return after - before, result
+
+def parse(prog):
+  try:
+    parser.restart()
+  except AttributeError:
+    pass
+  sym.reset()
+  return parser.parse(prog)
+
+def parses(prog):
+  try:
+    parse(prog)
+    return True
+  except FatalError:
+    return False
+
+def array_element(datatype, value):
+  '''Bytes per element of an array whose elements are all defined'''
+  tree = parse(f'''Tableau T[{ELEMENTS - 1}] en {datatype}
+  Variable i en Entier
+  Début
+    Pour i ← 0 à {ELEMENTS - 1}
+      T[i] ← {value}
+    i Suivant
+  Fin''')
+  size, _ = traced(tree.eval)
+  return size / ELEMENTS
+
+def program_line():
+  '''Bytes of tree per line of the example programs'''
+  programs = []
+  for filename in sorted(glob.glob(os.path.join(ROOT, 'examples', '*.algo'))):
+    with open(filename, 'r', encoding='utf-8') as f:
+      programs.append(f.read()[:-1]) # as fralgocli reads it
+  # a library alone is not a program; the first parse builds the parser
+  programs = [prog for prog in programs if parses(prog)]
+  lines = sum(len(prog.splitlines()) for prog in programs)
+  size, trees = traced(lambda: [parse(prog) for prog in programs])
+  return size / lines, lines
+
+def measure():
+  '''{element type or 'ligne': bytes}, number of lines of the examples'''
+  figures = {}
+  for datatype, value in (('Entier', 'i'), ('Numérique', 'i / 2.0'), ('Booléen', 'i % 2 = 0'),
+                          ('Chaîne', 'Chaîne(i)')):
+    figures[datatype] = array_element(datatype, value)
+  figures['ligne'], lines = program_line()
+  return figures, lines
+
+def reference():
+  '''
+  The figures of measure() for the sources of REFERENCE, measured by this
+  script in another process; None if git cannot provide these sources.
+  '''
+  try:
+    archive = subprocess.run(['git', '-C', ROOT, 'archive', '--format=tar', REFERENCE, 'fralgo'],
+                             check=True, capture_output=True).stdout
+  except (OSError, subprocess.CalledProcessError):
+    return None
+  with tempfile.TemporaryDirectory() as sources:
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+      tar.extractall(sources)
+    # PYTHONPATH comes before the sources of this tree in sys.path
+    env = dict(os.environ, PYTHONPATH=sources, FRALGO_CACHE='')
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--brut'],
+                            env=env, check=True, capture_output=True, text=True).stdout
+  return json.loads(output)[0]
+
+def report(name, before, size, unit):
+  if before is None:
+    print(f'  {name:<12} {size:8.1f} octets par {unit}')
+    return
+  print(f'  {name:<12} {before:8.1f} → {size:8.1f} octets par {unit} ({(size - before) / before:+.0%})')
+
+def main():
+  if sys.argv[1:] == ['--brut']:
+    print(json.dumps(measure()))
+    return
+  before = reference()
+  figures, lines = measure()
+  if before is None:
+    print(f'Référence ({REFERENCE}) indisponible : sources introuvables')
+    before = {}
+  else:
+    print(f'Avant ({REFERENCE}) → après, {sys.implementation.name} {sys.version.split()[0]} :')
+  print(f'Éléments de tableaux ({ELEMENTS}) :')
+  for datatype in ('Entier', 'Numérique', 'Booléen', 'Chaîne'):
+    report(datatype, before.get(datatype), figures[datatype], 'élément')
+  print(f'Arbre des exemples ({lines} lignes) :')
+  report('ligne', before.get('ligne'), figures['ligne'], 'ligne')
+
+if __name__ == '__main__':
+  main()
@@ -3,14 +3,45 @@ import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+import contextlib
+import io
+import pickle
+import tempfile
+import threading
 import unittest
+
+# Parse tables and compiled trees go to a temporary cache, not to the
+# user's: the parser is built when fralgo is imported, hence before setUp.
+_user_cache = os.environ.get('FRALGO_CACHE')
+_cachedir = tempfile.TemporaryDirectory()
+os.environ['FRALGO_CACHE'] = _cachedir.name
+
+from fralgo import fralgoparse
+from fralgo.fralgocli import parse_args
 from fralgo.fralgoparse import parser
-from fralgo.lib.ast import namespaces
-from fralgo.lib.datatypes import Array
-from fralgo.lib.symbols import Namespaces
+from fralgo.fralgolex import lexer, new_lexer
+from fralgo.ply import yacc
+from fralgo.lib.ast import namespaces, libs, Assign, BinOp, Counter, For, FunctionCall, Node, TypedBinOp, While
+from fralgo.lib.cache import load_tree, store_tree
+from fralgo.lib.optimizer import optimize
+from fralgo.lib.symbols import Symbols
+from fralgo.lib.closures import compile_tree
+from fralgo.lib.inference import Untyped
+from fralgo.lib.transpiler import translate, run, walk
+from fralgo.lib.verifier import Verifier
+from fralgo.lib import jit, memo, trampoline, vectors, vm
+from fralgo.lib.datatypes import Any, Array, Integer, Nothing, TypedBuffer, map_type, own_box
+from fralgo.lib.exceptions import ArrayInvalidSize, BadType
 
 sym = namespaces.get_namespace('main')
 
+def tearDownModule():
+  if _user_cache is None:
+    del os.environ['FRALGO_CACHE']
+  else:
+    os.environ['FRALGO_CACHE'] = _user_cache
+  _cachedir.cleanup()
+
 def reset_parser():
   try:
     parser.restart()
@@ -20,6 +51,1131 @@ def reset_parser():
 
 class Test(unittest.TestCase):
 
+  def test_machine_virtuelle_tableaux_structures(self):
+    prog='''Structure Point
+      x en Numérique
+      y en Numérique
+    FinStructure
+    Structure Segment
+      a en Point
+      b en Point
+      nom en Chaîne
+      vu en Booléen
+    FinStructure
+    Tableau T[4] en Entier
+    Tableau M[1, 1] en Entier
+    Variables i, j, t en Entier
+    Variables s, u en Segment
+    Début
+      Ecrire "49. Test des tableaux et des structures dans la machine virtuelle"
+      T[0] ← 5
+      T[1] ← 3
+      T[2] ← 4
+      T[3] ← 1
+      T[4] ← 2
+      Pour i ← 0 à 3
+        Pour j ← 0 à 3 - i
+          Si T[j] > T[j + 1] Alors
+            t ← T[j]
+            T[j] ← T[j + 1]
+            T[j + 1] ← t
+          FinSi
+        j Suivant
+      i Suivant
+      Pour i ← 0 à 1
+        Pour j ← 0 à 1
+          M[i, j] ← T[i] * 10 + T[j]
+        j Suivant
+      i Suivant
+      s.a <- 1, 2
+      s.b.x ← 4
+      s.nom ← "AB"
+      u ← s
+      u.b.y ← s.a.y + M[1, 0]
+      Ecrire T, M, s, u, u.b.y - u.a.x
+    Fin'''
+    reset_parser()
+    main, functions = vm.compile_program(parser.parse(prog))
+    listing = io.StringIO()
+    vm.disassemble(main, functions, listing)
+    for op in ('ARRGET', 'ARRSET', 'FIELDGET', 'FIELDSET', 'COPY', 'ADDI', 'ADDF', 'MULI'):
+      self.assertIn(op, listing.getvalue())
+    expected = '[1, 2, 3, 4, 5] [[11, 12], [21, 22]] 1.0,2.0,4.0,?,AB,FAUX 1.0,2.0,4.0,23.0,AB,FAUX 22.0'
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+      vm.run(main)
+    self.assertEqual(output.getvalue().splitlines()[-1], expected)
+    reset_parser()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+      run(*translate(parser.parse(prog)))
+    self.assertEqual(output.getvalue().splitlines()[-1], expected)
+
+  def test_traduction_tableaux(self):
+    prog='''Tableau M[1, 2] en Numérique
+    Tableau B[2] en Booléen
+    Tableau G[4] en Entier
+    Variables i, j en Entier
+    Fonction somme(n en Entier) en Entier
+      Tableau L[1] en Entier
+      L[0] ← n
+      L[1] ← 0
+      Si n > 0 Alors
+        L[1] ← somme(n - 1)
+        G[n] ← L[0] + L[1]
+      FinSi
+      Retourne L[0] + L[1]
+    FinFonction
+    Début
+      Ecrire "48. Test de la traduction des tableaux"
+      Pour i ← 0 à 1
+        Pour j ← 0 à 2
+          M[i, j] ← i * 3 + j + 0.5
+        j Suivant
+      i Suivant
+      M[0, 0] ← 7
+      B[0] ← M[1, 2] > 5
+      B[2] ← NON(B[0])
+      Ecrire M, M[i - 1, 2], B, B[1], somme(4), G, G[0]
+    Fin'''
+    reset_parser()
+    statements = parser.parse(prog)
+    python, lines = translate(statements)
+    self.assertIn('v_M = [None] * 6', python)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+      run(python, lines)
+    self.assertEqual(output.getvalue().splitlines()[-1],
+      '[[7.0, 1.5, 2.5], [3.5, 4.5, 5.5]] 5.5 [VRAI, ?, FAUX] FAUX 10 [?, 1, 3, 6, 10] ?')
+    for untranslated in ('G ← G + 1', 'Redim G[5]', 'Ecrire G[1.5]', 'Ecrire G[1, 1]'):
+      reset_parser()
+      with self.assertRaises(Untyped):
+        translate(parser.parse(prog.replace('Ecrire M,', untranslated + '\n      Ecrire M,')))
+
+  def test_valeurs_partagees(self):
+    prog='''Tableau T[1] en Chaîne
+    Variables s, r en Chaîne
+    Variable n en Entier
+    Variable test en Booléen
+    Début
+      Ecrire "47. Test des valeurs partagées"
+      Ouvrir fichier sur 1 en Ecriture
+      EcrireFichier 1, "b"
+      Fermer 1
+      T[0] ← "a"
+      T[1] ← "a"
+      s ← "a"
+      r ← s
+      n ← 1
+      Ouvrir fichier sur 1 en Lecture
+      LireFichier 1, T[1]
+      Fermer 1
+      s ← "c"
+      n ← n + 1
+      test ← T[0] = "a" ET T[1] = "b" ET r = "a" ET n = 2
+    Fin'''
+    with tempfile.TemporaryDirectory() as tmpdir:
+      reset_parser()
+      sym.declare_const('fichier', map_type(os.path.join(tmpdir, 'valeurs.txt')))
+      parser.parse(prog).eval()
+    self.assertEqual(sym.get_variable('test').eval(), True, 'test should be VRAI')
+    # temporaries are shared, what is stored has its own box
+    self.assertIs(map_type(True), map_type(1 == 1))
+    self.assertIs(map_type(1), map_type(2 - 1))
+    self.assertIs(map_type('a'), map_type('ab'[0]))
+    self.assertIsNot(map_type(10 ** 6), map_type(10 ** 6))
+    self.assertIsNot(own_box(1), map_type(1))
+    self.assertEqual((map_type('a').eval(), map_type(1).eval()), ('a', 1))
+    self.assertIs(Integer(None).value, Nothing())
+    self.assertIs(pickle.loads(pickle.dumps(Nothing())), Nothing())
+
+  def test_objets_sans_dictionnaire(self):
+    prog='''Fonction suivant(n en Entier) en Entier
+      Retourne n + 1
+    FinFonction
+    Tableau T[2] en Chaîne
+    Variables i, n en Entier
+    Variable test en Booléen
+    Début
+      Ecrire "46. Test des objets sans dictionnaire"
+      n ← 0
+      Pour i ← 0 à 2
+        T[i] ← Chaîne(i)
+        n ← suivant(n)
+      i Suivant
+      TantQue n < 10
+        n ← suivant(n)
+      FinTantQue
+      test ← n = 10 ET T[2] = "2" ET [1, 2] = [1, 2]
+    Fin'''
+    reset_parser()
+    tree = parser.parse(prog)
+    self.assertEqual([type(node).__name__ for node in walk(tree) if hasattr(node, '__dict__')], [])
+    tree = pickle.loads(pickle.dumps(tree))
+    tree.eval()
+    self.assertEqual(sym.get_variable('test').eval(), True, 'test should be VRAI')
+    self.assertFalse(hasattr(sym.get_variable('T').value[0], '__dict__'))
+    loops = [node for node in walk(tree) if isinstance(node, (For, While))]
+    self.assertFalse(any(hasattr(loop, 'countdown') for loop in loops))
+    for python, algo in ((True, 'Booléen'), (1, 'Entier'), (1.5, 'Numérique'), ('a', 'Chaîne')):
+      self.assertEqual(Any(python).data_type, algo)
+
+  def test_operations_tableaux(self):
+    prog='''Tableaux A[4], B[4], C[4] en Entier
+    Tableau F[4] en Numérique
+    Tableau M[1, 1] en Entier
+    Tableau S[1] en Chaîne
+    Variable i en Entier
+    Variable test en Booléen
+    Fonction deux() en Entier
+      Retourne 2
+    FinFonction
+    Début
+      Ecrire "45. Test des opérations sur des tableaux entiers"
+      Pour i ← 0 à 4
+        A[i] ← i
+        B[i] ← 10 * i
+      i Suivant
+      C ← A + B
+      C ← C * deux() - A
+      F ← A / 2.0
+      M ← [[1, 2], [3, 4]]
+      M ← M * M
+      S ← ["a", "b"] & "!"
+      test ← C = [0, 21, 42, 63, 84] ET Somme(C) = 210 ET Somme(F) = 5.0 ET Somme(M) = 30 ET S[1] = "b!"
+    Fin'''
+    vectors.use_numpy = False
+    try:
+      reset_parser()
+      parser.parse(prog).eval()
+    finally:
+      vectors.use_numpy = True
+    self.assertEqual(sym.get_variable('test').eval(), True, 'test should be VRAI')
+    # explicit-stack engine: the operand A * deux() calls a function
+    reset_parser()
+    trampoline.run(parser.parse(prog))
+    self.assertEqual(sym.get_variable('test').eval(), True, 'test should be VRAI (pile)')
+    self.assertEqual(str(sym.get_variable('M')), '[[1, 4], [9, 16]]')
+    self.assertIsInstance(sym.get_variable('C').value, TypedBuffer)
+    b = Array('Entier', 2)
+    b.value = TypedBuffer.of('Entier', [1, 2])
+    with self.assertRaises(ArrayInvalidSize):
+      vectors.operate('+', sym.get_variable('A'), b)
+    with self.assertRaises(BadType):
+      vectors.total(sym.get_variable('S'))
+    # Entier beyond 64 bits are computed exactly
+    big = Array('Entier', 1)
+    big.value = TypedBuffer.of('Entier', [2**40, -2**40])
+    self.assertEqual(str(vectors.operate('*', big, big)), f'[{2**80}, {2**80}]')
+
+  @unittest.skipUnless(vectors.numpy(), 'NumPy n\'est pas installé')
+  def test_operations_tableaux_numpy(self):
+    np = vectors.numpy()
+    a = Array('Entier', 2)
+    a.value = TypedBuffer.of('Entier', [1, 2, 3])
+    f = Array('Numérique', 2)
+    f.value = TypedBuffer.of('Numérique', [0.5, 1.5, 2.5])
+    # computed by NumPy
+    self.assertEqual(vectors._numpy_operate(np, '*', a, a)[0], 'Entier')
+    self.assertEqual(str(vectors.operate('*', a, a)), '[1, 4, 9]')
+    self.assertEqual(str(vectors.operate('+', a, f)), '[1.5, 3.5, 5.5]')
+    self.assertEqual(str(vectors.operate('/', a, 2)), '[0, 1, 1]')
+    self.assertEqual(vectors.total(a), 6)
+    # left to Python: division by zero, Entier beyond 64 bits
+    self.assertIsNone(vectors._numpy_operate(np, '%', a, 0))
+    big = Array('Entier', 1)
+    big.value = TypedBuffer.of('Entier', [2**40, -2**40])
+    self.assertIsNone(vectors._numpy_operate(np, '*', big, big))
+    self.assertEqual(str(vectors.operate('*', big, big)), f'[{2**80}, {2**80}]')
+    big.value = TypedBuffer.of('Entier', [2**62, 2**62])
+    self.assertIsNone(vectors._numpy_operate(np, '+', big, big))
+    self.assertEqual(vectors.total(big), 2**63)
+
+  def test_somme_nom_de_variable(self):
+    prog='''Tableau T[2] en Entier
+    Variable Somme en Entier
+    Variable test en Booléen
+    Début
+      Ecrire "51. Test de Somme comme nom de variable"
+      Somme ← 1 + 2
+      T ← [1, 2, 3]
+      test ← Somme = 3 ET Somme(T) = 6
+    Fin'''
+    reset_parser()
+    parser.parse(prog).eval()
+    self.assertEqual(sym.get_variable('test').eval(), True, 'test should be VRAI')
+    prog='''Tableau T[2] en Entier
+    Variable test en Booléen
+    Fonction Somme(V[] en Entier) en Entier
+      Retourne V[0]
+    FinFonction
+    Début
+      T ← [4, 5, 6]
+      test ← Somme(T) = 4
+    Fin'''
+    reset_parser()
+    parser.parse(prog).eval()
+    self.assertEqual(sym.get_variable('test').eval(), True, 'a function Somme should be called')
+
+  def test_tableaux_multidimensionnels_a_plat(self):
+    prog='''Tableau M[2, 3] en Entier
+    Tableau N[3, 2] en Entier
+    Tableau P[3, 4] en Entier
+    Tableau R[] en Entier
+    Variables i, j en Entier
+    Variable test en Booléen
+    Début
+      Ecrire "44. Test du stockage à plat des tableaux multidimensionnels"
+      Pour i ← 0 à 2
+        Pour j ← 0 à 3
+          M[i, j] ← i * 10 + j
+        j Suivant
+      i Suivant
+      N ← [[1, 2, 3], [4, 5, 6], [7, 8, 9], [10, 11, 12]]
+      Redim R[1, 1]
+      R[1, 0] ← 5
+      Redim R[2, 2]
+      P[3, 4] ← 1
+      test ← M[2, 1] = 21 ET N[3, 2] = 12 ET R[1, 0] = 5 ET Longueur(R) = 1
+    Fin'''
+    reset_parser()
+    parser.parse(prog).eval()
+    self.assertEqual(sym.get_variable('test').eval(), True, 'test should be VRAI')
+    m = sym.get_variable('M')
+    self.assertEqual((m.sizes, m.strides, len(m.value)), ((3, 4), (4, 1), 12))
+    self.assertIsInstance(m.value, TypedBuffer)
+    self.assertEqual(m.value[2 * 4 + 1].eval(), 21)
+    self.assertEqual(str(m), '[[0, 1, 2, 3], [10, 11, 12, 13], [20, 21, 22, 23]]')
+    self.assertEqual(str(sym.get_variable('N')), '[[1, 2, 3], [4, 5, 6], [7, 8, 9], [10, 11, 12]]')
+    self.assertEqual(str(sym.get_variable('R')), '[[?, ?, ?], [5, ?, ?], [?, ?, ?]]')
+    self.assertNotEqual(m, sym.get_variable('N'))
+    # sizes are reported in rows, not in elements
+    with self.assertRaises(BadType) as error:
+      m.set_array(sym.get_variable('P'))
+    self.assertEqual(error.exception.message, 'Nombre de valeurs invalide : 4 (3)')
+
+  def test_tableaux_types(self):
+    prog='''Tableau T[9] en Entier
+    Tableau U[9] en Entier
+    Tableau N[2] en Numérique
+    Tableau B[1] en Booléen
+    Tableau M[1, 2] en Entier
+    Variables i, s en Entier
+    Variable test en Booléen
+    Début
+      Ecrire "43. Test des tableaux typés"
+      s ← 0
+      Pour i ← 0 à 9
+        T[i] ← i * 3
+      i Suivant
+      Pour i ← 0 à 9
+        s ← s + T[i]
+      i Suivant
+      U ← T
+      N[0] ← 1
+      N[1] ← 0.5
+      B[1] ← VRAI
+      M[1, 2] ← 99999999999999999999
+      test ← s = 135 ET U = T ET N[0] + N[1] = 1.5 ET B[1] ET M[1, 2] > 0
+    Fin'''
+    reset_parser()
+    parser.parse(prog).eval()
+    self.assertEqual(sym.get_variable('test').eval(), True, 'test should be VRAI')
+    for name in ('T', 'U', 'N', 'B'):
+      self.assertIsInstance(sym.get_variable(name).value, TypedBuffer)
+    self.assertEqual(sym.get_variable('T').value.values.itemsize, 8)
+    self.assertEqual(repr(sym.get_variable('N')), '[1.0,0.5,?]')
+    self.assertEqual(str(sym.get_variable('B')), '[?, VRAI]')
+    self.assertEqual(len(sym.get_variable('B')), 1)
+    self.assertEqual(str(sym.get_variable('M')), '[[?, ?, ?], [?, ?, 99999999999999999999]]')
+
+  def test_compteur_de_boucle(self):
+    prog='''Fonction double(n en Entier) en Entier
+      Retourne n * 2
+    FinFonction
+    Tableau t[9] en Entier
+    Variables i, j, n, fin, sortie, appels, pas en Entier
+    Variable test en Booléen
+    Début
+      Ecrire "42. Test du compteur de boucle"
+      n ← 0
+      Pour i ← 0 à 9
+        t[i] ← i * i
+        Pour j ← 0 à i
+          n ← n + j
+        j Suivant
+      i Suivant
+      fin ← i
+      Pour i ← 0 à 9
+        Si t[i] > 20 Alors
+          Sortir
+        FinSi
+      i Suivant
+      sortie ← i
+      appels ← 0
+      Pour i ← 1 à 3
+        appels ← appels + double(i)
+      i Suivant
+      pas ← 0
+      Pour i ← 1 à 10
+        pas ← pas + 1
+        i ← i + 1
+      i Suivant
+      test ← n = 165 ET t[9] = 81 ET fin = 10 ET sortie = 5 ET appels = 12 ET pas = 10
+    Fin'''
+    reset_parser()
+    tree = parser.parse(prog)
+    tree.eval()
+    loops = [node for node in walk(tree) if isinstance(node, For)]
+    self.assertEqual([bool(loop.counter) for loop in loops], [True, True, True, False, False])
+    counters = [node.name for node in walk(tree) if isinstance(node, Counter)]
+    self.assertEqual(sorted(counters), ['i', 'i', 'i', 'i', 'i', 'j'])
+    t = sym.get_variable('test')
+    self.assertEqual(t.eval(), True, 'test should be VRAI')
+
+  def test_compilation_des_boucles(self):
+    prog='''Fonction carre(n en Entier) en Entier
+      Retourne n * n
+    FinFonction
+    Variables i, j, n en Entier
+    Variable test en Booléen
+    Début
+      Ecrire "41. Test de la compilation des boucles"
+      n ← 0
+      Pour i ← 1 à 10
+        n ← n + carre(i)
+      i Suivant
+      j ← 0
+      TantQue j < 10
+        j ← j + 1
+        Si j % 2 = 0 Alors
+          Continuer
+        FinSi
+        n ← n + 1
+      FinTantQue
+      test ← n = 390
+    Fin'''
+    reset_parser()
+    tree = parser.parse(prog)
+    loops = len(jit.loops)
+    jit.enable(3)
+    try:
+      tree.eval()
+    finally:
+      jit.enable(None)
+    self.assertEqual([type(loop).__name__ for loop in jit.loops[loops:]], ['For', 'While'])
+    self.assertTrue(all(loop.compiled for loop in jit.loops[loops:]))
+    t = sym.get_variable('test')
+    self.assertEqual(t.eval(), True, 'test should be VRAI')
+
+  def test_verification_des_types(self):
+    prog='''Fonction moitie(n en Entier) en Numérique
+      Retourne n / 2.0
+    FinFonction
+    Fonction faux(n en Entier) en Numérique
+      Retourne n
+    FinFonction
+    Tableau t[2] en Entier
+    Tableau u[1] en Numérique
+    Variables i, x en Entier
+    Variable r en Numérique
+    Variable s en Chaîne
+    Début
+      x ← 1.5
+      s ← x
+      t[0] ← "a"
+      r ← moitie(2.5)
+      u[0] ← 1
+      u[1] ← i
+    Fin'''
+    reset_parser()
+    tree = parser.parse(prog)
+    errors = Verifier(tree).verify(tree)
+    first = errors[0][0] - 5
+    self.assertEqual([(line - first, msg) for line, msg in errors], [
+      (5, '`faux` : type `Numérique` attendu [Entier]'),
+      (13, '`x` : type `Entier` attendu [Numérique]'),
+      (14, '`s` : type `Chaîne` attendu [Entier]'),
+      (15, '`t` : type `Entier` attendu [Chaîne]'),
+      (16, '`moitie` : type `Entier` attendu [paramètre 1]'),
+      (18, '`u` : type `Numérique` attendu [Entier]'),
+    ])
+    prog='''Fonction moitie(n en Entier) en Numérique
+      Retourne n / 2.0
+    FinFonction
+    Tableau t[2] en Entier
+    Variables i, x en Entier
+    Variable r en Numérique
+    Variable test en Booléen
+    Début
+      Ecrire "40. Test de la vérification des types"
+      x ← 0
+      Pour i ← 0 à 2
+        t[i] ← i * 2
+        x ← x + t[i]
+      i Suivant
+      r ← moitie(x)
+      test ← x = 6 ET r = 3.0
+    Fin'''
+    reset_parser()
+    tree = parser.parse(prog)
+    self.assertEqual(Verifier(tree).verify(tree), [])
+    checked = [type(n).__name__ for n in walk(tree) if getattr(n, 'checked', False)]
+    self.assertEqual(sorted(checked), ['ArraySetItem', 'Assign', 'Assign', 'Function', 'FunctionCall'])
+    tree.eval()
+    t = sym.get_variable('test')
+    self.assertEqual(t.eval(), True, 'test should be VRAI')
+
+  def test_operations_typees(self):
+    prog='''Fonction moyenne(a en Entier, b en Entier) en Numérique
+      Variable m en Numérique
+      m ← (a + b) / 2.0
+      Retourne m
+    FinFonction
+    Fonction ajoute(n en Entier) en Entier
+      Retourne n + m
+    FinFonction
+    Variables i, k, m, q en Entier
+    Variable s en Chaîne
+    Variable test en Booléen
+    Début
+      Ecrire "39. Test des opérations typées"
+      k ← 7
+      m ← 7
+      q ← k / 2
+      s ← "a"
+      s ← s & "b"
+      i ← ajoute(1)
+      test ← q = 3 ET moyenne(1, 2) = 1.5 ET s = "ab" ET i = 8 ET k % 4 = 3
+    Fin'''
+    reset_parser()
+    tree = optimize(parser.parse(prog))
+    binops = [n for n in walk(tree) if isinstance(n, BinOp)]
+    typed = {n.op for n in binops if isinstance(n, TypedBinOp)}
+    self.assertEqual(typed, {'+', '/', '&', '%', '=', 'ET'})
+    generic = [n for n in binops if not isinstance(n, TypedBinOp)]
+    # the local m of moyenne would hide m if moyenne called ajoute
+    self.assertEqual([n.op for n in generic], ['+'])
+    tree.eval()
+    t = sym.get_variable('test')
+    self.assertEqual(t.eval(), True, 'test should be VRAI')
+
+  def test_memoisation(self):
+    prog='''Fonction fib(n en Entier) en Entier Mémoïsée
+      Si n < 2 Alors
+        Retourne n
+      FinSi
+      Retourne fib(n - 1) + fib(n - 2)
+    FinFonction
+    Fonction carre(n en Entier) en Entier
+      Variable c en Entier
+      c ← n * n
+      Retourne c
+    FinFonction
+    Fonction decale(n en Entier) en Entier
+      Retourne n + d
+    FinFonction
+    Variables d, x en Entier
+    Variable test en Booléen
+    Début
+      Ecrire "38. Test de la mémoïsation"
+      d ← 1
+      x ← decale(1)
+      d ← 2
+      test ← fib(80) = 23416728348467685 ET carre(9) + carre(9) = 162 ET x + decale(1) = 5
+    Fin'''
+    reset_parser()
+    memo.analyse = True
+    try:
+      parser.parse(prog).eval()
+    finally:
+      memo.analyse = False
+    t = sym.get_variable('test')
+    self.assertEqual(t.eval(), True, 'test should be VRAI')
+    memos = {m.function.name: m for m in memo.memos[-2:]}
+    self.assertEqual(sorted(memos), ['carre', 'fib'])
+    self.assertEqual((memos['fib'].misses, memos['fib'].hits), (81, 78))
+    self.assertEqual((memos['carre'].misses, memos['carre'].hits), (1, 1))
+
+  def test_appels_terminaux(self):
+    prog='''Fonction somme(n en Entier, acc en Entier) en Entier
+      Si n = 0 Alors
+        Retourne acc
+      FinSi
+      Retourne somme(n - 1, acc + n)
+    FinFonction
+    Fonction pair(n en Entier) en Booléen
+      Si n = 0 Alors
+        Retourne VRAI
+      FinSi
+      Retourne impair(n - 1)
+    FinFonction
+    Fonction impair(n en Entier) en Booléen
+      Si n = 0 Alors
+        Retourne FAUX
+      FinSi
+      Retourne pair(n - 1)
+    FinFonction
+    Fonction lire_t() en Entier
+      Retourne t * 2
+    FinFonction
+    Fonction avec_t(n en Entier) en Entier
+      Variable t en Entier
+      t ← n
+      Retourne lire_t()
+    FinFonction
+    Procédure compter(n en Entier)
+      Si n > 0 Alors
+        x ← x + 1
+        compter(n - 1)
+      FinSi
+    FinProcédure
+    Variable x en Entier
+    Variable test en Booléen
+    Début
+      Ecrire "37. Test des appels terminaux"
+      x ← 0
+      compter(5000)
+      test ← somme(5000, 0) = 12502500 ET pair(5001) = FAUX ET avec_t(21) = 42 ET x = 5000
+    Fin'''
+    reset_parser()
+    parser.parse(prog).eval()
+    t = sym.get_variable('test')
+    self.assertEqual(t.eval(), True, 'test should be VRAI')
+    self.assertFalse(sym.is_local())
+
+  def test_appels_non_terminaux(self):
+    prog='''Fonction somme(n en Entier) en Entier
+      Si n = 0 Alors
+        Retourne 0
+      FinSi
+      Retourne n + somme(n - 1)
+    FinFonction
+    Variable r en Entier
+    Début
+      Ecrire "53. Test de la profondeur des appels non terminaux"
+      r ← somme(110)
+    Fin'''
+    reset_parser()
+    tree = parser.parse(prog)
+    # A new thread starts with an almost empty Python stack: before tail
+    # calls, the tree walker went down to about 120 nested calls.
+    thread = threading.Thread(target=tree.eval)
+    thread.start()
+    thread.join()
+    self.assertEqual(sym.get_variable('r').eval(), 6105, 'somme(110) should not run out of stack')
+
+  def test_appels_terminaux_autres_moteurs(self):
+    prog='''Fonction somme(n en Entier, acc en Entier) en Entier
+      Si n = 0 Alors
+        Retourne acc
+      FinSi
+      Retourne somme(n - 1, acc + n)
+    FinFonction
+    Procédure compter(n en Entier)
+      Si n > 0 Alors
+        x ← x + 1
+        compter(n - 1)
+      FinSi
+    FinProcédure
+    Variables x, r en Entier
+    Début
+      Ecrire "54. Test des appels terminaux des moteurs fermetures et vm"
+      x ← 0
+      compter(20000)
+      r ← somme(20000, 0)
+      Ecrire r, x
+    Fin'''
+    reset_parser()
+    compile_tree(parser.parse(prog))()
+    self.assertEqual((sym.get_variable('r').eval(), sym.get_variable('x').eval()), (200010000, 20000))
+    self.assertFalse(sym.is_local())
+    reset_parser()
+    main, functions = vm.compile_program(parser.parse(prog))
+    listing = io.StringIO()
+    vm.disassemble(main, functions, listing)
+    self.assertEqual(listing.getvalue().count('TAILCALL'), 2)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+      vm.run(main)
+    self.assertEqual(output.getvalue().splitlines()[-1], '200010000 20000')
+
+  def test_moteur_pile(self):
+    prog='''Fonction somme(n en Entier) en Entier
+      Si n = 0 Alors
+        Retourne 0
+      FinSi
+      Retourne n + somme(n - 1)
+    FinFonction
+    Variable x en Entier
+    Variable test en Booléen
+    Début
+      Ecrire "36. Test du moteur à pile explicite"
+      x ← somme(5000)
+      test ← x = 12502500
+    Fin'''
+    reset_parser()
+    trampoline.run(parser.parse(prog))
+    t = sym.get_variable('test')
+    self.assertEqual(t.eval(), True, 'test should be VRAI')
+    self.assertFalse(sym.is_local())
+
+  def test_moteur_pile_appels_imbriques(self):
+    prog='''Structure P
+      x en Entier
+    FinStructure
+    Tableau T[1] en Entier
+    Variable s en P
+    Fonction h(n en Entier) en Entier
+      Si n = 0 Alors
+        Retourne 0
+      FinSi
+      Retourne Entier(Chaîne(h(n - 1))) + T[h(0) + 1]
+    FinFonction
+    Fonction k(n en Entier) en Entier
+      Si n = 0 Alors
+        Retourne 0
+      FinSi
+      s.x ← k(n - 1) + 1
+      Retourne s.x
+    FinFonction
+    Variable test en Booléen
+    Début
+      Ecrire "52. Test des appels imbriqués dans le moteur à pile explicite"
+      T[0] ← 0
+      T[1] ← 1
+      test ← h(12000) = 12000 ET k(12000) = 12000
+    Fin'''
+    reset_parser()
+    trampoline.run(parser.parse(prog))
+    t = sym.get_variable('test')
+    self.assertEqual(t.eval(), True, 'test should be VRAI')
+    self.assertFalse(sym.is_local())
+
+  def test_cadres_d_appel(self):
+    prog='''Fonction somme(n en Entier) en Entier
+      Variable t en Entier
+      Si n = 0 Alors
+        Retourne 0
+      FinSi
+      t ← n
+      Retourne somme(n - 1) + t
+    FinFonction
+    Procédure double(&x en Entier)
+      Variable t en Entier
+      t ← x
+      x ← t + somme(t)
+    FinProcédure
+    Variable x en Entier
+    Variable test en Booléen
+    Début
+      Ecrire "35. Test des cadres d'appel"
+      x ← 3
+      double(x)
+      double(x)
+      test ← somme(10) = 55 ET x = 54
+    Fin'''
+    reset_parser()
+    parser.parse(prog).eval()
+    t = sym.get_variable('test')
+    self.assertEqual(t.eval(), True, 'test should be VRAI')
+    self.assertFalse(sym.is_local())
+
+  def test_arguments_evalues_une_fois(self):
+    prog='''Fonction compte(n en Entier) en Entier
+      appels ← appels + 1
+      Retourne n
+    FinFonction
+    Fonction plus_un(n en Entier) en Entier
+      Retourne n + 1
+    FinFonction
+    Variables appels, x en Entier
+    Variable test en Booléen
+    Début
+      Ecrire "34. Test de l'évaluation des arguments"
+      appels ← 0
+      x ← plus_un(plus_un(compte(1) + 1) * 2)
+      test ← x = 7 ET appels = 1
+    Fin'''
+    reset_parser()
+    parser.parse(prog).eval()
+    t = sym.get_variable('test')
+    self.assertEqual(t.eval(), True, 'test should be VRAI')
+
+  def test_cache_des_appels(self):
+    prog='''Fonction moitie(n en Numérique) en Numérique
+      Retourne n / 2
+    FinFonction
+    Variable x en Numérique
+    Début
+      Ecrire "33. Test du cache des appels de fonctions"
+      x ← moitie(3) + moitie(3.0)
+    Fin'''
+    reset_parser()
+    parser.parse(prog).eval()
+    self.assertEqual(sym.get_variable('x').eval(), 3.0)
+    call = FunctionCall('moitie', [Integer(5)])
+    self.assertEqual(call.eval(), 2.5)
+    self.assertEqual(call.plan[2], {(0, ('Entier',))})
+    # a new declaration replaces the cached function
+    parser.parse('''Fonction moitie(n en Numérique) en Numérique
+      Retourne n
+    FinFonction
+    Début
+      x ← 0
+    Fin''').eval()
+    self.assertEqual(call.eval(), 5)
+
+  def test_resolution_des_variables(self):
+    prog='''Procédure montre()
+      total ← total * 100 + x
+    FinProcédure
+    Procédure masque()
+      Variable x en Entier
+      x ← 2
+      montre()
+    FinProcédure
+    Variables x, i, total en Entier
+    Variable test en Booléen
+    Début
+      Ecrire "32. Test de la résolution des variables"
+      total ← 0
+      x ← 1
+      Pour i ← 1 à 2
+        montre()
+        masque()
+      i Suivant
+      x ← x + 10
+      montre()
+      test ← total = 102010211
+    Fin'''
+    reset_parser()
+    parser.parse(prog).eval()
+    t = sym.get_variable('test')
+    self.assertEqual(t.eval(), True, 'test should be VRAI')
+    # a call leaves the names resolved by its caller valid
+    generation = Symbols.generation
+    FunctionCall('masque', None).eval()
+    self.assertEqual(Symbols.generation, generation)
+    self.assertEqual(sym.get_variable('total').eval(), 10201021102)
+
+  def test_machine_virtuelle(self):
+    prog='''Fonction fib(n en Entier) en Entier
+      Si n < 2 Alors
+        Retourne n
+      FinSi
+      Retourne fib(n - 1) + fib(n - 2)
+    FinFonction
+    Procédure ajoute(&total en Entier, n en Entier)
+      total ← total + n
+    FinProcédure
+    Variables i, s en Entier
+    Variable x en Numérique
+    Début
+      Ecrire "31. Test de la machine virtuelle"
+      s ← 0
+      Pour i ← 1 à 10
+        Si i = 5 Alors
+          Continuer
+        FinSi
+        ajoute(s, i)
+      i Suivant
+      x ← s / 4
+      Ecrire s, i, x, fib(15), s > 40
+    Fin'''
+    reset_parser()
+    main, functions = vm.compile_program(parser.parse(prog))
+    listing = io.StringIO()
+    vm.disassemble(main, functions, listing)
+    self.assertIn('FORLOOP', listing.getvalue())
+    self.assertEqual(sorted(functions), ['ajoute', 'fib'])
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+      vm.run(main)
+    self.assertEqual(output.getvalue().splitlines()[-1], '50 11 12.0 610 VRAI')
+
+  def test_machine_virtuelle_exemple(self):
+    filename = os.path.join(os.path.dirname(__file__), '..', 'examples', 'operations.algo')
+    with open(filename, 'r', encoding='utf-8') as f:
+      prog = f.read()[:-1]
+    reset_parser()
+    # compiled, not left to the interpreter
+    main, _ = vm.compile_program(parser.parse(prog))
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+      vm.run(main)
+    lines = output.getvalue().splitlines()
+    self.assertEqual((len(lines), lines[0], lines[-1]),
+                     (12, 'C est égal à A + B soit 2 + 3 = 5', 'NON(D) est VRAI'))
+
+  def test_traduction_python(self):
+    prog='''Fonction fact(n en Entier) en Entier
+      Si n < 2 Alors
+        Retourne 1
+      FinSi
+      Retourne n * fact(n - 1)
+    FinFonction
+    Procédure echange(&a en Entier, &b en Entier)
+      Variable t en Entier
+      t ← a
+      a ← b
+      b ← t
+    FinProcédure
+    Variables i, x, y en Entier
+    Variable z en Numérique
+    Début
+      Ecrire "30. Test de la traduction en Python"
+      x ← 1
+      y ← 2
+      echange(x, y)
+      Pour i ← 1 à 3
+        z ← z + 0.5
+      i Suivant
+      Ecrire x, y, i, fact(5), x < y, 7 / 2
+    Fin'''
+    reset_parser()
+    statements = parser.parse(prog)
+    with self.assertRaises(Untyped):
+      # z is read before being assigned
+      translate(statements)
+    reset_parser()
+    statements = parser.parse(prog.replace('x ← 1', 'x ← 1\n      z ← 0'))
+    python, lines = translate(statements)
+    self.assertEqual(len(python.splitlines()), len(lines))
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+      run(python, lines)
+    self.assertEqual(output.getvalue().splitlines()[-1], '2 1 4 120 FAUX 3')
+    # a recursive procedure passing on its own & parameter
+    prog='''Procédure ajoute(&c en Entier, n en Entier)
+      Si n > 0 Alors
+        c ← c + 1
+        ajoute(c, n - 1)
+      FinSi
+    FinProcédure
+    Variable x en Entier
+    Début
+      x ← 10
+      ajoute(x, 5)
+      Ecrire x
+    Fin'''
+    reset_parser()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+      run(*translate(parser.parse(prog)))
+    self.assertEqual(output.getvalue(), '15\n')
+    reset_parser()
+    with self.assertRaises(Untyped):
+      # a local variable would be resolved in the new call
+      translate(parser.parse(prog.replace('ajoute(c, n - 1)', 'ajoute(n, n - 1)')))
+
+  def test_moteur_fermetures(self):
+    prog='''Variable i en Entier
+    Variable s en Entier
+    Variable test en Booléen
+    Fonction fact(n en Entier) en Entier
+      Si n < 2 Alors
+        Retourne 1
+      FinSi
+      Retourne n * fact(n - 1)
+    FinFonction
+    Début
+      Ecrire "29. Test du moteur à fermetures"
+      s ← 0
+      Pour i ← 1 à 10
+        Si i % 2 = 0 Alors
+          Continuer
+        FinSi
+        s ← s + i
+      i Suivant
+      TantQue s < 100
+        s ← s * 2
+      FinTantQue
+      test ← s = 100 ET fact(5) = 120
+    Fin'''
+    reset_parser()
+    run = compile_tree(parser.parse(prog))
+    run()
+    t = sym.get_variable('test')
+    self.assertEqual(t.eval(), True, 'test should be VRAI')
+
+  def test_optimisation_constantes(self):
+    prog='''Constante N 10
+    Variable x en Entier
+    Variable y en Entier
+    Variable test en Booléen
+    Début
+      Ecrire "28. Test de l'optimisation des constantes"
+      x ← N * 2 + Longueur("abc")
+      y ← N / 0
+      test ← x = 23
+    Fin'''
+    reset_parser()
+    statements = optimize(parser.parse(prog))
+    def walk(node):
+      if node.statement is not None:
+        yield from walk(node.statement) if isinstance(node.statement, Node) else [node.statement]
+      for child in node.children:
+        yield from walk(child)
+    assigns = [stmt for stmt in walk(statements) if isinstance(stmt, Assign)]
+    self.assertEqual((type(assigns[0].value), assigns[0].value.eval()), (Integer, 23), 'N * 2 + Longueur("abc") should be folded')
+    self.assertIsInstance(assigns[1].value, BinOp, 'division by zero should be left to run time')
+    statements.children[0].eval() # declarations
+    assigns[0].eval()
+    assigns[2].eval()
+    t = sym.get_variable('test')
+    self.assertEqual(t.eval(), True, 'test should be VRAI')
+
+  def test_options_ligne_de_commande(self):
+    selected, algofile, args = parse_args(['--temps-demarrage', 'prog.algo', '-x', 'y'])
+    self.assertEqual(selected, {'--temps-demarrage': True})
+    self.assertEqual(algofile, 'prog.algo')
+    self.assertEqual(args, ['-x', 'y'], 'program arguments should be left untouched')
+    self.assertEqual(parse_args(['--moteur=fermetures', 'prog.algo'])[0], {'--moteur': 'fermetures'})
+    self.assertEqual(parse_args([]), ({}, None, []))
+
+  def test_nouvel_analyseur_lexical(self):
+    lexer.input('Variable a en Entier\nVariable b en Entier\n')
+    while lexer.token():
+      pass
+    lineno = lexer.lineno
+    clone = new_lexer()
+    self.assertIs(clone.lexre, lexer.lexre, 'master regex should be shared')
+    self.assertEqual(clone.lineno, 1, 'lineno should be reset')
+    clone.input('Ecrire "Bonjour"\n')
+    types = [tok.type for tok in iter(clone.token, None)]
+    self.assertEqual(types, ['PRINT', 'STRING', 'NEWLINE'])
+    self.assertEqual(clone.lineno, 2)
+    self.assertEqual(lexer.lineno, lineno, 'master lexer should be left untouched')
+
+  def test_cache_librairies(self):
+    lib='''Librairie
+    Variable n en Entier
+    Fonction triple(x en Entier) en Entier
+      Retourne x * 3
+    FinFonction
+    Initialise
+      n ← 1
+    '''
+    prog='''Importer "malib"
+    Variable test en Booléen
+    Début
+      Ecrire "27. Test du cache des librairies"
+      test ← malib:triple(malib:n) = 3
+    Fin'''
+
+    with tempfile.TemporaryDirectory() as libdir:
+      with open(os.path.join(libdir, 'malib.algo'), 'w', encoding='utf-8') as f:
+        f.write(lib)
+      os.environ['FRALGO_CACHE'] = ''
+      libs.set_main(os.path.join(libdir, 'test.algo'))
+      hits, misses, _ = libs.cache_info()
+      try:
+        for _ in range(2):
+          reset_parser()
+          statements = parser.parse(prog)
+          statements.eval()
+          namespaces.del_namespace('malib')
+          t = sym.get_variable('test')
+          self.assertEqual(t.eval(), True, 'test should be VRAI')
+      finally:
+        os.environ['FRALGO_CACHE'] = _cachedir.name
+        libs.set_main()
+    self.assertEqual(libs.cache_info()[:2], (hits + 1, misses + 1))
+
+  def test_cache_librairies_volatiles(self):
+    lib='''Librairie
+    Constante C [1 + 1, 2 + 1]
+    '''
+    prog='''Importer "malib"
+    Variable test en Booléen
+    Début
+      Ecrire "50. Test des librairies évaluées pendant l'analyse"
+      test ← malib:C[0] = 2
+    Fin'''
+
+    with tempfile.TemporaryDirectory() as libdir:
+      with open(os.path.join(libdir, 'malib.algo'), 'w', encoding='utf-8') as f:
+        f.write(lib)
+      libs.set_main(os.path.join(libdir, 'test.algo'))
+      _, misses, size = libs.cache_info()
+      try:
+        for _ in range(2):
+          reset_parser()
+          statements = parser.parse(prog)
+          statements.eval()
+          namespaces.del_namespace('malib')
+          t = sym.get_variable('test')
+          self.assertEqual(t.eval(), True, 'test should be VRAI')
+      finally:
+        libs.set_main()
+    self.assertEqual(libs.cache_info()[1:], (misses + 2, size), 'tree should not be kept')
+
+  def test_cache_arbre_compile(self):
+    prog='''Variables i, n en Entier
+    Variable test en Booléen
+    Fonction double(x en Entier) en Entier
+      Retourne x * 2
+    FinFonction
+    Début
+      Ecrire "26. Test du cache des arbres compilés"
+      n ← 0
+      Pour i ← 1 à 4
+        n ← n + double(i)
+      i Suivant
+      test ← n = 20
+    Fin'''
+
+    with tempfile.TemporaryDirectory() as cachedir:
+      os.environ['FRALGO_CACHE'] = cachedir
+      try:
+        self.assertIsNone(load_tree('test.algo', prog))
+        reset_parser()
+        store_tree('test.algo', prog, parser.parse(prog))
+        self.assertIsNone(load_tree('test.algo', prog + '\n'), 'source changed')
+        statements = load_tree('test.algo', prog)
+      finally:
+        os.environ['FRALGO_CACHE'] = _cachedir.name
+    self.assertIsNotNone(statements, 'tree should be cached')
+    reset_parser()
+    statements.eval()
+    t = sym.get_variable('test')
+    self.assertEqual(t.eval(), True, 'test should be VRAI')
+
+  def test_cache_tables_analyseur(self):
+    prog='''Variable test en Booléen
+    Début
+      Ecrire "25. Test du cache des tables de l'analyseur"
+      test ← 2 + 3 * 4 = 14
+    Fin'''
+
+    with tempfile.TemporaryDirectory() as tabdir:
+      yacc.yacc(module=fralgoparse, tabdir=tabdir)
+      self.assertEqual(len(os.listdir(tabdir)), 1, 'tables should be cached')
+      cached = yacc.yacc(module=fralgoparse, tabdir=tabdir)
+      self.assertIsInstance(cached.productions[1], yacc.MiniProduction)
+      self.assertEqual(cached.action, parser.action)
+      self.assertEqual(cached.goto, parser.goto)
+      reset_parser()
+      statements = cached.parse(prog)
+      statements.eval()
+      t = sym.get_variable('test')
+      self.assertEqual(t.eval(), True, 'test should be VRAI')
+      # a table naming a rule function that no longer exists is rebuilt
+      table = os.path.join(tabdir, os.listdir(tabdir)[0])
+      with open(table, 'rb') as f:
+        data = pickle.load(f)
+      data['productions'] = [p[:3] + ('p_absent',) + p[4:] if p[3] else p for p in data['productions']]
+      with open(table, 'wb') as f:
+        pickle.dump(data, f)
+      # the tables of another grammar are kept
+      with open(os.path.join(tabdir, yacc.tab_prefix + 'autre.pickle'), 'wb') as f:
+        pickle.dump({}, f)
+      rebuilt = yacc.yacc(module=fralgoparse, tabdir=tabdir)
+      self.assertNotIsInstance(rebuilt.productions[1], yacc.MiniProduction)
+      self.assertEqual(len(os.listdir(tabdir)), 2)
+      self.assertEqual(yacc.yacc(module=fralgoparse, tabdir=tabdir).action, parser.action)
+
   def test_continuer_sortir_boucle(self):
     prog='''Variables i, idx en Entier
     Variables test1, test2 en Booléen